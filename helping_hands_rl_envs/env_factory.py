@@ -1,13 +1,13 @@
 import copy
+import importlib
 import numpy as np
 import numpy.random as npr
 
 from helping_hands_rl_envs.envs import constants as env_constants
-from helping_hands_rl_envs.envs.numpy_envs.numpy_env import NumpyEnv
-from helping_hands_rl_envs.envs.pybullet_envs.pybullet_env import PyBulletEnv
+from helping_hands_rl_envs.envs.pybullet_envs import constants as py_constants
 from helping_hands_rl_envs.planners.planner_factory import getPlannerFn
 
-from helping_hands_rl_envs.runner import MultiRunner, SingleRunner
+from helping_hands_rl_envs.runner import MultiRunner, AsyncMultiRunner, SingleRunner
 
 def getEnvFn(simulator, env_type):
   '''
@@ -20,19 +20,71 @@ def getEnvFn(simulator, env_type):
   Returns:
   '''
   if simulator == 'numpy':
-    if env_type in env_constants.CREATE_NUMPY_ENV_FNS:
-      return env_constants.CREATE_NUMPY_ENV_FNS[env_type]
+    if env_type in env_constants.NUMPY_ENVS:
+      return importEnvFn(env_constants.NUMPY_ENVS[env_type])
     else:
       raise ValueError('Invalid environment type passed to factory. No numpy env for {}'.format(env_type))
   elif simulator == 'pybullet':
-    if env_type in env_constants.CREATE_PYBULLET_ENV_FNS:
-      return env_constants.CREATE_PYBULLET_ENV_FNS[env_type]
+    if env_type in env_constants.PYBULLET_ENVS:
+      return importEnvFn(env_constants.PYBULLET_ENVS[env_type])
     else:
       raise ValueError('Invalid environment type passed to factory. No pybullet env for {}'.format(env_type))
   else:
     raise ValueError('Invalid simulator passed to factory. Valid simulators are: \'numpy\', \'pybullet\'.')
 
-def createEnvs(num_processes, simulator, env_type, env_config, planner_config={}):
+def importEnvFn(path):
+  '''
+  Import the env creation function at a path of the env registry in envs/constants.py
+
+  Args:
+    - path: 'module:function' path relative to env_constants.ENV_PACKAGE
+
+  Returns: The env creation function
+  '''
+  module_name, fn_name = path.split(':')
+  module = importlib.import_module('{}.{}'.format(env_constants.ENV_PACKAGE, module_name))
+  return getattr(module, fn_name)
+
+def getObsShapes(env_type, env_config):
+  '''
+  Get the shapes of the in-hand image and heightmap observations an env will return.
+
+  Args:
+    - env_type: String indicating the type of environment
+    - env_config: Dict containing intialization arguments for the env
+
+  Returns: (in_hand_shape, heightmap_shape)
+  '''
+  if env_type == 'multi_task':
+    env_config = env_config[0]
+  config = {**py_constants.DEFAULT_CONFIG, **env_config}
+
+  in_hand_channels = 3 if config['in_hand_mode'].find('proj') > -1 else 1
+  in_hand_shape = (in_hand_channels, config['in_hand_size'], config['in_hand_size'])
+  heightmap_shape = (1, config['obs_size'], config['obs_size'])
+  return in_hand_shape, heightmap_shape
+
+def getEnvConfig(env_type, env_config, env_num):
+  '''
+  Clone the env config for one of the envs of a MultiRunner and offset its seed by the env number.
+
+  Args:
+    - env_type: String indicating the type of environment
+    - env_config: Dict containing intialization arguments for the env
+    - env_num: Index of the env in the MultiRunner
+
+  Returns: Dict containing the intialization arguments of this env
+  '''
+  env_config = copy.deepcopy(env_config)
+  if env_type == 'multi_task':
+    for config in env_config:
+      config['seed'] = config['seed'] + env_num if 'seed' in config else npr.randint(1000)
+  else:
+    env_config['seed'] = env_config['seed'] + env_num if 'seed' in env_config else npr.randint(1000)
+  return env_config
+
+def createEnvs(num_processes, simulator, env_type, env_config, planner_config={}, shared_memory=False,
+               envs_per_worker=1, async_runner=False, timeout=None):
   '''
   Wrapper function to create either a single env the the main process or some
   number of envs each in their own seperate process.
@@ -40,7 +92,9 @@ def createEnvs(num_processes, simulator, env_type, env_config, planner_config={}
   if num_processes == 0:
     return createSingleProcessEnv(simulator, env_type, env_config, planner_config)
   else:
-    return createMultiprocessEnvs(num_processes, simulator, env_type, env_config, planner_config)
+    return createMultiprocessEnvs(num_processes, simulator, env_type, env_config, planner_config,
+                                  shared_memory=shared_memory, envs_per_worker=envs_per_worker,
+                                  async_runner=async_runner, timeout=timeout)
 
 def createSingleProcessEnv(simulator, env_type, env_config, planner_config={}):
   '''
@@ -72,7 +126,8 @@ def createSingleProcessEnv(simulator, env_type, env_config, planner_config={}):
 
   return SingleRunner(env, planner)
 
-def createMultiprocessEnvs(num_processes, simulator, env_type, env_config, planner_config={}):
+def createMultiprocessEnvs(num_processes, simulator, env_type, env_config, planner_config={}, shared_memory=False,
+                           envs_per_worker=1, async_runner=False, timeout=None):
   '''
   Create a number of environments on different processes to run in parralel
 
@@ -82,17 +137,16 @@ def createMultiprocessEnvs(num_processes, simulator, env_type, env_config, plann
     - env_type: String indicating the type of environment to create
     - env_config: Dict containing intialization arguments for the env
     - planner_config: Dict containing intialization arguments for the planner
+    - shared_memory: Transfer observations through shared memory instead of the pipes
+    - envs_per_worker: Number of envs hosted by each worker process. Each env still gets its own
+                       physics client.
+    - async_runner: Create an AsyncMultiRunner with awaitable commands for use with asyncio
+    - timeout: Max number of seconds to wait for a worker before restarting it, wait forever if None
 
   Returns: MultiRunner containing all environments
   '''
   # Clone env config and set seeds for the different processes
-  env_configs = [copy.deepcopy(env_config) for _ in range(num_processes)]
-  for i, env_config in enumerate(env_configs):
-    if env_type == 'multi_task':
-      for config in env_config:
-        config['seed'] = config['seed'] + i if 'seed' in config else npr.randint(1000)
-    else:
-      env_config['seed'] = env_config['seed'] + i if 'seed' in env_config else npr.randint(1000)
+  env_configs = [getEnvConfig(env_type, env_config, i) for i in range(num_processes)]
 
   # Create the various environments
   env_func = getEnvFn(simulator, env_type)
@@ -108,4 +162,8 @@ def createMultiprocessEnvs(num_processes, simulator, env_type, env_config, plann
     #       more refactoring of the multi process stuff then I want to do atm
     planners = [None for i in range(num_processes)]
 
-  return MultiRunner(envs, planners)
+  obs_shapes = getObsShapes(env_type, env_configs[0]) if shared_memory else None
+  if async_runner:
+    return AsyncMultiRunner(envs, planners, obs_shapes, envs_per_worker, timeout)
+  else:
+    return MultiRunner(envs, planners, obs_shapes, envs_per_worker, timeout)
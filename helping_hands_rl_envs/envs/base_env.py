@@ -1,13 +1,9 @@
 import numpy as np
 import numpy.random  as npr
-from scipy.ndimage import median_filter
-import skimage.transform as sk_transform
 
 from helping_hands_rl_envs.simulators import constants
 from helping_hands_rl_envs.simulators.pybullet.utils import transformations
 
-import matplotlib.pyplot as plt
-
 class BaseEnv(object):
   '''
   Base Arm RL environment.
@@ -282,45 +278,60 @@ class BaseEnv(object):
     if self.in_hand_mode.find('proj') > -1:
       return self.getInHandOccupancyGridProj(crop, z, rot)
     else:
+      # Only needed by the in hand images, keep it out of the import of the envs
+      import skimage.transform as sk_transform
+
       # end_effector rotate counter clockwise along z, so in hand img rotate clockwise
       crop = sk_transform.rotate(crop, np.rad2deg(-rz))
       return crop.reshape((1, self.in_hand_size, self.in_hand_size))
 
   def getInHandOccupancyGridProj(self, crop, z, rot):
+    '''
+    Project the occupancy of the in hand crop along the three axes of the gripper frame. Each pixel of the crop is
+    a column of voxels below its height. The voxels are rotated into the gripper frame, smoothed with a 2x2x2
+    median filter and counted along each axis. The occupied voxels are generated from the column heights, without
+    building the columns as a dense cube first.
+    Args:
+      - crop: in_hand_size x in_hand_size heightmap crop around the gripper
+      - z: Z coordinate of the gripper
+      - rot: (rx, ry, rz) rotation of the gripper
+    Returns: in_hand_size x in_hand_size x 3 projections of the occupancy along the three axes
+    '''
     rx, ry, rz = rot
     # crop = zoom(crop, 2)
     crop = np.round(crop, 5)
     size = self.in_hand_size
 
     zs = np.array([z+(-size/2+i)*(self.heightmap_resolution) for i in range(size)])
-    zs = zs.reshape((1, 1, -1))
-    zs = zs.repeat(size, 0).repeat(size, 1)
     # zs[zs<-(self.heightmap_resolution)] = 100
-    c = crop.reshape(size, size, 1).repeat(size, 2)
-    ori_occupancy = c > zs
+    # The column of pixel (i, j) is occupied at the heights zs[k] below crop[i, j], i.e. for k < heights[i, j]
+    heights = np.searchsorted(zs, crop.ravel(), side='left')
+    columns = np.repeat(np.arange(size * size), heights)
+    ks = np.arange(len(columns)) - np.repeat(np.cumsum(heights) - heights, heights)
 
-    # transform into points
-    point = np.argwhere(ori_occupancy)
-    # center
-    ori_point = point - size/2
+    # transform the occupied voxels into points around the center
+    ori_point = np.stack((columns // size, columns % size, ks)) - size/2
     R = transformations.euler_matrix(rx, ry, rz)[:3, :3].T
-    point = R.dot(ori_point.T)
+    point = R.dot(ori_point)
     point = point + size/2
     point = np.round(point).astype(int)
-    point = point.T[(np.logical_and(0 < point.T, point.T < size)).all(1)].T
-
-    occupancy = np.zeros((size, size, size))
-    occupancy[point[0], point[1], point[2]] = 1
-    occupancy = median_filter(occupancy, size=2)
-    occupancy = np.ceil(occupancy)
-
-    projection = np.stack((occupancy.sum(0), occupancy.sum(1), occupancy.sum(2)))
-    projection = np.rollaxis(projection, 0, 3)
-    # fig, axs = plt.subplots(1, 3, figsize=(15, 5))
-    # axs[0].imshow(projection[:, :, 0])
-    # axs[1].imshow(projection[:, :, 1])
-    # axs[2].imshow(projection[:, :, 2])
-    # fig.show()
+    is_inside = np.logical_and(0 < point, point < size).all(0)
+
+    # Occupancy as a flat grid padded by one voxel on the high side of each axis, so shifting it by one voxel along
+    # an axis never wraps around to the next row
+    stride = size + 1
+    occupancy = np.zeros(stride ** 3, dtype=np.uint8)
+    occupancy[((point[0] * stride + point[1]) * stride + point[2])[is_inside]] = 1
+
+    # 2x2x2 median filter of the binary occupancy: the window of voxel v spans v - 1 to v and the median is set if
+    # at least 4 of its 8 voxels are. Voxels at index 0 are never occupied, so the reflection at the low borders
+    # adds nothing to the counts.
+    counts = occupancy.copy()
+    for offset in [1, stride, stride + 1, stride ** 2, stride ** 2 + 1, stride ** 2 + stride, stride ** 2 + stride + 1]:
+      counts[offset:] += occupancy[:-offset]
+    occupancy = (counts.reshape(stride, stride, stride)[:size, :size, :size] >= 4).astype(float)
+
+    projection = np.stack((occupancy.sum(0), occupancy.sum(1), occupancy.sum(2)), axis=2)
     return projection
 
   def getEmptyInHand(self):
@@ -1,100 +1,61 @@
-import numpy as np
+# Env types mapped onto the 'module:function' paths of their creation functions, relative to ENV_PACKAGE. The
+# modules are only imported by env_factory.getEnvFn when an env of their type is created, importing all of them
+# takes most of a second.
+ENV_PACKAGE = 'helping_hands_rl_envs.envs.pybullet_envs'
 
-from helping_hands_rl_envs.envs.pybullet_envs.block_picking_env import createBlockPickingEnv
-from helping_hands_rl_envs.envs.pybullet_envs.block_stacking_env import createBlockStackingEnv
-from helping_hands_rl_envs.envs.pybullet_envs.block_adjacent_env import createBlockAdjacentEnv
-from helping_hands_rl_envs.envs.pybullet_envs.brick_stacking_env import createBrickStackingEnv
-from helping_hands_rl_envs.envs.pybullet_envs.pyramid_stacking_env import createPyramidStackingEnv
-from helping_hands_rl_envs.envs.pybullet_envs.house_building_1_env import createHouseBuilding1Env
-from helping_hands_rl_envs.envs.pybullet_envs.house_building_2_env import createHouseBuilding2Env
-from helping_hands_rl_envs.envs.pybullet_envs.house_building_3_env import createHouseBuilding3Env
-from helping_hands_rl_envs.envs.pybullet_envs.house_building_4_env import createHouseBuilding4Env
-from helping_hands_rl_envs.envs.pybullet_envs.house_building_5_env import createHouseBuilding5Env
-from helping_hands_rl_envs.envs.pybullet_envs.house_building_x_env import createHouseBuildingXEnv
-from helping_hands_rl_envs.envs.pybullet_envs.improvise_house_building_2_env import createImproviseHouseBuilding2Env
-from helping_hands_rl_envs.envs.pybullet_envs.improvise_house_building_3_env import createImproviseHouseBuilding3Env
-from helping_hands_rl_envs.envs.pybullet_envs.improvise_house_building_discrete_env import createImproviseHouseBuildingDiscreteEnv
-from helping_hands_rl_envs.envs.pybullet_envs.improvise_house_building_random_env import createImproviseHouseBuildingRandomEnv
-from helping_hands_rl_envs.envs.pybullet_envs.house_building_1_deconstruct_env import createHouseBuilding1DeconstructEnv
-from helping_hands_rl_envs.envs.pybullet_envs.house_building_2_deconstruct_env import createHouseBuilding2DeconstructEnv
-from helping_hands_rl_envs.envs.pybullet_envs.house_building_3_deconstruct_env import createHouseBuilding3DeconstructEnv
-from helping_hands_rl_envs.envs.pybullet_envs.house_building_4_deconstruct_env import createHouseBuilding4DeconstructEnv
-from helping_hands_rl_envs.envs.pybullet_envs.house_building_x_deconstruct_env import createHouseBuildingXDeconstructEnv
-from helping_hands_rl_envs.envs.pybullet_envs.improvise_house_building_2_deconstruct_env import createImproviseHouseBuilding2DeconstructEnv
-from helping_hands_rl_envs.envs.pybullet_envs.improvise_house_building_3_deconstruct_env import createImproviseHouseBuilding3DeconstructEnv
-from helping_hands_rl_envs.envs.pybullet_envs.improvise_house_building_discrete_deconstruct_env import createImproviseHouseBuildingDiscreteDeconstructEnv
-from helping_hands_rl_envs.envs.pybullet_envs.improvise_house_building_random_deconstruct_env import createImproviseHouseBuildingRandomDeconstructEnv
-from helping_hands_rl_envs.envs.pybullet_envs.ramp_envs.ramp_block_stacking_env import createRampBlockStackingEnv
-from helping_hands_rl_envs.envs.pybullet_envs.ramp_envs.ramp_house_building_1_env import createRampHouseBuilding1Env
-from helping_hands_rl_envs.envs.pybullet_envs.ramp_envs.ramp_house_building_2_env import createRampHouseBuilding2Env
-from helping_hands_rl_envs.envs.pybullet_envs.ramp_envs.ramp_house_building_3_env import createRampHouseBuilding3Env
-from helping_hands_rl_envs.envs.pybullet_envs.ramp_envs.ramp_house_building_4_env import createRampHouseBuilding4Env
-from helping_hands_rl_envs.envs.pybullet_envs.ramp_envs.ramp_improvise_house_building_2_env import createRampImproviseHouseBuilding2Env
-from helping_hands_rl_envs.envs.pybullet_envs.ramp_envs.ramp_improvise_house_building_3_env import createRampImproviseHouseBuilding3Env
-from helping_hands_rl_envs.envs.pybullet_envs.ramp_envs.ramp_block_stacking_deconstruct_env import createRampBlockStackingDeconstructEnv
-from helping_hands_rl_envs.envs.pybullet_envs.ramp_envs.ramp_house_building_1_deconstruct_env import createRampHouseBuilding1DeconstructEnv
-from helping_hands_rl_envs.envs.pybullet_envs.ramp_envs.ramp_house_building_2_deconstruct_env import createRampHouseBuilding2DeconstructEnv
-from helping_hands_rl_envs.envs.pybullet_envs.ramp_envs.ramp_house_building_3_deconstruct_env import createRampHouseBuilding3DeconstructEnv
-from helping_hands_rl_envs.envs.pybullet_envs.ramp_envs.ramp_house_building_4_deconstruct_env import createRampHouseBuilding4DeconstructEnv
-from helping_hands_rl_envs.envs.pybullet_envs.ramp_envs.ramp_improvise_house_building_2_deconstruct_env import createRampImproviseHouseBuilding2DeconstructEnv
-from helping_hands_rl_envs.envs.pybullet_envs.ramp_envs.ramp_improvise_house_building_3_deconstruct_env import createRampImproviseHouseBuilding3DeconstructEnv
-from helping_hands_rl_envs.envs.pybullet_envs.random_picking_env import createRandomPickingEnv
-from helping_hands_rl_envs.envs.pybullet_envs.random_stacking_env import createRandomStackingEnv
-from helping_hands_rl_envs.envs.pybullet_envs.multi_task_env import createMultiTaskEnv
-
-CREATE_NUMPY_ENV_FNS = {
-  'block_picking' : createBlockPickingEnv,
-  'block_stacking' : createBlockStackingEnv,
-  'block_adjacent' : createBlockAdjacentEnv,
-  'brick_stacking' : createBrickStackingEnv,
-  'pyramid_stacking' : createPyramidStackingEnv,
-  'house_building_1' : createHouseBuilding1Env,
-  'house_building_2' : createHouseBuilding2Env,
-  'house_building_3' : createHouseBuilding3Env,
-  'house_building_4' : createHouseBuilding4Env,
-  'house_building_5' : createHouseBuilding5Env,
+NUMPY_ENVS = {
+  'block_picking': 'block_picking_env:createBlockPickingEnv',
+  'block_stacking': 'block_stacking_env:createBlockStackingEnv',
+  'block_adjacent': 'block_adjacent_env:createBlockAdjacentEnv',
+  'brick_stacking': 'brick_stacking_env:createBrickStackingEnv',
+  'pyramid_stacking': 'pyramid_stacking_env:createPyramidStackingEnv',
+  'house_building_1': 'house_building_1_env:createHouseBuilding1Env',
+  'house_building_2': 'house_building_2_env:createHouseBuilding2Env',
+  'house_building_3': 'house_building_3_env:createHouseBuilding3Env',
+  'house_building_4': 'house_building_4_env:createHouseBuilding4Env',
+  'house_building_5': 'house_building_5_env:createHouseBuilding5Env',
 }
 
-CREATE_PYBULLET_ENV_FNS = {
-  'block_picking' : createBlockPickingEnv,
-  'block_stacking' : createBlockStackingEnv,
-  'block_adjacent' : createBlockAdjacentEnv,
-  'brick_stacking' : createBrickStackingEnv,
-  'pyramid_stacking' : createPyramidStackingEnv,
-  'house_building_1' : createHouseBuilding1Env,
-  'house_building_2' : createHouseBuilding2Env,
-  'house_building_3' : createHouseBuilding3Env,
-  'house_building_4' : createHouseBuilding4Env,
-  'house_building_5' : createHouseBuilding5Env,
-  'house_buliding_x' : createHouseBuildingXEnv,
-  'improvise_house_building_2' : createImproviseHouseBuilding2Env,
-  'improvise_house_building_3' : createImproviseHouseBuilding3Env,
-  'improvise_house_building_discrete' : createImproviseHouseBuildingDiscreteEnv,
-  'improvise_house_building_random' : createImproviseHouseBuildingRandomEnv,
-  'house_building_1_deconstruct' : createHouseBuilding1DeconstructEnv,
-  'house_building_2_deconstruct' : createHouseBuilding2DeconstructEnv,
-  'house_building_3_deconstruct' : createHouseBuilding3DeconstructEnv,
-  'house_building_4_deconstruct' : createHouseBuilding4DeconstructEnv,
-  'house_building_x_deconstruct' : createHouseBuildingXDeconstructEnv,
-  'improvise_house_building_2_deconstruct' : createImproviseHouseBuilding2DeconstructEnv,
-  'improvise_house_building_3_deconstruct' : createImproviseHouseBuilding3DeconstructEnv,
-  'improvise_house_building_discrete_deconstruct' : createImproviseHouseBuildingDiscreteDeconstructEnv,
-  'improvise_house_building_random_deconstruct' : createImproviseHouseBuildingRandomDeconstructEnv,
-  'random_picking' : createRandomPickingEnv,
-  'random_stacking' : createRandomStackingEnv,
-  'multi_task' : createMultiTaskEnv,
-  'ramp_block_stacking': createRampBlockStackingEnv,
-  'ramp_house_building_1': createRampHouseBuilding1Env,
-  'ramp_house_building_2': createRampHouseBuilding2Env,
-  'ramp_house_building_3': createRampHouseBuilding3Env,
-  'ramp_house_building_4': createRampHouseBuilding4Env,
-  'ramp_improvise_house_building_2': createRampImproviseHouseBuilding2Env,
-  'ramp_improvise_house_building_3': createRampImproviseHouseBuilding3Env,
-  'ramp_block_stacking_deconstruct': createRampBlockStackingDeconstructEnv,
-  'ramp_house_building_1_deconstruct': createRampHouseBuilding1DeconstructEnv,
-  'ramp_house_building_2_deconstruct': createRampHouseBuilding2DeconstructEnv,
-  'ramp_house_building_3_deconstruct': createRampHouseBuilding3DeconstructEnv,
-  'ramp_house_building_4_deconstruct': createRampHouseBuilding4DeconstructEnv,
-  'ramp_improvise_house_building_2_deconstruct': createRampImproviseHouseBuilding2DeconstructEnv,
-  'ramp_improvise_house_building_3_deconstruct': createRampImproviseHouseBuilding3DeconstructEnv,
+PYBULLET_ENVS = {
+  'block_picking': 'block_picking_env:createBlockPickingEnv',
+  'block_stacking': 'block_stacking_env:createBlockStackingEnv',
+  'block_adjacent': 'block_adjacent_env:createBlockAdjacentEnv',
+  'brick_stacking': 'brick_stacking_env:createBrickStackingEnv',
+  'pyramid_stacking': 'pyramid_stacking_env:createPyramidStackingEnv',
+  'house_building_1': 'house_building_1_env:createHouseBuilding1Env',
+  'house_building_2': 'house_building_2_env:createHouseBuilding2Env',
+  'house_building_3': 'house_building_3_env:createHouseBuilding3Env',
+  'house_building_4': 'house_building_4_env:createHouseBuilding4Env',
+  'house_building_5': 'house_building_5_env:createHouseBuilding5Env',
+  'house_buliding_x': 'house_building_x_env:createHouseBuildingXEnv',
+  'improvise_house_building_2': 'improvise_house_building_2_env:createImproviseHouseBuilding2Env',
+  'improvise_house_building_3': 'improvise_house_building_3_env:createImproviseHouseBuilding3Env',
+  'improvise_house_building_discrete': 'improvise_house_building_discrete_env:createImproviseHouseBuildingDiscreteEnv',
+  'improvise_house_building_random': 'improvise_house_building_random_env:createImproviseHouseBuildingRandomEnv',
+  'house_building_1_deconstruct': 'house_building_1_deconstruct_env:createHouseBuilding1DeconstructEnv',
+  'house_building_2_deconstruct': 'house_building_2_deconstruct_env:createHouseBuilding2DeconstructEnv',
+  'house_building_3_deconstruct': 'house_building_3_deconstruct_env:createHouseBuilding3DeconstructEnv',
+  'house_building_4_deconstruct': 'house_building_4_deconstruct_env:createHouseBuilding4DeconstructEnv',
+  'house_building_x_deconstruct': 'house_building_x_deconstruct_env:createHouseBuildingXDeconstructEnv',
+  'improvise_house_building_2_deconstruct': 'improvise_house_building_2_deconstruct_env:createImproviseHouseBuilding2DeconstructEnv',
+  'improvise_house_building_3_deconstruct': 'improvise_house_building_3_deconstruct_env:createImproviseHouseBuilding3DeconstructEnv',
+  'improvise_house_building_discrete_deconstruct': 'improvise_house_building_discrete_deconstruct_env:createImproviseHouseBuildingDiscreteDeconstructEnv',
+  'improvise_house_building_random_deconstruct': 'improvise_house_building_random_deconstruct_env:createImproviseHouseBuildingRandomDeconstructEnv',
+  'random_picking': 'random_picking_env:createRandomPickingEnv',
+  'random_stacking': 'random_stacking_env:createRandomStackingEnv',
+  'multi_task': 'multi_task_env:createMultiTaskEnv',
+  'ramp_block_stacking': 'ramp_envs.ramp_block_stacking_env:createRampBlockStackingEnv',
+  'ramp_house_building_1': 'ramp_envs.ramp_house_building_1_env:createRampHouseBuilding1Env',
+  'ramp_house_building_2': 'ramp_envs.ramp_house_building_2_env:createRampHouseBuilding2Env',
+  'ramp_house_building_3': 'ramp_envs.ramp_house_building_3_env:createRampHouseBuilding3Env',
+  'ramp_house_building_4': 'ramp_envs.ramp_house_building_4_env:createRampHouseBuilding4Env',
+  'ramp_improvise_house_building_2': 'ramp_envs.ramp_improvise_house_building_2_env:createRampImproviseHouseBuilding2Env',
+  'ramp_improvise_house_building_3': 'ramp_envs.ramp_improvise_house_building_3_env:createRampImproviseHouseBuilding3Env',
+  'ramp_block_stacking_deconstruct': 'ramp_envs.ramp_block_stacking_deconstruct_env:createRampBlockStackingDeconstructEnv',
+  'ramp_house_building_1_deconstruct': 'ramp_envs.ramp_house_building_1_deconstruct_env:createRampHouseBuilding1DeconstructEnv',
+  'ramp_house_building_2_deconstruct': 'ramp_envs.ramp_house_building_2_deconstruct_env:createRampHouseBuilding2DeconstructEnv',
+  'ramp_house_building_3_deconstruct': 'ramp_envs.ramp_house_building_3_deconstruct_env:createRampHouseBuilding3DeconstructEnv',
+  'ramp_house_building_4_deconstruct': 'ramp_envs.ramp_house_building_4_deconstruct_env:createRampHouseBuilding4DeconstructEnv',
+  'ramp_improvise_house_building_2_deconstruct': 'ramp_envs.ramp_improvise_house_building_2_deconstruct_env:createRampImproviseHouseBuilding2DeconstructEnv',
+  'ramp_improvise_house_building_3_deconstruct': 'ramp_envs.ramp_improvise_house_building_3_deconstruct_env:createRampImproviseHouseBuilding3DeconstructEnv',
 }
@@ -46,13 +46,16 @@ def createBlockPickingEnv(simulator_base_env, config):
       self.obj_grasped = 0
       return self._getObservation()
 
-    def saveState(self):
-      super(BlockPickingEnv, self).saveState()
+    def saveState(self, slot=None):
+      slot = super(BlockPickingEnv, self).saveState(slot)
       self.state['obj_grasped'] = deepcopy(self.obj_grasped)
+      return slot
 
-    def restoreState(self):
-      super(BlockPickingEnv, self).restoreState()
+    def restoreState(self, slot=None):
+      if not super(BlockPickingEnv, self).restoreState(slot):
+        return False
       self.obj_grasped = self.state['obj_grasped']
+      return True
 
     def getObjectPosition(self):
       return list(map(self._getObjectPosition, self.objects))
@@ -6,6 +6,8 @@ import numpy as np
 import numpy.random as npr
 
 from helping_hands_rl_envs.envs.base_env import BaseEnv
+from helping_hands_rl_envs.envs.snapshot_store import SnapshotStore
+from helping_hands_rl_envs.envs.utils import placement
 from helping_hands_rl_envs.simulators.numpy import object_generation
 from helping_hands_rl_envs.simulators import constants
 
@@ -23,6 +25,8 @@ class NumpyEnv(BaseEnv):
       config['in_hand_size'] = 24
     if 'in_hand_mode' not in config:
       config['in_hand_mode'] = 'sub'
+    if 'snapshot_capacity' not in config:
+      config['snapshot_capacity'] = 64
 
     seed = config['seed']
     workspace = config['workspace']
@@ -50,6 +54,9 @@ class NumpyEnv(BaseEnv):
     self.pick_offset = 0.0
     self.place_offset = 0.0
 
+    self.state = {}
+    self.snapshots = SnapshotStore(config['snapshot_capacity'])
+
   def reset(self):
     ''''''
     self.held_object = None
@@ -60,20 +67,43 @@ class NumpyEnv(BaseEnv):
 
     return self._getObservation()
 
-  def saveState(self):
+  def saveState(self, slot=None):
+    '''
+    Save a snapshot of the env state
+
+    Args:
+      - slot: Slot to save the snapshot in, replacing the snapshot in it. A new numbered slot if None
+
+    Returns: The slot of the snapshot
+    '''
     self.state = {'held_object_idx': self.objects.index(self.held_object) if self.objects and self.held_object else None,
                   'heightmap': deepcopy(self.heightmap),
                   'current_episode_steps': deepcopy(self.current_episode_steps),
                   'objects': deepcopy(self.objects),
                   'valid': deepcopy(self.valid)}
+    return self.snapshots.put(self.state, slot)
+
+  def restoreState(self, slot=None):
+    '''
+    Restore a snapshot of the env state
 
-  def restoreState(self):
+    Args:
+      - slot: Slot of the snapshot, the last saved snapshot if None
+
+    Returns: True if the snapshot was restored, False if the slot is empty or was evicted
+    '''
+    state = self.snapshots.get(slot)
+    if state is None:
+      return False
+    # Restore from a copy since the heightmap and the objects are modified in place
+    self.state = deepcopy(state)
     self.heightmap = self.state['heightmap']
     self.current_episode_steps = self.state['current_episode_steps']
     self.objects = self.state['objects']
     self.valid = self.state['valid']
     held_object_idx = self.state['held_object_idx']
     self.held_object = self.objects[held_object_idx] if held_object_idx is not None else None
+    return True
 
   def saveEnvToFile(self, path):
     # np_file = os.path.join(path, 'env.np')
@@ -233,39 +263,16 @@ class NumpyEnv(BaseEnv):
 
     return self._isHolding(), in_hand_img, self.heightmap.reshape([self.heightmap_size, self.heightmap_size, 1])
 
-  def _getValidPositions(self, padding, min_distance, existing_positions, num_shapes):
-    while True:
-      existing_positions_copy = deepcopy(existing_positions)
-      valid_positions = []
-      for i in range(num_shapes):
-        # Generate random drop config
-        x_extents = self.workspace[0][1] - self.workspace[0][0]
-        y_extents = self.workspace[1][1] - self.workspace[1][0]
-
-        is_position_valid = False
-        for j in range(1000):
-          if is_position_valid:
-            break
-          position = [int((x_extents - padding) * npr.random_sample() + self.workspace[0][0] + padding / 2),
-                      int((y_extents - padding) * npr.random_sample() + self.workspace[1][0] + padding / 2)]
-          if self.pos_candidate is not None:
-            position[0] = self.pos_candidate[0][np.abs(self.pos_candidate[0] - position[0]).argmin()]
-            position[1] = self.pos_candidate[1][np.abs(self.pos_candidate[1] - position[1]).argmin()]
-
-          if existing_positions_copy:
-            # is_position_valid = np.all(
-            #   np.sum(np.abs(np.array(positions)[:, :2] - np.array(position)[:2]), axis=1) > min_distance)
-            distances = np.array(list(map(lambda p: np.linalg.norm(np.array(p) - position), existing_positions_copy)))
-            is_position_valid = np.all(distances > min_distance)
-          else:
-            is_position_valid = True
-        if is_position_valid:
-          existing_positions_copy.append(position)
-          valid_positions.append(position)
-        else:
-          break
-      if len(valid_positions) == num_shapes:
-        return valid_positions
+  def _getValidPositions(self, padding, min_distance, existing_positions, num_shapes, num_tries=100):
+    # Sampling the positions one after the other can get stuck, so start over a limited number of times
+    for i in range(num_tries):
+      try:
+        return placement.sampleValidPositions(self.workspace[:2], min_distance, existing_positions, num_shapes,
+                                              num_attempts=1000, padding=padding, pos_candidate=self.pos_candidate,
+                                              to_int=True)
+      except constants.NoValidPositionException:
+        pass
+    raise constants.NoValidPositionException
 
   def _generateShapes(self, object_type, num_objects, min_distance=None, padding=None, random_orientation=False):
     ''''''
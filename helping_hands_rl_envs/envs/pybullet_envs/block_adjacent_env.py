@@ -10,6 +10,9 @@ class BlockAdjacentEnv(PyBulletEnv):
 
   def reset(self):
     ''''''
+    if self.reset_mode == 'library':
+      self.resetFromSceneLibrary()
+      return self._getObservation()
     self.resetPybulletEnv()
     self._generateShapes(constants.CUBE, self.num_obj, random_orientation=self.random_orientation)
     return self._getObservation()
@@ -29,18 +29,24 @@ class BlockPickingEnv(PyBulletEnv):
 
   def reset(self):
     ''''''
-    self.resetPybulletEnv()
-    self._generateShapes(constants.CUBE, self.num_obj, random_orientation=self.random_orientation)
+    if self.reset_mode == 'library':
+      self.resetFromSceneLibrary()
+    else:
+      self.resetPybulletEnv()
+      self._generateShapes(constants.CUBE, self.num_obj, random_orientation=self.random_orientation)
     self.obj_grasped = 0
     return self._getObservation()
 
-  def saveState(self):
-    super(BlockPickingEnv, self).saveState()
+  def saveState(self, slot=None):
+    slot = super(BlockPickingEnv, self).saveState(slot)
     self.state['obj_grasped'] = deepcopy(self.obj_grasped)
+    return slot
 
-  def restoreState(self):
-    super(BlockPickingEnv, self).restoreState()
+  def restoreState(self, slot=None):
+    if not super(BlockPickingEnv, self).restoreState(slot):
+      return False
     self.obj_grasped = self.state['obj_grasped']
+    return True
 
   def _checkTermination(self):
     ''''''
@@ -17,6 +17,9 @@ class BlockStackingEnv(PyBulletEnv):
     else:
       raise ValueError('Invalid object type specified. Must be \'cube\' or \'cylinder\'')
 
+    if self.reset_mode == 'library':
+      self.resetFromSceneLibrary()
+      return self._getObservation()
     while True:
       self.resetPybulletEnv()
       try:
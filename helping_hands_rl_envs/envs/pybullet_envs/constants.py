@@ -24,10 +24,47 @@ DEFAULT_CONFIG = {
   'num_objects' : 1,
   'object_type' : 'cube',
   'hard_reset_freq': 1,
+  # How the episodes between hard resets are reset after removing the objects: 'template' restores the simulation
+  # state saved at the end of the last hard reset, 'robot' only moves the robot back to its home positions. The scenes
+  # after 'template' resets match hard resets, the episodes only do until the arm touches the table
+  'soft_reset_mode': 'robot',
   'min_object_distance': None,
   'min_boarder_padding': None,
   # The random offset range for each object when generating the goal structure. This will help to reduce the domain gap
   # (because when constructing, the objects are aligned less perfectly), but will also decrease the optimality of the expert.
   # This is the sum of the + and - amount, e.g., for 0.005, the offset will be randomly sampled from -0.0025 to 0.0025
   'deconstruct_init_offset': 0,
+  # Id of an already connected pybullet client to use instead of connecting a new one
+  'client': None,
+  # How the heightmap is computed: 'camera' renders a depth image, 'ray' casts a vertical ray per pixel and
+  # 'analytic' rasterizes the shapes of the objects from their poses (only for envs with primitive objects)
+  'sensor_mode': 'camera',
+  # 'fixed' always runs the full number of simulation steps after an action, 'adaptive' steps in chunks of
+  # settle_chunk_size and stops once the velocities of all objects which are not held are below settle_velocity
+  'settle_mode': 'fixed',
+  'settle_chunk_size': 10,
+  'settle_velocity': 1e-3,
+  # 'arm' executes pick and place with the arm, 'teleport' attaches the picked object and teleports it to the
+  # place pose without moving the arm, the robot is removed from the collision world
+  'execution_mode': 'arm',
+  # 'analytic' solves the IK of the UR5 robots in closed form, 'iterative' uses pb.calculateInverseKinematics.
+  # The Kuka always uses the iterative IK
+  'ik_mode': 'analytic',
+  # Max number of IK solutions cached by the robot, 0 disables the cache
+  'ik_cache_size': 1024,
+  # Max number of snapshots kept by saveState, the least recently used ones are freed. Unbounded if None
+  'snapshot_capacity': 64,
+  # 'generate' samples new object positions and settles them on each reset, 'library' loads a random scene of
+  # the scene library at scene_library (a .npy file written by scripts/generate_scene_library.py)
+  'reset_mode': 'generate',
+  'scene_library': None,
+  # Park the removed objects below the workspace and re-activate them for new objects of the same shape type and
+  # scale bucket instead of loading new bodies. At most object_pool_capacity bodies are kept parked. The pool is
+  # emptied by each hard reset, so it is only useful with hard_reset_freq > 1
+  'object_pool': False,
+  'object_pool_scale_bucket': 0.01,
+  'object_pool_capacity': 32,
+  # Collision shape of random objects: 'mesh' uses the convex parts of their mesh, 'simplified' the simplified
+  # convex hulls written by scripts/generate_collision_meshes.py
+  'random_object_collision': 'mesh',
 }
@@ -2,10 +2,10 @@ import pybullet as pb
 import numpy as np
 import scipy
 import numpy.random as npr
-from itertools import combinations
 
 from helping_hands_rl_envs.envs.pybullet_envs.pybullet_env import PyBulletEnv, NoValidPositionException
 import helping_hands_rl_envs.simulators.pybullet.utils.object_generation as pb_obj_generation
+from helping_hands_rl_envs.simulators.pybullet.utils import scene_library
 from helping_hands_rl_envs.simulators import constants
 
 class DeconstructEnv(PyBulletEnv):
@@ -49,6 +49,9 @@ class DeconstructEnv(PyBulletEnv):
     return self._isHolding(), in_hand_img, self.heightmap.reshape([1, self.heightmap_size, self.heightmap_size])
 
   def resetDeconstructEnv(self):
+    if self.reset_mode == 'library':
+      self.structure_objs = self.resetFromSceneLibrary()
+      return
     self.resetPybulletEnv()
     self.structure_objs = list()
     self.generateStructure()
@@ -66,12 +69,10 @@ class DeconstructEnv(PyBulletEnv):
     # To deconstruct a block structure with n blocks, n-1 pick and place action pairs must be executed
     if self.current_episode_steps < (self.num_obj-1)*2:
       return False
-    obj_combs = combinations(self.objects, 2)
-    for (obj1, obj2) in obj_combs:
-      dist = np.linalg.norm(np.array(obj1.getXYPosition()) - np.array(obj2.getXYPosition()))
-      if dist < self.terminate_min_dist:
-        return False
-    return True
+    return not self._getSpatialIndex(num_dims=2).hasPairCloserThan(self.terminate_min_dist)
+
+  def getScene(self):
+    return scene_library.getScene(self.objects, self.object_types, self.structure_objs)
 
   def checkStructure(self):
     raise NotImplemented('Deconstruct env must implement this function')
@@ -106,35 +107,21 @@ class DeconstructEnv(PyBulletEnv):
     if scale is None:
       scale = npr.choice(np.arange(self.block_scale_range[0], self.block_scale_range[1] + 0.01, 0.02))
 
-    if obj_type == constants.CUBE:
-      handle = pb_obj_generation.generateCube(pos, rot, scale)
-    elif obj_type == constants.BRICK:
-      handle = pb_obj_generation.generateBrick(pos, rot, scale)
-    elif obj_type == constants.ROOF:
-      handle = pb_obj_generation.generateRoof(pos, rot, scale)
-    elif obj_type == constants.TRIANGLE:
-      handle = pb_obj_generation.generateTriangle(pos, rot, scale)
-    elif obj_type == constants.CYLINDER:
-      handle = pb_obj_generation.generateCylinder(pos, rot, scale)
-    elif obj_type == constants.RANDOM:
-      handle = pb_obj_generation.generateRandomObj(pos, rot, scale)
-    else:
-      raise NotImplementedError
+    handle = self._createObject(obj_type, pos, rot, scale)
     self.objects.append(handle)
     self.object_types[handle] = obj_type
     self.structure_objs.append(handle)
     return handle
 
   def generateStructureRandomShapeWithZScale(self, pos, rot, zscale=1):
-    handle = pb_obj_generation.generateRandomObj(pos, rot,
-                                                 npr.uniform(self.block_scale_range[0], self.block_scale_range[1]),
-                                                 zscale)
+    handle = self._createObject(constants.RANDOM, pos, rot,
+                                npr.uniform(self.block_scale_range[0], self.block_scale_range[1]), zscale)
     self.objects.append(handle)
     self.object_types[handle] = constants.RANDOM
     self.structure_objs.append(handle)
 
   def generateStructureRandomShapeWithScaleAndZScale(self, pos, rot, scale, zscale):
-    handle = pb_obj_generation.generateRandomObj(pos, rot, scale, zscale)
+    handle = self._createObject(constants.RANDOM, pos, rot, scale, zscale)
     self.objects.append(handle)
     self.object_types[handle] = constants.RANDOM
     self.structure_objs.append(handle)
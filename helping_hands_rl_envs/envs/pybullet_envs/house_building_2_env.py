@@ -10,6 +10,9 @@ class HouseBuilding2Env(PyBulletEnv):
 
   def reset(self):
     ''''''
+    if self.reset_mode == 'library':
+      self.resetFromSceneLibrary()
+      return self._getObservation()
     while True:
       self.resetPybulletEnv()
       try:
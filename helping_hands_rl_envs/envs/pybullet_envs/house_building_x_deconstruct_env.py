@@ -2,7 +2,6 @@ import time
 from copy import deepcopy
 import numpy.random as npr
 import numpy as np
-from itertools import combinations
 from helping_hands_rl_envs.envs.pybullet_envs.deconstruct_env import DeconstructEnv
 from helping_hands_rl_envs.simulators import constants
 from helping_hands_rl_envs.envs.utils.check_goal import CheckGoal
@@ -43,6 +42,11 @@ class HouseBuildingXDeconstructEnv(DeconstructEnv):
 
   def reset(self):
     ''''''
+    if self.reset_mode == 'library':
+      obs = super(HouseBuildingXDeconstructEnv, self).reset()
+      if self.gen_goal.additional_objects:
+        self.num_obj = len(self.structure_objs)
+      return obs
     while True:
       super(HouseBuildingXDeconstructEnv, self).reset()
       self.gen_goal.gen()
@@ -54,12 +58,7 @@ class HouseBuildingXDeconstructEnv(DeconstructEnv):
       return self._getObservation()
 
   def _checkTermination(self):
-    obj_combs = combinations(self.objects, 2)
-    for (obj1, obj2) in obj_combs:
-      dist = np.linalg.norm(np.array(obj1.getXYPosition()) - np.array(obj2.getXYPosition()))
-      if dist < 2.4*self.min_block_size:
-        return False
-    return True
+    return not self._getSpatialIndex(num_dims=2).hasPairCloserThan(2.4*self.min_block_size)
 
   def checkStructure(self):
     return self.check_goal.check()
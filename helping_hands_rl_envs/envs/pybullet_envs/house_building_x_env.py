@@ -68,6 +68,9 @@ class HouseBuildingXEnv(PyBulletEnv):
 
   def reset(self):
     ''''''
+    if self.reset_mode == 'library':
+      self.resetFromSceneLibrary()
+      return self._getObservation()
     while True:
       super(HouseBuildingXEnv, self).reset()
       try:
@@ -1,6 +1,5 @@
 from copy import deepcopy
 import numpy as np
-from itertools import combinations
 from helping_hands_rl_envs.envs.pybullet_envs.pybullet_env import PyBulletEnv
 from helping_hands_rl_envs.simulators import constants
 from helping_hands_rl_envs.simulators.constants import NoValidPositionException
@@ -32,11 +31,9 @@ class ImproviseHouseBuilding2Env(PyBulletEnv):
     rand_objs = list(filter(lambda x: self.object_types[x] == constants.RANDOM, self.objects))
     roofs = list(filter(lambda x: self.object_types[x] == constants.ROOF, self.objects))
 
-    rand_obj_combs = combinations(rand_objs, 2)
-    for (obj1, obj2) in rand_obj_combs:
-      if self._checkOnTop(obj1, roofs[0]) and self._checkOnTop(obj2, roofs[0]):
-        return True
-    return False
+    # The roof rests on at least two of the random objects
+    num_supports = sum(self._checkOnTop(obj, roofs[0]) for obj in rand_objs)
+    return num_supports >= 2
 
   def isSimValid(self):
     roofs = list(filter(lambda x: self.object_types[x] == constants.ROOF, self.objects))
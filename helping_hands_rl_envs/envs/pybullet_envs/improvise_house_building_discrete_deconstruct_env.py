@@ -3,7 +3,6 @@ from copy import deepcopy
 import numpy.random as npr
 import numpy as np
 import pybullet as pb
-from itertools import combinations
 from helping_hands_rl_envs.envs.pybullet_envs.deconstruct_env import DeconstructEnv
 from helping_hands_rl_envs.simulators import constants
 
@@ -20,11 +19,9 @@ class ImproviseHouseBuildingDiscreteEnv(DeconstructEnv):
     if roofs[0].getZPosition() < 1.4*self.min_block_size:
       return False
 
-    rand_obj_combs = combinations(rand_objs, 2)
-    for (obj1, obj2) in rand_obj_combs:
-      if self._checkOnTop(obj1, roofs[0]) and self._checkOnTop(obj2, roofs[0]):
-        return True
-    return False
+    # The roof rests on at least two of the random objects
+    num_supports = sum(self._checkOnTop(obj, roofs[0]) for obj in rand_objs)
+    return num_supports >= 2
 
   def generateStructure(self):
     lower_z1 = 0.01
@@ -88,12 +85,7 @@ class ImproviseHouseBuildingDiscreteEnv(DeconstructEnv):
   def _checkTermination(self):
     if self.current_episode_steps < 4:
       return False
-    obj_combs = combinations(self.objects, 2)
-    for (obj1, obj2) in obj_combs:
-      dist = np.linalg.norm(np.array(obj1.getXYPosition()) - np.array(obj2.getXYPosition()))
-      if dist < self.terminate_min_dist:
-        return False
-    return True
+    return not self._getSpatialIndex(num_dims=2).hasPairCloserThan(self.terminate_min_dist)
 
 def createImproviseHouseBuildingDiscreteDeconstructEnv(config):
   return ImproviseHouseBuildingDiscreteEnv(config)
@@ -3,7 +3,6 @@ from copy import deepcopy
 import numpy.random as npr
 import numpy as np
 import pybullet as pb
-from itertools import combinations
 from helping_hands_rl_envs.envs.pybullet_envs.deconstruct_env import DeconstructEnv
 from helping_hands_rl_envs.simulators import constants
 
@@ -22,11 +21,9 @@ class ImproviseHouseBuildingRandomDeconstructEnv(DeconstructEnv):
     if not self._checkObjUpright(roofs[0], threshold=np.pi / 20):
       return False
 
-    rand_obj_combs = combinations(rand_objs, 2)
-    for (obj1, obj2) in rand_obj_combs:
-      if self._checkOnTop(obj1, roofs[0]) and self._checkOnTop(obj2, roofs[0]):
-        return True
-    return False
+    # The roof rests on at least two of the random objects
+    num_supports = sum(self._checkOnTop(obj, roofs[0]) for obj in rand_objs)
+    return num_supports >= 2
 
   def generateStructure(self):
     roof_z = 0.06
@@ -1,3 +1,4 @@
+from helping_hands_rl_envs.simulators.pybullet.utils import pybullet_util
 from helping_hands_rl_envs.envs.pybullet_envs.block_stacking_env import createBlockStackingEnv
 from helping_hands_rl_envs.envs.pybullet_envs.pyramid_stacking_env import createPyramidStackingEnv
 from helping_hands_rl_envs.envs.pybullet_envs.brick_stacking_env import createBrickStackingEnv
@@ -61,6 +62,7 @@ class MultiTaskEnv(object):
 
     self.active_env_id = 0
     self.active_env = self.envs[self.active_env_id]
+    pybullet_util.setActiveClient(self.active_env.client)
 
   def __getattr__(self, attr):
     return self.active_env.__getattribute__(attr)
@@ -70,6 +72,7 @@ class MultiTaskEnv(object):
     self.active_env_id = (self.active_env_id + 1) % len(self.envs)
     self.active_env = self.envs[self.active_env_id]
     self.workspace = self.active_env.workspace
+    pybullet_util.setActiveClient(self.active_env.client)
 
     return self.active_env.reset()
 
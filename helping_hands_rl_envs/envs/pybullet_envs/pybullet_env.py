@@ -8,13 +8,19 @@ import pybullet as pb
 import pybullet_data
 
 from helping_hands_rl_envs.envs.base_env import BaseEnv
+from helping_hands_rl_envs.envs.snapshot_store import SnapshotStore
+from helping_hands_rl_envs.envs.utils import placement
 import helping_hands_rl_envs.envs.pybullet_envs.constants as py_constants
 
 from helping_hands_rl_envs.simulators.pybullet.robots.ur5_simple import UR5_Simple
 from helping_hands_rl_envs.simulators.pybullet.robots.ur5_robotiq import UR5_Robotiq
 from helping_hands_rl_envs.simulators.pybullet.robots.kuka import Kuka
-from helping_hands_rl_envs.simulators.pybullet.utils.sensor import Sensor
-from helping_hands_rl_envs.simulators.pybullet.objects.pybullet_object import PybulletObject
+from helping_hands_rl_envs.simulators.pybullet.utils.sensor import Sensor, RaySensor, AnalyticSensor
+from helping_hands_rl_envs.simulators.pybullet.utils import pybullet_util
+from helping_hands_rl_envs.simulators.pybullet.utils import scene_library
+from helping_hands_rl_envs.simulators.pybullet.utils import scene_snapshot
+from helping_hands_rl_envs.simulators.pybullet.objects.object_pool import ObjectPool
+from helping_hands_rl_envs.simulators.pybullet.objects import random_object
 import helping_hands_rl_envs.simulators.pybullet.utils.object_generation as pb_obj_generation
 from helping_hands_rl_envs.simulators import constants
 from helping_hands_rl_envs.simulators.constants import NoValidPositionException
@@ -37,10 +43,13 @@ class PyBulletEnv(BaseEnv):
                                       config['in_hand_mode'])
 
     # Connect to pybullet and add data files to path
-    if config['render']:
+    if config['client'] is not None:
+      self.client = config['client']
+    elif config['render']:
       self.client = pb.connect(pb.GUI)
     else:
       self.client = pb.connect(pb.DIRECT)
+    pybullet_util.setActiveClient(self.client)
     pb.setAdditionalSearchPath(pybullet_data.getDataPath())
 
     # Environment specific variables
@@ -56,6 +65,10 @@ class PyBulletEnv(BaseEnv):
       self.robot = Kuka()
     else:
       raise NotImplementedError
+    if config['ik_mode'] not in ('analytic', 'iterative'):
+      raise NotImplementedError
+    self.robot.ik_mode = config['ik_mode']
+    self.robot.ik_cache_size = config['ik_cache_size']
 
     if config['physics_mode'] == 'fast':
       self.physic_mode = 'fast'
@@ -87,7 +100,15 @@ class PyBulletEnv(BaseEnv):
     cam_pos = [self.workspace[0].mean(), self.workspace[1].mean(), 10]
     target_pos = [self.workspace[0].mean(), self.workspace[1].mean(), 0]
     cam_up_vector = [-1, 0, 0]
-    self.sensor = Sensor(cam_pos, cam_up_vector, target_pos, ws_size)
+    if config['sensor_mode'] == 'camera':
+      self.sensor = Sensor(cam_pos, cam_up_vector, target_pos, ws_size)
+    elif config['sensor_mode'] == 'ray':
+      self.sensor = RaySensor(target_pos, ws_size)
+    elif config['sensor_mode'] == 'analytic':
+      self.sensor = AnalyticSensor(target_pos, ws_size, Sensor(cam_pos, cam_up_vector, target_pos, ws_size))
+    else:
+      raise NotImplementedError
+    self.sensor_mode = config['sensor_mode']
 
     # Rest pose for arm
     rot = pb.getQuaternionFromEuler([0, np.pi, 0])
@@ -108,9 +129,34 @@ class PyBulletEnv(BaseEnv):
     self.reward_type = config['reward_type']
     self.object_type = config['object_type']
     self.hard_reset_freq = config['hard_reset_freq']
+    if config['soft_reset_mode'] not in ('template', 'robot'):
+      raise NotImplementedError
+    self.soft_reset_mode = config['soft_reset_mode']
     self.min_object_distance = config['min_object_distance']
     self.min_boarder_padding = config['min_boarder_padding']
     self.deconstruct_init_offset = config['deconstruct_init_offset']
+    self.settle_mode = config['settle_mode']
+    self.settle_chunk_size = config['settle_chunk_size']
+    self.settle_velocity = config['settle_velocity']
+    if config['execution_mode'] not in ('arm', 'teleport'):
+      raise NotImplementedError
+    self.execution_mode = config['execution_mode']
+    if config['reset_mode'] == 'generate':
+      self.scene_library = None
+    elif config['reset_mode'] == 'library':
+      self.scene_library = scene_library.SceneLibrary(config['scene_library'], self.getSceneLibraryMetadata())
+    else:
+      raise NotImplementedError
+    self.reset_mode = config['reset_mode']
+    if config['random_object_collision'] not in ('mesh', 'simplified'):
+      raise NotImplementedError
+    self.random_object_collision = config['random_object_collision']
+    if config['object_pool']:
+      self.object_pool = ObjectPool(config['object_pool_scale_bucket'], config['object_pool_capacity'])
+    else:
+      self.object_pool = None
+    # Number of simulation steps used by the last wait
+    self.settle_steps = 0
 
     self.episode_count = -1
     self.table_id = None
@@ -120,10 +166,21 @@ class PyBulletEnv(BaseEnv):
     self.last_obj = None
     self.state = {}
     self.pb_state = None
+    self.snapshots = SnapshotStore(config['snapshot_capacity'], on_evict=self._freeSnapshot)
+    # pybullet state saved at the end of initialize, restored by the soft resets
+    self.template_state = None
+    # Ids of the bodies in the template state, a restored state must have the same bodies as the saved one
+    self.template_bodies = None
 
   def initialize(self):
     ''''''
     pb.resetSimulation()
+    scene_snapshot.invalidate()
+    # Resetting the simulation removes all saved pybullet states, bodies and shapes
+    self.snapshots.clear(free=False)
+    random_object.clearShapeCache()
+    if self.object_pool is not None:
+      self.object_pool.clear()
     pb.setPhysicsEngineParameter(numSubSteps=0,
                                  numSolverIterations=self.num_solver_iterations,
                                  solverResidualThreshold=self.solver_residual_threshold,
@@ -137,6 +194,8 @@ class PyBulletEnv(BaseEnv):
 
     # Load the UR5 and set it to the home positions
     self.robot.initialize()
+    if self.execution_mode == 'teleport':
+      self.robot.disableCollisions()
 
     # Reset episode vars
     self.objects = list()
@@ -147,17 +206,43 @@ class PyBulletEnv(BaseEnv):
     self.last_action = None
 
     # Step simulation
-    pb.stepSimulation()
+    scene_snapshot.stepSimulation()
+    if self.soft_reset_mode == 'template':
+      self.template_state = pb.saveState()
+      self.template_bodies = pybullet_util.getBodyIds()
 
-  def resetPybulletEnv(self):
+  def resetPybulletEnv(self, settle=True):
+    '''
+    Args:
+      - settle: Generate the random objects and settle the scene, which also settles the robot when there are no
+                random objects. Scenes of the scene library are loaded settled.
+    '''
     # soft reset has bug in older pybullet versions. 2.7,1 works good
     self.episode_count += 1
-    if self.episode_count % self.hard_reset_freq == 0:
+    hard_reset = self.episode_count % self.hard_reset_freq == 0
+    if hard_reset:
       self.initialize()
       self.episode_count = 0
 
-    for o in self.objects:
-      pb.removeBody(o.object_id)
+    # pybullet hands out the ids of removed bodies last removed first. Removing the objects in reverse order gives
+    # the new objects the same ids, and so the same solver order, as after a hard reset
+    objects = reversed(self.objects) if self.soft_reset_mode == 'template' else self.objects
+    for o in objects:
+      self._freeObject(o)
+    if not hard_reset:
+      # The snapshots of the last episode refer to the removed objects
+      self.snapshots.clear()
+      if self.soft_reset_mode == 'template' and pybullet_util.getBodyIds() == self.template_bodies:
+        pb.restoreState(self.template_state)
+        scene_snapshot.invalidate()
+        self.robot.resetMotors()
+      elif self.soft_reset_mode == 'template':
+        # The object pool parked or removed bodies since the template was saved, save it again with them
+        self.robot.resetMotors()
+        self.robot.reset()
+        pb.removeState(self.template_state)
+        self.template_state = pb.saveState()
+        self.template_bodies = pybullet_util.getBodyIds()
     self.robot.reset()
     self.objects = list()
     self.object_types = {}
@@ -168,7 +253,7 @@ class PyBulletEnv(BaseEnv):
     self.state = {}
     self.pb_state = None
 
-    while True:
+    while settle:
       try:
         self._generateShapes(constants.RANDOM, self.num_random_objects, random_orientation=True)
       except Exception as e:
@@ -176,12 +261,53 @@ class PyBulletEnv(BaseEnv):
       else:
         break
 
-    pb.stepSimulation()
+    scene_snapshot.stepSimulation()
 
   def reset(self):
     self.resetPybulletEnv()
     return self._getObservation()
 
+  def resetFromSceneLibrary(self):
+    '''
+    Reset the env to a random scene of the scene library. The objects are loaded at their settled poses so
+    no positions are sampled and the scene is not settled.
+
+    Returns: List of the objects which are part of the structure in deconstruct envs
+    '''
+    self.resetPybulletEnv(settle=False)
+    structure_objs = list()
+    for handle, obj_type, is_structure in self.scene_library.loadScene(self.scene_library.sample(), self._createObject):
+      if self.physic_mode == 'slow':
+        pb.changeDynamics(handle.object_id, -1, linearDamping=0.04, angularDamping=0.04, restitution=0, contactStiffness=3000, contactDamping=100)
+      self.objects.append(handle)
+      self.object_types[handle] = obj_type
+      if is_structure:
+        structure_objs.append(handle)
+    scene_snapshot.stepSimulation()
+    return structure_objs
+
+  def getSceneLibraryMetadata(self):
+    '''
+    Get the env and object config a scene library of this env is generated with. A library can only be loaded by
+    envs with the same metadata.
+
+    Returns: Dict of the env class and the object config
+    '''
+    return {'env': type(self).__name__,
+            'num_objects': self.num_obj,
+            'object_type': self.object_type,
+            'object_scale_range': list(self.block_scale_range),
+            'random_orientation': bool(self.random_orientation),
+            'workspace': np.asarray(self.workspace).tolist()}
+
+  def getScene(self):
+    '''
+    Get the poses and scales of the objects to store the current scene in a scene library
+
+    Returns: Numpy array of scene_library.SCENE_DTYPE records
+    '''
+    return scene_library.getScene(self.objects, self.object_types)
+
   def step(self, action):
     self.takeAction(action)
     self.wait(100)
@@ -196,12 +322,16 @@ class PyBulletEnv(BaseEnv):
     return obs, reward, done
 
   def getStateDict(self):
+    '''
+    Get the env state which is not part of the pybullet state. The object handles are not copied, their
+    poses are stored in the pybullet state.
+    '''
     self.robot.saveState()
-    state = {'current_episode_steps': copy.deepcopy(self.current_episode_steps),
-             'objects': copy.deepcopy(self.objects),
-             'object_types': copy.deepcopy(self.object_types),
-             'heightmap': copy.deepcopy(self.heightmap),
-             'robot_state': copy.deepcopy(self.robot.state),
+    state = {'current_episode_steps': self.current_episode_steps,
+             'objects': list(self.objects),
+             'object_types': dict(self.object_types),
+             'heightmap': self.heightmap,
+             'robot_state': dict(self.robot.state),
              'random_state': np.random.get_state(),
              'last_action': self.last_action,
              'last_obj': self.last_obj
@@ -210,22 +340,49 @@ class PyBulletEnv(BaseEnv):
 
   def restoreStateDict(self, state):
     self.current_episode_steps = state['current_episode_steps']
-    self.objects = state['objects']
-    self.object_types = state['object_types']
+    self.objects = list(state['objects'])
+    self.object_types = dict(state['object_types'])
     self.heightmap = state['heightmap']
     self.last_action = state['last_action']
     self.last_obj = state['last_obj']
-    self.robot.state = state['robot_state']
+    self.robot.state = dict(state['robot_state'])
     self.robot.restoreState()
     np.random.set_state(state['random_state'])
 
-  def saveState(self):
+  def saveState(self, slot=None):
+    '''
+    Save a snapshot of the simulation and the env state. Snapshots are kept until they are evicted by newer
+    ones or the simulation is reset by a hard reset.
+
+    Args:
+      - slot: Slot to save the snapshot in, replacing the snapshot in it. A new numbered slot if None
+
+    Returns: The slot of the snapshot
+    '''
     self.pb_state = pb.saveState()
     self.state = self.getStateDict()
+    return self.snapshots.put((self.pb_state, self.state), slot)
+
+  def restoreState(self, slot=None):
+    '''
+    Restore a snapshot of the simulation and the env state
 
-  def restoreState(self):
+    Args:
+      - slot: Slot of the snapshot, the last saved snapshot if None
+
+    Returns: True if the snapshot was restored, False if the slot is empty or was evicted
+    '''
+    snapshot = self.snapshots.get(slot)
+    if snapshot is None:
+      return False
+    self.pb_state, self.state = snapshot
     pb.restoreState(self.pb_state)
+    scene_snapshot.invalidate()
     self.restoreStateDict(self.state)
+    return True
+
+  def _freeSnapshot(self, snapshot):
+    pb.removeState(snapshot[0])
 
   def saveEnvToFile(self, path):
     bullet_file = os.path.join(path, 'env.bullet')
@@ -239,6 +396,7 @@ class PyBulletEnv(BaseEnv):
     bullet_file = os.path.join(path, 'env.bullet')
     pickle_file = os.path.join(path, 'env.pickle')
     pb.restoreState(fileName=bullet_file)
+    scene_snapshot.invalidate()
     with open(pickle_file, 'rb') as f:
       state = pickle.load(f)
     self.restoreStateDict(state)
@@ -257,15 +415,21 @@ class PyBulletEnv(BaseEnv):
       if self.robot.holding_obj is None:
         if self.perfect_grasp and not self._checkPerfectGrasp(x, y, z, rot, self.objects):
           return
-        self.robot.pick(pos, rot_q, self.pick_pre_offset, dynamic=self.dynamic,
-                        objects=self.objects, simulate_grasp=self.simulate_grasp)
+        if self.execution_mode == 'teleport':
+          self.robot.teleportPick(pos, rot_q, objects=self.objects)
+        else:
+          self.robot.pick(pos, rot_q, self.pick_pre_offset, dynamic=self.dynamic,
+                          objects=self.objects, simulate_grasp=self.simulate_grasp)
     elif motion_primative == constants.PLACE_PRIMATIVE:
       obj = self.robot.holding_obj
       if self.robot.holding_obj is not None:
         if self.perfect_place and not self._checkPerfectPlace(x, y, z, rot, self.objects):
           return
-        self.robot.place(pos, rot_q, self.place_pre_offset,
-                         dynamic=self.dynamic, simulate_grasp=self.simulate_grasp)
+        if self.execution_mode == 'teleport':
+          self.robot.teleportPlace(pos, rot_q)
+        else:
+          self.robot.place(pos, rot_q, self.place_pre_offset,
+                           dynamic=self.dynamic, simulate_grasp=self.simulate_grasp)
     elif motion_primative == constants.PUSH_PRIMATIVE:
       pass
     else:
@@ -303,9 +467,39 @@ class PyBulletEnv(BaseEnv):
     return True
 
   def wait(self, iteration):
+    '''
+    Step the simulation to let the scene settle. In the adaptive settle mode the simulation is stepped
+    in chunks and stops as soon as the objects are at rest.
+
+    Args:
+      - iteration: Number of simulation steps, the max number of steps in the adaptive settle mode
+
+    Returns: Number of simulation steps taken
+    '''
     # if not self.simulate_grasp and self._isHolding():
     #   return
-    [pb.stepSimulation() for _ in range(iteration)]
+    if self.settle_mode == 'fixed':
+      [scene_snapshot.stepSimulation() for _ in range(iteration)]
+      self.settle_steps = iteration
+      return iteration
+
+    steps = 0
+    while steps < iteration:
+      chunk_size = min(self.settle_chunk_size, iteration - steps)
+      [scene_snapshot.stepSimulation() for _ in range(chunk_size)]
+      steps += chunk_size
+      if self._isSceneAtRest():
+        break
+    self.settle_steps = steps
+    return steps
+
+  def _isSceneAtRest(self):
+    '''
+    Check if the linear and angular velocities of all objects which are not held are below the settle
+    velocity. The robot and the held object are not checked, they keep moving until the next action.
+    '''
+    velocities = [pb.getBaseVelocity(obj.object_id) for obj in self.objects if not self._isObjectHeld(obj)]
+    return not velocities or np.abs(velocities).max() <= self.settle_velocity
 
   def didBlockFall(self):
     if self.last_action is None:
@@ -349,54 +543,23 @@ class PyBulletEnv(BaseEnv):
     return self._isHolding(), in_hand_img, self.heightmap.reshape([1, self.heightmap_size, self.heightmap_size])
 
   def _getHeightmap(self):
+    if self.sensor_mode == 'analytic':
+      return self.sensor.getHeightmap(self.heightmap_size, self.objects)
     return self.sensor.getHeightmap(self.heightmap_size)
 
   def _getValidPositions(self, border_padding, min_distance, existing_positions, num_shapes, sample_range=None):
-    existing_positions_copy = copy.deepcopy(existing_positions)
-    sample_range = copy.deepcopy(sample_range)
-    valid_positions = list()
-    for i in range(num_shapes):
-      # Generate random drop config
-      x_extents = self.workspace[0][1] - self.workspace[0][0]
-      y_extents = self.workspace[1][1] - self.workspace[1][0]
-
-      is_position_valid = False
-      for j in range(100):
-        if is_position_valid:
-          break
-        if sample_range:
-          sample_range[0][0] = max(sample_range[0][0], self.workspace[0][0]+border_padding/2)
-          sample_range[0][1] = min(sample_range[0][1], self.workspace[0][1]-border_padding/2)
-          sample_range[1][0] = max(sample_range[1][0], self.workspace[1][0]+border_padding/2)
-          sample_range[1][1] = min(sample_range[1][1], self.workspace[1][1]-border_padding/2)
-          position = [(sample_range[0][1] - sample_range[0][0]) * npr.random_sample() + sample_range[0][0],
-                      (sample_range[1][1] - sample_range[1][0]) * npr.random_sample() + sample_range[1][0]]
-        else:
-          position = [(x_extents - border_padding) * npr.random_sample() + self.workspace[0][0] + border_padding / 2,
-                      (y_extents - border_padding) * npr.random_sample() + self.workspace[1][0] +  border_padding / 2]
-
-        if self.pos_candidate is not None:
-          position[0] = self.pos_candidate[0][np.abs(self.pos_candidate[0] - position[0]).argmin()]
-          position[1] = self.pos_candidate[1][np.abs(self.pos_candidate[1] - position[1]).argmin()]
-          if not (self.workspace[0][0]+border_padding/2 < position[0] < self.workspace[0][1]-border_padding/2 and
-                  self.workspace[1][0]+border_padding/2 < position[1] < self.workspace[1][1]-border_padding/2):
-            continue
-
-        if existing_positions_copy:
-          distances = np.array(list(map(lambda p: np.linalg.norm(np.array(p)-position), existing_positions_copy)))
-          is_position_valid = np.all(distances > min_distance)
-          # is_position_valid = np.all(np.sum(np.abs(np.array(positions) - np.array(position[:-1])), axis=1) > min_distance)
-        else:
-          is_position_valid = True
-      if is_position_valid:
-        existing_positions_copy.append(position)
-        valid_positions.append(position)
-      else:
-        break
-    if len(valid_positions) == num_shapes:
-      return valid_positions
+    workspace_range = [[self.workspace[0][0] + border_padding / 2, self.workspace[0][1] - border_padding / 2],
+                       [self.workspace[1][0] + border_padding / 2, self.workspace[1][1] - border_padding / 2]]
+    if sample_range:
+      sample_range = [[max(sample_range[0][0], workspace_range[0][0]), min(sample_range[0][1], workspace_range[0][1])],
+                      [max(sample_range[1][0], workspace_range[1][0]), min(sample_range[1][1], workspace_range[1][1])]]
+      padding = 0
     else:
-      raise NoValidPositionException
+      sample_range = self.workspace[:2]
+      padding = border_padding
+    return placement.sampleValidPositions(sample_range, min_distance, existing_positions, num_shapes,
+                                          padding=padding, pos_candidate=self.pos_candidate,
+                                          candidate_range=workspace_range)
 
   def _getValidOrientation(self, random_orientation):
     if random_orientation:
@@ -468,20 +631,7 @@ class PyBulletEnv(BaseEnv):
       if not scale:
         scale = npr.choice(np.arange(self.block_scale_range[0], self.block_scale_range[1]+0.01, 0.02))
 
-      if shape_type == constants.CUBE:
-        handle = pb_obj_generation.generateCube(position, orientation, scale)
-      elif shape_type == constants.BRICK:
-        handle = pb_obj_generation.generateBrick(position, orientation, scale)
-      elif shape_type == constants.TRIANGLE:
-        handle = pb_obj_generation.generateTriangle(position, orientation, scale)
-      elif shape_type == constants.ROOF:
-        handle = pb_obj_generation.generateRoof(position, orientation, scale)
-      elif shape_type == constants.CYLINDER:
-        handle = pb_obj_generation.generateCylinder(position, orientation, scale)
-      elif shape_type == constants.RANDOM:
-        handle = pb_obj_generation.generateRandomObj(position, orientation, scale, z_scale)
-      else:
-        raise NotImplementedError
+      handle = self._createObject(shape_type, position, orientation, scale, z_scale)
       if self.physic_mode == 'slow':
         pb.changeDynamics(handle.object_id, -1, linearDamping=0.04, angularDamping=0.04, restitution=0, contactStiffness=3000, contactDamping=100)
       shape_handles.append(handle)
@@ -493,6 +643,49 @@ class PyBulletEnv(BaseEnv):
     self.wait(50)
     return shape_handles
 
+  def _createObject(self, shape_type, pos, rot, scale, z_scale=1):
+    '''
+    Create an object, re-activating a parked body of the object pool if the pool is enabled
+
+    Args:
+      - shape_type: Shape type of the object
+      - pos: Position of the object
+      - rot: Orientation of the object as quaternion
+      - scale: Scale of the object
+      - z_scale: Additional scale along the z axis of random objects
+
+    Returns: The object
+    '''
+    if self.object_pool is not None:
+      return self.object_pool.getObject(shape_type, pos, rot, scale, z_scale,
+                                        self.random_object_collision == 'simplified')
+
+    if shape_type == constants.CUBE:
+      return pb_obj_generation.generateCube(pos, rot, scale)
+    elif shape_type == constants.BRICK:
+      return pb_obj_generation.generateBrick(pos, rot, scale)
+    elif shape_type == constants.TRIANGLE:
+      return pb_obj_generation.generateTriangle(pos, rot, scale)
+    elif shape_type == constants.ROOF:
+      return pb_obj_generation.generateRoof(pos, rot, scale)
+    elif shape_type == constants.CYLINDER:
+      return pb_obj_generation.generateCylinder(pos, rot, scale)
+    elif shape_type == constants.RANDOM:
+      return pb_obj_generation.generateRandomObj(pos, rot, scale, z_scale,
+                                                 self.random_object_collision == 'simplified')
+    else:
+      raise NotImplementedError
+
+  def _freeObject(self, obj):
+    '''
+    Remove an object from the simulation, or park it in the object pool if the pool is enabled
+    '''
+    if self.object_pool is not None:
+      self.object_pool.release(obj)
+    else:
+      pb.removeBody(obj.object_id)
+    scene_snapshot.invalidate()
+
   def getObjects(self):
     objs = list()
     for obj in self.objects:
@@ -501,26 +694,31 @@ class PyBulletEnv(BaseEnv):
       objs.append(obj)
     return objs
 
+  def getContactGraph(self):
+    '''
+    Get the bodies in contact with each other in the current scene. The graph is built from a single sweep over
+    the contact points the first time it is needed after the scene changed, e.g. once per step.
+
+    Returns: dict of body id -> set of the ids of the bodies in contact with it, including the table
+    '''
+    return scene_snapshot.getSnapshot().contact_graph
+
   def getObjectPoses(self, objects=None):
     if objects is None: objects = self.objects
 
-    obj_poses = list()
-    for obj in objects:
-      if self._isObjectHeld(obj):
-        continue
-      pos, rot = obj.getPose()
-      rot = self.convertQuaternionToEuler(rot)
-
-      obj_poses.append(pos + rot)
-    return np.array(obj_poses)
+    object_ids = [obj.object_id for obj in objects if not self._isObjectHeld(obj)]
+    if not object_ids:
+      return np.array(list())
+    snapshot = scene_snapshot.getSnapshot(*object_ids)
+    rows = snapshot.getRows(object_ids)
+    return np.concatenate((snapshot.positions[rows], snapshot.euler_rotations[rows]), axis=1)
 
   def getObjectPositions(self, omit_hold=True):
-    obj_positions = list()
-    for obj in self.objects:
-      if omit_hold and self._isObjectHeld(obj):
-        continue
-      obj_positions.append(obj.getPosition())
-    return np.array(obj_positions)
+    object_ids = [obj.object_id for obj in self.objects if not (omit_hold and self._isObjectHeld(obj))]
+    if not object_ids:
+      return np.array(list())
+    snapshot = scene_snapshot.getSnapshot(*object_ids)
+    return snapshot.positions[snapshot.getRows(object_ids)]
 
   def _getHoldingObj(self):
     return self.robot.holding_obj
@@ -542,7 +740,7 @@ class PyBulletEnv(BaseEnv):
 
   def _removeObject(self, obj):
     if obj in self.objects:
-      pb.removeBody(obj.object_id)
+      self._freeObject(obj)
       # self._moveObjectOutWorkspace(obj)
       self.objects.remove(obj)
       self.robot.openGripper()
@@ -554,41 +752,41 @@ class PyBulletEnv(BaseEnv):
   def _isObjOnTop(self, obj, objects=None):
     if not objects:
       objects = self.objects
-    obj_position = obj.getPosition()
-    for o in objects:
-      if self._isObjectHeld(o) or o is obj:
-        continue
-      block_position = o.getPosition()
-      if np.allclose(block_position[:-1], obj_position[:-1],
-                     atol=self.block_original_size * self.block_scale_range[0] * 2 / 3) and \
-          block_position[-1] > obj_position[-1]:
-        return False
-    return True
+    object_ids = [o.object_id for o in objects if not (self._isObjectHeld(o) or o is obj)]
+    if not object_ids:
+      return True
+    snapshot = scene_snapshot.getSnapshot(obj.object_id, *object_ids)
+    obj_position = snapshot.positions[snapshot.rows[obj.object_id]]
+    block_positions = snapshot.positions[snapshot.getRows(object_ids)]
+    is_above = np.all(np.isclose(block_positions[:, :-1], obj_position[:-1],
+                                 atol=self.block_original_size * self.block_scale_range[0] * 2 / 3), axis=1) & \
+               (block_positions[:, -1] > obj_position[-1])
+    return not is_above.any()
 
   def _isObjOnGround(self, obj):
-    contact_points = obj.getContactPoints()
-    for p in contact_points:
-      if p[2] == self.table_id:
-        return True
-    return False
+    return scene_snapshot.getSnapshot().isTouching(obj.object_id, self.table_id)
 
   def _getNumTopBlock(self, blocks=None):
     if not blocks:
       blocks = self.objects
-    cluster_pos = []
-    for obj in blocks:
-      if self._isObjectHeld(obj):
-        continue
-      block_position = obj.getPosition()
-      cluster_flag = False
-      for cluster in cluster_pos:
-        if np.allclose(block_position[:-1], cluster, atol=self.block_original_size*self.block_scale_range[0]*2/3):
-          cluster.append(block_position[:-1])
-          cluster_flag = True
+    object_ids = [obj.object_id for obj in blocks if not self._isObjectHeld(obj)]
+    if not object_ids:
+      return self._isHolding()
+    snapshot = scene_snapshot.getSnapshot(*object_ids)
+    xy = snapshot.positions[snapshot.getRows(object_ids), :-1]
+    # is_close[i, j]: np.allclose(xy[i], xy[j]), computed for all pairs at once
+    atol = self.block_original_size * self.block_scale_range[0] * 2 / 3
+    is_close = np.all(np.abs(xy[:, None] - xy[None]) <= atol + 1e-5 * np.abs(xy[None]), axis=2)
+    # Greedily add each block to the first cluster all of whose blocks it is close to
+    clusters = []
+    for i in range(len(object_ids)):
+      for cluster in clusters:
+        if is_close[i, cluster].all():
+          cluster.append(i)
           break
-      if not cluster_flag:
-        cluster_pos.append([block_position[:-1]])
-    return len(cluster_pos) + self._isHolding()
+      else:
+        clusters.append([i])
+    return len(clusters) + self._isHolding()
 
   def _checkStack(self, objects=None):
     if not objects:
@@ -598,19 +796,49 @@ class PyBulletEnv(BaseEnv):
         return False
 
     objects = sorted(objects, key=lambda o: o.getZPosition())
+    snapshot = scene_snapshot.getSnapshot()
     for i, obj in enumerate(objects):
       if i == 0:
         continue
       #TODO: not 100% sure about this
-      if not obj.isTouching(objects[i-1]) or obj.isTouching(PybulletObject(-1, self.table_id)):
+      if not snapshot.isTouching(obj.object_id, objects[i-1].object_id) or \
+          snapshot.isTouching(obj.object_id, self.table_id):
         return False
     return True
 
+  def _getSpatialIndex(self, objects=None, num_dims=3):
+    '''
+    Get the spatial index of the positions of objects in the current scene
+
+    Args:
+      - objects: The objects, the indices of the index are the indices in this list. Defaults to all objects
+      - num_dims: 3 to index the positions, 2 to index the xy positions
+
+    Returns: The SpatialIndex
+    '''
+    if objects is None:
+      objects = self.objects
+    object_ids = [obj.object_id for obj in objects]
+    return scene_snapshot.getSnapshot(*object_ids).getSpatialIndex(object_ids, num_dims)
+
+  def _getNearestObject(self, pos, objects=None):
+    '''
+    Get the object nearest to a position, the first one of the objects at the same distance
+
+    Args:
+      - pos: [x, y, z] position
+      - objects: The objects. Defaults to all objects
+
+    Returns: The nearest object
+    '''
+    if objects is None:
+      objects = self.objects
+    return objects[self._getSpatialIndex(objects).nearest(pos)]
+
   def _checkPerfectGrasp(self, x, y, z, rot, objects):
-    end_pos = np.array([x, y, z])
-    sorted_obj = sorted(objects, key=lambda o: np.linalg.norm(end_pos - o.getPosition()))
-    obj_pos, obj_rot = sorted_obj[0].getPose()
-    obj_type = self.object_types[sorted_obj[0]]
+    nearest_obj = self._getNearestObject([x, y, z], objects)
+    obj_pos, obj_rot = nearest_obj.getPose()
+    obj_type = self.object_types[nearest_obj]
     obj_rot = pb.getEulerFromQuaternion(obj_rot)
     angle = np.pi - np.abs(np.abs(rot - obj_rot[2]) - np.pi)
     if obj_type is constants.CUBE:
@@ -623,10 +851,9 @@ class PyBulletEnv(BaseEnv):
     return angle < np.pi / 12
 
   def _checkPerfectPlace(self, x, y, z, rot, objects):
-    end_pos = np.array([x, y, z])
-    sorted_obj = sorted(objects, key=lambda o: np.linalg.norm(end_pos - o.getPosition()))
-    obj_pos, obj_rot = sorted_obj[0].getPose()
-    obj_type = self.object_types[sorted_obj[0]]
+    nearest_obj = self._getNearestObject([x, y, z], objects)
+    obj_pos, obj_rot = nearest_obj.getPose()
+    obj_type = self.object_types[nearest_obj]
     obj_rot = pb.getEulerFromQuaternion(obj_rot)
     angle = np.pi - np.abs(np.abs(rot - obj_rot[2]) - np.pi)
     if angle > np.pi/2:
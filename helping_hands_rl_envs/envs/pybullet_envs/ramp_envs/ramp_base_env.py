@@ -4,6 +4,7 @@ from helping_hands_rl_envs.envs.pybullet_envs.pybullet_env import PyBulletEnv
 from helping_hands_rl_envs.simulators.constants import NoValidPositionException
 from helping_hands_rl_envs.simulators import constants
 from helping_hands_rl_envs.simulators.pybullet.utils import pybullet_util
+from helping_hands_rl_envs.simulators.pybullet.utils import scene_snapshot
 from helping_hands_rl_envs.simulators.pybullet.utils import transformations
 import numpy.random as npr
 import numpy as np
@@ -36,6 +37,16 @@ class RampBaseEnv(PyBulletEnv):
     self.ramp1_id = -1
     self.ramp2_id = -1
 
+  def resetPybulletEnv(self, settle=True):
+    # The soft reset restores the simulation state saved before the ramps were loaded
+    if self.ramp1_id > -1:
+      pb.removeBody(self.ramp1_id)
+    if self.ramp2_id > -1:
+      pb.removeBody(self.ramp2_id)
+    self.ramp1_id = -1
+    self.ramp2_id = -1
+    super().resetPybulletEnv(settle)
+
   def resetRamp(self):
     self.ramp_rz = -np.pi / 2 + np.random.random_sample() * np.pi
     self.ramp1_dist_to_center = np.random.random() * (self.max_ramp_dist - self.min_ramp_dist) + self.min_ramp_dist
@@ -64,6 +75,8 @@ class RampBaseEnv(PyBulletEnv):
                                  self.ramp2_height],
                                 pb.getQuaternionFromEuler([-self.ramp2_angle, 0, self.ramp_rz + np.pi]),
                                 globalScaling=1)
+    # The ramps may re-use the ids of removed bodies
+    scene_snapshot.invalidate()
   
   def getY1Y2fromX(self, x):
     y1 = np.tan(self.ramp_rz) * x - np.tan(self.ramp_rz) * (self.workspace[0].mean() - self.ramp1_dist_to_center / np.sin(self.ramp_rz))
@@ -42,13 +42,16 @@ class RandomPickingEnv(PyBulletEnv):
     self.obj_grasped = 0
     return self._getObservation()
 
-  def saveState(self):
-    super(RandomPickingEnv, self).saveState()
+  def saveState(self, slot=None):
+    slot = super(RandomPickingEnv, self).saveState(slot)
     self.state['obj_grasped'] = deepcopy(self.obj_grasped)
+    return slot
 
-  def restoreState(self):
-    super(RandomPickingEnv, self).restoreState()
+  def restoreState(self, slot=None):
+    if not super(RandomPickingEnv, self).restoreState(slot):
+      return False
     self.obj_grasped = self.state['obj_grasped']
+    return True
 
   def _checkTermination(self):
     ''''''
@@ -0,0 +1,86 @@
+from collections import OrderedDict
+
+class SnapshotStore(object):
+  '''
+  Bounded store of env snapshots in named or numbered slots. Once more than capacity snapshots are
+  stored the least recently saved or restored one is evicted and passed to on_evict, which frees
+  the resources held by it, e.g. the pybullet state.
+
+  Args:
+    - capacity: Max number of snapshots kept, unbounded if None
+    - on_evict: Function called with each snapshot which is evicted, overwritten or removed
+  '''
+  def __init__(self, capacity=None, on_evict=None):
+    self.capacity = capacity
+    self.on_evict = on_evict
+    self.snapshots = OrderedDict()
+    self.next_slot = 0
+    self.last_slot = None
+
+  def __len__(self):
+    return len(self.snapshots)
+
+  def __contains__(self, slot):
+    return slot in self.snapshots
+
+  def put(self, snapshot, slot=None):
+    '''
+    Store a snapshot
+
+    Args:
+      - snapshot: Snapshot to store
+      - slot: Slot to store the snapshot in, replacing the snapshot in it. A new numbered slot if None
+
+    Returns: The slot of the snapshot
+    '''
+    if slot is None:
+      slot = self.next_slot
+      self.next_slot += 1
+    elif slot in self.snapshots:
+      self._free(self.snapshots.pop(slot))
+
+    self.snapshots[slot] = snapshot
+    self.last_slot = slot
+    while self.capacity is not None and len(self.snapshots) > self.capacity:
+      self._free(self.snapshots.popitem(last=False)[1])
+    return slot
+
+  def get(self, slot=None):
+    '''
+    Get a snapshot and mark it as recently used
+
+    Args:
+      - slot: Slot of the snapshot, the last saved slot if None
+
+    Returns: The snapshot, None if the slot is empty or was evicted
+    '''
+    if slot is None:
+      slot = self.last_slot
+    if slot not in self.snapshots:
+      return None
+    self.snapshots.move_to_end(slot)
+    return self.snapshots[slot]
+
+  def remove(self, slot):
+    '''
+    Remove the snapshot in a slot
+    '''
+    if slot in self.snapshots:
+      self._free(self.snapshots.pop(slot))
+
+  def clear(self, free=True):
+    '''
+    Remove all snapshots
+
+    Args:
+      - free: Pass the snapshots to on_evict. Set to False if their resources are already gone.
+    '''
+    if free:
+      for snapshot in self.snapshots.values():
+        self._free(snapshot)
+    self.snapshots.clear()
+    self.last_slot = None
+
+  def _free(self, snapshot):
+    if self.on_evict is not None:
+      self.on_evict(snapshot)
@@ -0,0 +1,113 @@
+import numpy as np
+import numpy.random as npr
+
+from helping_hands_rl_envs.simulators.constants import NoValidPositionException
+
+# Number of candidates of a position checked one by one before the remaining ones are checked at once
+SCALAR_ATTEMPTS = 8
+
+def isPackingFeasible(sample_range, min_distance, num_shapes):
+  '''
+  Quick necessary condition for placing num_shapes positions in sample_range which are more than min_distance
+  apart: the disks with diameter min_distance around the positions do not overlap and lie inside of sample_range
+  grown by min_distance / 2, so their total area can not be larger than the area of the grown range.
+
+  Args:
+    - sample_range: [[x_min, x_max], [y_min, y_max]] range of the positions
+    - min_distance: Min distance between two positions
+    - num_shapes: Number of positions
+
+  Returns: False if the positions can not be placed, True if they might be
+  '''
+  if num_shapes <= 1 or min_distance <= 0:
+    return True
+  width = abs(sample_range[0][1] - sample_range[0][0]) + min_distance
+  height = abs(sample_range[1][1] - sample_range[1][0]) + min_distance
+  return num_shapes * np.pi * (min_distance / 2) ** 2 <= width * height
+
+def sampleValidPositions(sample_range, min_distance, existing_positions, num_shapes, num_attempts=100,
+                         padding=0, pos_candidate=None, candidate_range=None, to_int=False):
+  '''
+  Sample num_shapes [x, y] positions uniformly in sample_range shrunk by padding / 2 on each side, which are more
+  than min_distance away from the existing positions and from each other. The first SCALAR_ATTEMPTS candidates of
+  a position are checked one by one, as one of them is valid in most scenes. If none is, the remaining candidates
+  are drawn and checked at once and the first valid one is used. Only the random numbers up to the used candidate
+  are consumed, so the positions and the random number stream are the same as when drawing and checking the
+  candidates one after the other.
+
+  Args:
+    - sample_range: [[x_min, x_max], [y_min, y_max]] range of the positions
+    - min_distance: Min distance between two positions
+    - existing_positions: Positions to keep away from, only their x and y are used
+    - num_shapes: Number of positions
+    - num_attempts: Max number of candidates of each position
+    - padding: Padding of the positions to the borders of sample_range
+    - pos_candidate: [x_candidates, y_candidates] to snap the positions to
+    - candidate_range: [[x_min, x_max], [y_min, y_max]] open range the snapped positions must lie in
+    - to_int: Truncate the candidates to integers before snapping them
+
+  Returns: List of the [x, y] positions, raises NoValidPositionException if they could not be sampled
+  '''
+  lower = np.array([sample_range[0][0], sample_range[1][0]])
+  extents = np.array([sample_range[0][1], sample_range[1][1]]) - lower - padding
+  if pos_candidate is not None:
+    pos_candidate = [np.asarray(pos_candidate[0]), np.asarray(pos_candidate[1])]
+    if candidate_range is not None:
+      for axis in range(2):
+        if not np.any((pos_candidate[axis] > candidate_range[axis][0]) &
+                      (pos_candidate[axis] < candidate_range[axis][1])):
+          raise NoValidPositionException
+  elif not isPackingFeasible(np.stack((lower, lower + extents), axis=1), min_distance, num_shapes):
+    raise NoValidPositionException
+
+  def sampleCandidates(num_candidates):
+    positions = extents * npr.random_sample((num_candidates, 2)) + lower + padding / 2
+    if to_int:
+      positions = np.trunc(positions)
+    is_valid = np.ones(num_candidates, dtype=bool)
+    if pos_candidate is not None:
+      for axis in range(2):
+        candidates = pos_candidate[axis]
+        positions[:, axis] = candidates[np.abs(candidates[None] - positions[:, axis:axis+1]).argmin(1)]
+        if candidate_range is not None:
+          is_valid &= (candidate_range[axis][0] < positions[:, axis]) & \
+                      (positions[:, axis] < candidate_range[axis][1])
+    if placed:
+      offsets = positions[:, None] - np.array(placed)[None]
+      is_valid &= np.all((offsets * offsets).sum(2) > min_distance_sq, axis=1)
+    return positions, is_valid
+
+  def sampleCandidate():
+    # numpy calls on a single candidate cost more than the candidate check, use python floats instead
+    x = x_extent * npr.random_sample() + x_min + padding / 2
+    y = y_extent * npr.random_sample() + y_min + padding / 2
+    if to_int:
+      x, y = float(int(x)), float(int(y))
+    return np.array([x, y]), all((x - px) * (x - px) + (y - py) * (y - py) > min_distance_sq for px, py in placed)
+
+  (x_extent, y_extent), (x_min, y_min) = extents.tolist(), lower.tolist()
+  placed = [tuple(p[:2]) for p in existing_positions]
+  min_distance_sq = min_distance ** 2
+  valid_positions = list()
+  for i in range(num_shapes):
+    is_valid = False
+    num_scalar_attempts = min(SCALAR_ATTEMPTS if pos_candidate is None else 0, num_attempts)
+    for j in range(num_scalar_attempts):
+      position, is_valid = sampleCandidate()
+      if is_valid:
+        break
+    if not is_valid and num_attempts > num_scalar_attempts:
+      # Saving and restoring the state of the random number generator costs as much as checking tens of candidates
+      state = npr.get_state()
+      positions, is_valid = sampleCandidates(num_attempts - num_scalar_attempts)
+      if not is_valid.any():
+        raise NoValidPositionException
+      position = positions[is_valid.argmax()]
+      # Rewind the random number stream to right after the used candidate
+      npr.set_state(state)
+      npr.random_sample(2 * (is_valid.argmax() + 1))
+    elif not is_valid:
+      raise NoValidPositionException
+    placed.append(tuple(position))
+    valid_positions.append((position.astype(int) if to_int else position).tolist())
+  return valid_positions
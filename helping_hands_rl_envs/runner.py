@@ -1,114 +1,368 @@
+import asyncio
+import ctypes
+import time
 import numpy as np
-from multiprocessing import Process, Pipe
+from collections import deque
+from multiprocessing import Process, Pipe, RawArray
+from multiprocessing.connection import wait
 import os
-import git
+import pybullet as pb
 import helping_hands_rl_envs
+from helping_hands_rl_envs.simulators.pybullet.utils import pybullet_util
 
-def worker(remote, parent_remote, env_fn, planner_fn=None):
+class SharedObsBuffer(object):
   '''
-  Worker function which interacts with the environment over remote
+  Batched observation arrays backed by shared memory. Row i holds the latest observation
+  written by env i so the MultiRunner can read all observations without copying them
+  over the pipes.
+
+  Args:
+    - num_envs: Number of environments writing into the buffer
+    - in_hand_shape: Shape of a single in-hand image
+    - heightmap_shape: Shape of a single heightmap
+  '''
+  def __init__(self, num_envs, in_hand_shape, heightmap_shape):
+    self.num_envs = num_envs
+    self.in_hand_shape = tuple(in_hand_shape)
+    self.heightmap_shape = tuple(heightmap_shape)
+
+    self._states = RawArray(ctypes.c_double, num_envs)
+    self._in_hands = RawArray(ctypes.c_double, num_envs * int(np.prod(self.in_hand_shape)))
+    self._heightmaps = RawArray(ctypes.c_double, num_envs * int(np.prod(self.heightmap_shape)))
+    self._createViews()
+
+  def _createViews(self):
+    self.states = np.frombuffer(self._states, dtype=np.float64)
+    self.in_hands = np.frombuffer(self._in_hands, dtype=np.float64).reshape((self.num_envs, *self.in_hand_shape))
+    self.heightmaps = np.frombuffer(self._heightmaps, dtype=np.float64).reshape((self.num_envs, *self.heightmap_shape))
+
+  def __getstate__(self):
+    # The numpy views are rebuilt on the other side, only the shared arrays are transferred
+    state = self.__dict__.copy()
+    del state['states'], state['in_hands'], state['heightmaps']
+    return state
+
+  def __setstate__(self, state):
+    self.__dict__.update(state)
+    self._createViews()
+
+  def write(self, env_idx, obs):
+    '''
+    Write the observation of a single environment into its row
+
+    Args:
+      - env_idx: Row of the environment
+      - obs: (state, in_hand, heightmap) tuple returned by the environment
+    '''
+    state, in_hand, heightmap = obs
+    self.states[env_idx] = state
+    self.in_hands[env_idx] = in_hand
+    self.heightmaps[env_idx] = heightmap
+
+  def read(self, env_idxs=None):
+    '''
+    Read the batched observations. The rows are copied out of the shared memory, which is
+    overwritten by the next command sent to the workers.
+
+    Args:
+      - env_idxs: Rows to read, all rows if None
+
+    Returns: (states, in_hands, heightmaps)
+    '''
+    if env_idxs is None:
+      return self.states.copy(), self.in_hands.copy(), self.heightmaps.copy()
+    env_idxs = np.asarray(env_idxs)
+    return self.states[env_idxs], self.in_hands[env_idxs], self.heightmaps[env_idxs]
+
+def _packObs(obs, obs_buffer, env_idx, env_cache=None):
+  '''
+  Write the observation into the shared buffer when one is used, only the (empty)
+  placeholder is then sent over the pipe. The observation is kept as the latest
+  observation of the env in env_cache.
+  '''
+  if env_cache is not None:
+    env_cache['obs'] = obs
+  if obs_buffer is None:
+    return obs
+  obs_buffer.write(env_idx, obs)
+  return None
+
+def _stackObsBlock(obs):
+  '''
+  Stack the observations of the envs hosted by a worker into a single block. Observations
+  written to the shared buffer are left as placeholders.
+  '''
+  if obs[0] is None:
+    return None
+  states, hand_obs, obs = zip(*obs)
+  return np.stack(states).astype(float), np.stack(hand_obs), np.stack(obs)
+
+def _activateEnv(env):
+  '''
+  Route the default pybullet client to the env when several envs share a worker
+  '''
+  client = getattr(env, 'client', None)
+  if client is not None:
+    pybullet_util.setActiveClient(client)
+
+# Commands which do not send a reply back to the MultiRunner
+NO_REPLY_CMDS = ('set_pos_candidate', 'save_to_file')
+# Commands which reply with (obs, rewards, dones, ...[, metadata])
+STEP_CMDS = ('step', 'step_auto_reset', 'step_with_planner')
+
+def stepWithPlanner(env, planner, auto_reset=False):
+  '''
+  Take the next planner action in the environment
+
+  Returns: (obs, reward, done, action, steps_left[, metadata]). steps_left is computed before
+           the env is reset when auto_reset is set.
+  '''
+  if not planner:
+    raise ValueError('Attempting to use a planner which was not initialized.')
+  action = planner.getNextAction()
+  res = env.step(action)
+  steps_left = planner.getStepsLeft()
+  if auto_reset and res[2]:
+    res = (env.reset(), *res[1:])
+  return (res[0], res[1], res[2], action, steps_left, *res[3:])
+
+def collectExpertTransitions(env, planner, num_steps, obs):
+  '''
+  Take num_steps planner actions in the environment, resetting it whenever an episode is done
+
+  Args:
+    - env: Environment to collect the transitions in
+    - planner: Planner of the environment
+    - num_steps: Number of transitions to collect
+    - obs: Current observation of the environment
+
+  Returns: ((states, hand_obs, obs), actions, rewards, (next_states, next_hand_obs, next_obs), dones, steps_left)
+           with num_steps rows each, and the observation to continue from
+  '''
+  transitions = list()
+  for _ in range(num_steps):
+    next_obs, reward, done, action, steps_left = stepWithPlanner(env, planner)[:5]
+    transitions.append((obs, action, reward, next_obs, done, steps_left))
+    obs = env.reset() if done else next_obs
+
+  obs_batch, actions, rewards, next_obs_batch, dones, steps_left = zip(*transitions)
+  batch = (_stackObsBlock(obs_batch), np.stack(actions), np.array(rewards), _stackObsBlock(next_obs_batch),
+           np.array(dones).astype(np.float32), np.array(steps_left))
+  return batch, obs
+
+def _disconnectEnv(env):
+  '''
+  Disconnect the physics clients of an environment which is being replaced
+  '''
+  envs = env.envs if hasattr(env, 'envs') else [env]
+  for e in envs:
+    client = getattr(e, 'client', None)
+    if client is not None:
+      pb.disconnect(physicsClientId=client)
+
+def reconfigureEnv(env, env_num, simulator, env_type, env_config, planner_config):
+  '''
+  Replace an environment with a new one of the given type and config within the same process.
+  The physics client of the old env is reused when both envs are single pybullet envs.
+
+  Args:
+    - env: Environment to replace
+    - env_num: Index of the env in the MultiRunner, used to offset the seed
+    - simulator: String indicating the type of simulator to use
+    - env_type: String indicating the type of environment to create
+    - env_config: Dict containing intialization arguments for the env
+    - planner_config: Dict containing intialization arguments for the planner
+
+  Returns: (env, planner)
+  '''
+  # Imported here as env_factory imports this module
+  from helping_hands_rl_envs import env_factory
+
+  env_config = env_factory.getEnvConfig(env_type, env_config, env_num)
+  client = getattr(env, 'client', None)
+  if simulator == 'pybullet' and env_type != 'multi_task' and not hasattr(env, 'envs') and client is not None:
+    env_config['client'] = client
+  else:
+    _disconnectEnv(env)
+
+  env = env_factory.getEnvFn(simulator, env_type)(env_config)
+  planner = env_factory.getPlannerFn(env_type, planner_config)(env) if planner_config else None
+  return env, planner
+
+def runCommand(cmd, data, env, planner, obs_buffer=None, env_idx=0, env_cache=None):
+  '''
+  Run a single MultiRunner command on an environment
+
+  Args:
+    - cmd: Command name
+    - data: Data sent along with the command
+    - env: Environment to run the command on
+    - planner: Planner of the environment
+    - obs_buffer: SharedObsBuffer to write observations into
+    - env_idx: Row of the environment in the obs_buffer
+    - env_cache: Dict the worker keeps for the environment between commands
+
+  Returns: Result of the command, None for commands in NO_REPLY_CMDS
+  '''
+  if env_cache is None:
+    env_cache = dict()
+
+  if cmd == 'step':
+    res = env.step(data)
+    return (_packObs(res[0], obs_buffer, env_idx, env_cache), *res[1:])
+  elif cmd == 'step_auto_reset':
+    res = env.step(data)
+    done = res[2]
+    if done:
+      # get observation after reset (res index 0), the rest stays the same
+      res = (env.reset(), *res[1:])
+    return (_packObs(res[0], obs_buffer, env_idx, env_cache), *res[1:])
+  elif cmd == 'step_with_planner':
+    auto_reset = data
+    res = stepWithPlanner(env, planner, auto_reset)
+    return (_packObs(res[0], obs_buffer, env_idx, env_cache), *res[1:])
+  elif cmd == 'collect_expert_transitions':
+    num_steps = data
+    if 'obs' not in env_cache:
+      env_cache['obs'] = env.reset()
+    batch, obs = collectExpertTransitions(env, planner, num_steps, env_cache['obs'])
+    _packObs(obs, obs_buffer, env_idx, env_cache)
+    return batch
+  elif cmd == 'reset':
+    obs = env.reset()
+    return _packObs(obs, obs_buffer, env_idx, env_cache)
+  elif cmd == 'get_obs':
+    action = data
+    if action is None:
+      action = env.last_action
+    obs = env._getObservation(action)
+    return _packObs(obs, obs_buffer, env_idx, env_cache)
+  elif cmd == 'get_spaces':
+    return (env.obs_shape, env.action_space, env.action_shape)
+  elif cmd == 'get_object_positions':
+    return env.getObjectPositions()
+  elif cmd == 'get_object_poses':
+    return env.getObjectPoses()
+  elif cmd == 'set_pos_candidate':
+    env.setPosCandidate(data)
+  elif cmd == 'did_block_fall':
+    return env.didBlockFall()
+  elif cmd == 'are_objects_in_workspace':
+    return env.areObjectsInWorkspace()
+  elif cmd == 'is_sim_valid':
+    return env.isSimValid()
+  elif cmd == 'get_step_left':
+    return planner.getStepLeft()
+  elif cmd == 'get_active_env_id':
+    return env.active_env_id
+  elif cmd == 'get_empty_in_hand':
+    return env.getEmptyInHand()
+  elif cmd == 'get_settle_steps':
+    return env.settle_steps
+  # TODO: Might remove this
+  elif cmd == 'get_env_id':
+    return env.active_env_id
+  elif cmd == 'get_next_action':
+    if planner:
+      return planner.getNextAction()
+    else:
+      raise ValueError('Attempting to use a planner which was not initialized.')
+  elif cmd == 'get_random_action':
+    if planner:
+      return planner.getRandomAction()
+    else:
+      raise ValueError('Attempting to use a planner which was not initialized.')
+  elif cmd == 'get_value':
+    if planner:
+      return planner.getValue()
+    else:
+      raise ValueError('Attempting to use a planner which was not initialized.')
+  elif cmd == 'get_steps_left':
+    if planner:
+      return planner.getStepsLeft()
+    else:
+      raise ValueError('Attempting to use a planner which was not initialized.')
+  elif cmd == 'save':
+    return env.saveState(data)
+  elif cmd == 'restore':
+    return env.restoreState(data)
+  elif cmd == 'save_to_file':
+    path = data
+    env.saveEnvToFile(path)
+  elif cmd == 'load_from_file':
+    try:
+      path = data
+      env.loadEnvFromFile(path)
+    except Exception as e:
+      print('MultiRunner worker load failed: {}'.format(e))
+      return False
+    else:
+      return True
+  else:
+    raise NotImplementedError
+
+def worker(remote, parent_remote, env_fns, planner_fns, obs_buffer=None, env_idxs=None):
+  '''
+  Worker function which interacts with its environments over remote. Each command
+  carries a list of (local env index, data) pairs and the worker replies with the
+  list of results for those envs. Observations are returned as pre-stacked blocks.
 
   Args:
     - remote: Worker remote connection
     - parent_remote: MultiRunner remote connection
-    - env_fn: Function which creates a deictic environment
+    - env_fns: Functions which create the deictic environments hosted by this worker
+    - planner_fns: Functions which create the planners for the environments
+    - obs_buffer: SharedObsBuffer to write observations into, observations are sent over the pipe if None
+    - env_idxs: Rows of the environments in the obs_buffer
   '''
   parent_remote.close()
 
-  env = env_fn()
-  if planner_fn:
-    planner = planner_fn(env)
-  else:
-    planner = None
+  envs = list()
+  planners = list()
+  # The envs seed the global numpy random state, keep a separate copy of it for each env
+  random_states = list()
+  for env_fn, planner_fn in zip(env_fns, planner_fns):
+    env = env_fn()
+    envs.append(env)
+    planners.append(planner_fn(env) if planner_fn else None)
+    random_states.append(np.random.get_state())
+  env_caches = [dict() for _ in envs]
+  if env_idxs is None:
+    env_idxs = list(range(len(envs)))
 
   try:
     while True:
       cmd, data = remote.recv()
-      if cmd == 'step':
-        res = env.step(data)
-        remote.send(res)
-      elif cmd == 'step_auto_reset':
-        res = env.step(data)
-        done = res[2]
-        if done:
-          # get observation after reset (res index 0), the rest stays the same
-          res = (env.reset(), *res[1:])
-        remote.send(res)
-      elif cmd == 'reset':
-        obs = env.reset()
-        remote.send(obs)
-      elif cmd == 'get_obs':
-        action = data
-        if action is None:
-          action = env.last_action
-        obs = env._getObservation(action)
-        remote.send(obs)
-      elif cmd == 'get_spaces':
-        remote.send((env.obs_shape, env.action_space, env.action_shape))
-      elif cmd == 'get_object_positions':
-        remote.send(env.getObjectPositions())
-      elif cmd == 'get_object_poses':
-        remote.send(env.getObjectPoses())
-      elif cmd == 'set_pos_candidate':
-        env.setPosCandidate(data)
-      elif cmd == 'did_block_fall':
-        remote.send(env.didBlockFall())
-      elif cmd == 'are_objects_in_workspace':
-        remote.send(env.areObjectsInWorkspace())
-      elif cmd == 'is_sim_valid':
-        remote.send(env.isSimValid())
-      elif cmd == 'get_value':
-        remote.send(planner.getValue())
-      elif cmd == 'get_step_left':
-        remote.send(planner.getStepLeft())
-      elif cmd == 'get_active_env_id':
-        remote.send(env.active_env_id)
-      elif cmd == 'get_empty_in_hand':
-        remote.send(env.getEmptyInHand())
-      # TODO: Might remove this
-      elif cmd == 'get_env_id':
-        remote.send(env.active_env_id)
-      elif cmd == 'get_next_action':
-        if planner:
-          remote.send(planner.getNextAction())
-        else:
-          raise ValueError('Attempting to use a planner which was not initialized.')
-      elif cmd == 'get_random_action':
-        if planner:
-          remote.send(planner.getRandomAction())
-        else:
-          raise ValueError('Attempting to use a planner which was not initialized.')
-      elif cmd == 'get_value':
-        if planner:
-          remote.send(planner.getValue())
-        else:
-          raise ValueError('Attempting to use a planner which was not initialized.')
-      elif cmd == 'get_steps_left':
-        if planner:
-          remote.send(planner.getStepsLeft())
-        else:
-          raise ValueError('Attempting to use a planner which was not initialized.')
-      elif cmd == 'save':
-        env.saveState()
-      elif cmd == 'restore':
-        env.restoreState()
-      elif cmd == 'save_to_file':
-        path = data
-        env.saveEnvToFile(path)
-      elif cmd == 'load_from_file':
-        try:
-          path = data
-          env.loadEnvFromFile(path)
-        except Exception as e:
-          print('MultiRunner worker load failed: {}'.format(e))
-          remote.send(False)
-        else:
-          remote.send(True)
-      elif cmd == 'close':
+      if cmd == 'close':
         remote.close()
         break
+      elif cmd == 'reconfigure':
+        for i, env_data in data:
+          _activateEnv(envs[i])
+          envs[i], planners[i] = reconfigureEnv(envs[i], env_idxs[i], *env_data)
+          random_states[i] = np.random.get_state()
+          env_caches[i] = dict()
+        remote.send([True] * len(data))
+        continue
+
+      results = list()
+      for i, env_data in data:
+        if len(envs) > 1:
+          _activateEnv(envs[i])
+          np.random.set_state(random_states[i])
+        results.append(runCommand(cmd, env_data, envs[i], planners[i], obs_buffer, env_idxs[i], env_caches[i]))
+        if len(envs) > 1:
+          random_states[i] = np.random.get_state()
+
+      if cmd in NO_REPLY_CMDS:
+        continue
+      elif cmd in STEP_CMDS:
+        res = tuple(zip(*results))
+        remote.send((_stackObsBlock(res[0]), *res[1:]))
+      elif cmd in ('reset', 'get_obs'):
+        remote.send(_stackObsBlock(results))
       else:
-        raise NotImplementerError
+        remote.send(results)
   except KeyboardInterrupt:
     print('MultiRunner worker: caught keyboard interrupt')
 
@@ -118,26 +372,267 @@ class MultiRunner(object):
   and communicates with them via pipe
 
   Args:
+    - env_fns: Functions which create the environments
+    - planner_fns: Functions which create the planners
+    - obs_shapes: (in_hand_shape, heightmap_shape) tuple. If given, the workers write their observations
+                  into a shared memory buffer instead of sending them over the pipes
+    - envs_per_worker: Number of environments hosted by each worker process
+    - timeout: Max number of seconds to wait for the reply of a worker. Workers which die or do not
+               reply in time are restarted, wait forever for workers which are alive if None
   '''
-  def __init__(self, env_fns, planner_fns):
+  def __init__(self, env_fns, planner_fns, obs_shapes=None, envs_per_worker=1, timeout=None):
     self.waiting = False
     self.closed = False
 
-    num_envs = len(env_fns)
-    self.remotes, self.worker_remotes = zip(*[Pipe() for _ in range(num_envs)])
-    self.processes = [Process(target=worker, args=(worker_remote, remote, env_fn, planner_fn))
-                      for (worker_remote, remote, env_fn, planner_fn) in zip(self.worker_remotes, self.remotes, env_fns, planner_fns)]
+    self.env_fns = env_fns
+    self.planner_fns = planner_fns
+    self.num_envs = len(env_fns)
+    self.envs_per_worker = envs_per_worker
+    self.timeout = timeout
+    if obs_shapes is not None:
+      self.obs_buffer = SharedObsBuffer(self.num_envs, *obs_shapes)
+    else:
+      self.obs_buffer = None
+
+    # Envs [i * envs_per_worker, (i+1) * envs_per_worker) are hosted by worker i
+    self.worker_env_idxs = [list(range(i, min(i + envs_per_worker, self.num_envs)))
+                            for i in range(0, self.num_envs, envs_per_worker)]
+    num_workers = len(self.worker_env_idxs)
+
+    # Envs stepped by step_async which have not been returned by poll yet, per worker message
+    self.pending_envs = set()
+    self.pending_msgs = [deque() for _ in range(num_workers)]
+    self.pending_times = [deque() for _ in range(num_workers)]
+
+    # Last command sent to each worker, used to recover its reply if the worker has to be restarted
+    self.last_cmds = [None] * num_workers
+    self.reconfig_data = None
+    # Whether the step replies of each worker carry metadata, so replacement replies can match them
+    self.step_metadata = [False] * num_workers
+    # Flags marking the envs restarted during the last command
+    self.restarted = np.zeros(self.num_envs, dtype=bool)
+
+    self.remotes = list()
+    self.processes = list()
+    for worker_idx in range(num_workers):
+      remote, process = self._startWorker(worker_idx)
+      self.remotes.append(remote)
+      self.processes.append(process)
     self.num_processes = len(self.processes)
 
-    for process in self.processes:
-      process.daemon = True
-      process.start()
-    for remote in self.worker_remotes:
-      remote.close()
-
     #self.remotes[0].send(('get_spaces', None))
     #self.obs_shape, self.action_space, self.action_shape = self.remotes[0].recv()
 
+  def _startWorker(self, worker_idx):
+    '''
+    Start the process of a worker
+
+    Returns: (remote, process)
+    '''
+    env_idxs = self.worker_env_idxs[worker_idx]
+    remote, worker_remote = Pipe()
+    process = Process(target=worker, args=(worker_remote, remote,
+                                           [self.env_fns[i] for i in env_idxs],
+                                           [self.planner_fns[i] for i in env_idxs],
+                                           self.obs_buffer, env_idxs))
+    process.daemon = True
+    process.start()
+    worker_remote.close()
+    return remote, process
+
+  def _restartWorker(self, worker_idx):
+    '''
+    Kill a worker which died or hung and respawn it. Its envs are recreated with their
+    original seeds, reconfigured if the runner was reconfigured and reset.
+
+    Returns: Observation block of the reset envs of the worker
+    '''
+    process = self.processes[worker_idx]
+    if process.is_alive():
+      # SIGKILL as hung workers might not handle SIGTERM
+      process.kill()
+    process.join()
+    self.remotes[worker_idx].close()
+
+    self.remotes[worker_idx], self.processes[worker_idx] = self._startWorker(worker_idx)
+    env_idxs = self.worker_env_idxs[worker_idx]
+    self.restarted[env_idxs] = True
+
+    local_idxs = range(len(env_idxs))
+    if self.reconfig_data is not None:
+      self.remotes[worker_idx].send(('reconfigure', [(i, self.reconfig_data) for i in local_idxs]))
+      self._recvRestarted(worker_idx)
+    self.remotes[worker_idx].send(('reset', [(i, None) for i in local_idxs]))
+    return self._recvRestarted(worker_idx)
+
+  def _recvRestarted(self, worker_idx):
+    '''
+    Receive the reply of a freshly restarted worker. Failing again is not recovered from.
+    '''
+    remote = self.remotes[worker_idx]
+    try:
+      if remote.poll(self.timeout):
+        return remote.recv()
+    except (EOFError, OSError):
+      pass
+    raise RuntimeError('MultiRunner worker {} failed again after being restarted.'.format(worker_idx))
+
+  def _recoverReply(self, worker_idx):
+    '''
+    Restart a failed worker and build a replacement for the reply to its last command. Steps
+    return the reset obs with zero reward and done set, resets return the reset obs and
+    all other commands are resent to the restarted worker.
+    '''
+    cmd, data = self.last_cmds[worker_idx]
+    reset_block = self._restartWorker(worker_idx)
+    local_idxs = [local_idx for local_idx, _ in data]
+
+    if cmd in ('reset', 'get_obs'):
+      return self._selectObsBlock(reset_block, local_idxs)
+    elif cmd in ('step', 'step_auto_reset'):
+      num_envs = len(local_idxs)
+      reply = (self._selectObsBlock(reset_block, local_idxs), (0.,) * num_envs, (True,) * num_envs)
+      if self.step_metadata[worker_idx]:
+        reply += (({},) * num_envs,)
+      return reply
+    elif cmd == 'reconfigure':
+      # The restarted worker was already reconfigured
+      return [True] * len(data)
+    else:
+      self.remotes[worker_idx].send((cmd, data))
+      return self._recordReply(worker_idx, self._recvRestarted(worker_idx))
+
+  def _recordReply(self, worker_idx, reply):
+    '''
+    Record whether the step replies of a worker carry metadata
+
+    Returns: The reply
+    '''
+    cmd = self.last_cmds[worker_idx][0]
+    if cmd in STEP_CMDS:
+      self.step_metadata[worker_idx] = len(reply) > (5 if cmd == 'step_with_planner' else 3)
+    return reply
+
+  @staticmethod
+  def _padMetadata(results, num_fields):
+    '''
+    Add an empty metadata dict for each env to the replies without metadata when other replies
+    of the batch have metadata, e.g. the replacement reply of a restarted worker, so the batch keeps its shape
+
+    Args:
+      - results: Step replies of the workers
+      - num_fields: Number of fields of a reply with metadata
+
+    Returns: List of the replies
+    '''
+    if all(len(res) < num_fields for res in results):
+      return results
+    return [res if len(res) == num_fields else (*res, ({},) * len(res[1])) for res in results]
+
+  @staticmethod
+  def _selectObsBlock(obs_block, local_idxs):
+    '''
+    Select the rows of the given local envs from an observation block
+    '''
+    if obs_block is None:
+      return None
+    return tuple(obs[local_idxs] for obs in obs_block)
+
+  def _recvWorker(self, worker_idx):
+    '''
+    Receive the reply of a worker to its last command. Workers which died or did not
+    reply within the timeout are restarted and a replacement reply is returned.
+    '''
+    remote = self.remotes[worker_idx]
+    try:
+      ready = wait([remote, self.processes[worker_idx].sentinel], self.timeout)
+      if remote in ready:
+        return self._recordReply(worker_idx, remote.recv())
+    except (EOFError, OSError):
+      pass
+    return self._recoverReply(worker_idx)
+
+  def reconfigure(self, env_type, env_config, planner_config={}, simulator='pybullet'):
+    '''
+    Replace the environments with new ones of the given type and config. The worker
+    processes are kept alive and reuse their physics clients where possible.
+
+    Args:
+      - env_type: String indicating the type of environment to create
+      - env_config: Dict containing intialization arguments for the env
+      - planner_config: Dict containing intialization arguments for the planner
+      - simulator: String indicating the type of simulator to use
+    '''
+    self._sendReconfigure(env_type, env_config, planner_config, simulator)
+    self._recv()
+
+  def _sendReconfigure(self, env_type, env_config, planner_config, simulator):
+    '''
+    Check the new env config and send the reconfigure command to the workers
+    '''
+    # Imported here as env_factory imports this module
+    from helping_hands_rl_envs import env_factory
+
+    if self.obs_buffer is not None:
+      in_hand_shape, heightmap_shape = env_factory.getObsShapes(env_type, env_config)
+      if in_hand_shape != self.obs_buffer.in_hand_shape or heightmap_shape != self.obs_buffer.heightmap_shape:
+        raise ValueError('The new env config changes the observation shapes of the shared memory buffer.')
+
+    self.reconfig_data = (simulator, env_type, env_config, planner_config)
+    self.step_metadata = [False] * self.num_processes
+    self._broadcast('reconfigure', self.reconfig_data)
+
+  def _send(self, cmd, env_data, env_nums=None):
+    '''
+    Send a command to the workers hosting the given envs
+
+    Args:
+      - cmd: Command name
+      - env_data: Sequence with the data for each env in env_nums
+      - env_nums: Envs to run the command on, all envs if None
+
+    Returns: Dict mapping the indices of the workers the command was sent to onto their envs, in order
+    '''
+    if env_nums is None:
+      env_nums = range(self.num_envs)
+
+    worker_data = dict()
+    worker_envs = dict()
+    for env_num, data in zip(env_nums, env_data):
+      worker_idx, local_idx = divmod(int(env_num), self.envs_per_worker)
+      worker_data.setdefault(worker_idx, list()).append((local_idx, data))
+      worker_envs.setdefault(worker_idx, list()).append(int(env_num))
+
+    if cmd not in STEP_CMDS and any(self.pending_msgs[i] for i in worker_envs):
+      raise RuntimeError('Attempting to send \'{}\' to a worker with pending async steps. '
+                         'Call poll until all steps are returned first.'.format(cmd))
+
+    self.restarted[:] = False
+    for worker_idx, data in worker_data.items():
+      self.last_cmds[worker_idx] = (cmd, data)
+      try:
+        self.remotes[worker_idx].send((cmd, data))
+      except (BrokenPipeError, OSError):
+        # The worker died, its reply is recovered when it is received
+        pass
+    return worker_envs
+
+  def _broadcast(self, cmd, data=None):
+    '''
+    Send a command with the same data to every env
+
+    Returns: Dict mapping the indices of the workers the command was sent to onto their envs, in order
+    '''
+    return self._send(cmd, [data] * self.num_envs)
+
+  def _recv(self, worker_idxs=None):
+    '''
+    Receive the per-env results of the last command, concatenated over the workers
+    '''
+    if worker_idxs is None:
+      worker_idxs = range(self.num_processes)
+    return [res for worker_idx in worker_idxs for res in self._recvWorker(worker_idx)]
+
   def step(self, actions, auto_reset=False):
     '''
     Step the environments synchronously.
@@ -155,13 +650,185 @@ class MultiRunner(object):
     Args:
       - actions: Numpy variable of environment actions
     '''
-    for remote, action in zip(self.remotes, actions):
-      if auto_reset:
-        remote.send(('step_auto_reset', action))
-      else:
-        remote.send(('step', action))
+    if self.pending_envs:
+      raise RuntimeError('Attempting to step all envs while async steps are pending. Call poll first.')
+    if auto_reset:
+      self._send('step_auto_reset', actions)
+    else:
+      self._send('step', actions)
     self.waiting = True
 
+  def stepWithPlanner(self, auto_reset=False):
+    '''
+    Take the next planner action in each environment. Computing the action, executing it and
+    getting the steps left is done with a single message to each worker.
+
+    Args:
+      - auto_reset: Reset the envs which are done, the returned obs is then the one after the reset
+
+    Returns: (obs, rewards, dones, actions, steps_left)
+      - obs: Numpy vector of observations
+      - rewards: Numpy vector of rewards
+      - dones: Numpy vector of 0/1 flags indicating if episode is done
+      - actions: Numpy vector of the planner actions which were taken
+      - steps_left: Numpy vector of the planner steps left after the actions
+    '''
+    if self.pending_envs:
+      raise RuntimeError('Attempting to step all envs while async steps are pending. Call poll first.')
+    self._broadcast('step_with_planner', auto_reset)
+    results = [self._recvWorker(i) for i in range(self.num_processes)]
+    return self._stackPlannerStepResults(results)
+
+  def _stackPlannerStepResults(self, results):
+    '''
+    Batch the step_with_planner results received from the workers
+
+    Returns: (obs, rewards, dones, actions, steps_left[, metadata])
+    '''
+    res = tuple(zip(*self._padMetadata(results, 6)))
+    obs, rewards, dones, actions, steps_left = res[:5]
+
+    states, hand_obs, obs = self._stackObs(obs)
+    rewards = np.concatenate(rewards)
+    dones = np.concatenate(dones).astype(np.float32)
+    actions = np.concatenate(actions)
+    steps_left = np.concatenate(steps_left)
+
+    if len(res) == 6:
+      return (states, hand_obs, obs), rewards, dones, actions, steps_left, sum(res[5], ())
+    else:
+      return (states, hand_obs, obs), rewards, dones, actions, steps_left
+
+  def collectExpertTransitions(self, num_steps):
+    '''
+    Collect num_steps planner transitions in each environment within the workers and return them
+    in one batch. Episodes are reset when they are done. The transitions are always sent over the pipes.
+
+    Args:
+      - num_steps: Number of transitions to collect in each env
+
+    Returns: (obs, actions, rewards, next_obs, dones, steps_left), each with shape (num_envs, num_steps, ...)
+    '''
+    self._broadcast('collect_expert_transitions', num_steps)
+    return self._stackExpertTransitions(self._recv())
+
+  @staticmethod
+  def _stackExpertTransitions(batches):
+    '''
+    Batch the per-env transitions of collectExpertTransitions
+    '''
+    obs, actions, rewards, next_obs, dones, steps_left = zip(*batches)
+    obs = tuple(map(np.stack, zip(*obs)))
+    next_obs = tuple(map(np.stack, zip(*next_obs)))
+    return obs, np.stack(actions), np.stack(rewards), next_obs, np.stack(dones), np.stack(steps_left)
+
+  def step_async(self, env_nums, actions, auto_reset=False):
+    '''
+    Start stepping the given environments without waiting for them. The results are
+    collected with poll. Each env can only have a single step in flight.
+
+    Args:
+      - env_nums: Envs to step
+      - actions: Numpy variable of actions for the envs in env_nums
+      - auto_reset: Reset the envs which are done, the returned obs is then the one after the reset
+    '''
+    env_nums = [int(env_num) for env_num in env_nums]
+    if self.pending_envs.intersection(env_nums) or len(set(env_nums)) != len(env_nums):
+      raise ValueError('Attempting to step an env which already has a pending step.')
+
+    worker_envs = self._send('step_auto_reset' if auto_reset else 'step', actions, env_nums)
+    for worker_idx, envs in worker_envs.items():
+      self.pending_msgs[worker_idx].append(envs)
+      self.pending_times[worker_idx].append(time.time())
+    self.pending_envs.update(env_nums)
+
+  def poll(self, timeout=None, min_ready=1):
+    '''
+    Collect the results of envs stepped with step_async which have finished. Results are
+    returned in the order they are received, so the steps of each env stay in order.
+
+    Args:
+      - timeout: Max number of seconds to wait, wait until min_ready envs are done if None
+      - min_ready: Min number of envs to wait for, all pending envs if there are fewer
+
+    Returns: (env_nums, obs, rewards, dones[, metadata]), all empty if no env finished before the timeout
+      - env_nums: Numpy vector of the envs which finished
+      - obs: Numpy vector of observations
+      - rewards: Numpy vector of rewards
+      - dones: Numpy vector of 0/1 flags indicating if episode is done
+      - metadata: Tuple with the metadata of each env in env_nums, if any env returned metadata.
+                  Envs without metadata get an empty dict.
+    '''
+    deadline = None if timeout is None else time.time() + timeout
+    env_nums, obs, rewards, dones, metadata = list(), list(), list(), list(), list()
+    has_metadata = False
+    self.restarted[:] = False
+
+    while self.pending_envs and len(env_nums) < min_ready:
+      worker_idxs = [i for i, msgs in enumerate(self.pending_msgs) if msgs]
+      remaining = None if deadline is None else max(deadline - time.time(), 0)
+      if self.timeout is not None:
+        # Wake up in time to restart the worker whose oldest step runs out of time first
+        worker_remaining = max(min(self.pending_times[i][0] for i in worker_idxs) + self.timeout - time.time(), 0)
+        remaining = worker_remaining if remaining is None else min(remaining, worker_remaining)
+      ready = wait([self.remotes[i] for i in worker_idxs] +
+                   [self.processes[i].sentinel for i in worker_idxs], remaining)
+
+      for worker_idx in worker_idxs:
+        remote = self.remotes[worker_idx]
+        timed_out = self.timeout is not None and time.time() - self.pending_times[worker_idx][0] >= self.timeout
+        if remote in ready:
+          try:
+            res = self._recordReply(worker_idx, remote.recv())
+            envs = self.pending_msgs[worker_idx].popleft()
+            self.pending_times[worker_idx].popleft()
+          except (EOFError, OSError):
+            envs, res = self._recoverPending(worker_idx)
+        elif self.processes[worker_idx].sentinel in ready or timed_out:
+          envs, res = self._recoverPending(worker_idx)
+        else:
+          continue
+        self.pending_envs.difference_update(envs)
+
+        # Copy out the shared rows right away as the next step of these envs will overwrite them
+        obs.append(self.obs_buffer.read(envs) if self.obs_buffer is not None else res[0])
+        rewards.extend(res[1])
+        dones.extend(res[2])
+        # Keep metadata[i] aligned with env_nums[i] when only some replies carry metadata
+        if len(res) == 4:
+          metadata.extend(res[3])
+          has_metadata = True
+        else:
+          metadata.extend(({},) * len(envs))
+        env_nums.extend(envs)
+
+      if not ready and deadline is not None and time.time() >= deadline:
+        break
+
+    if not env_nums:
+      return np.zeros(0, dtype=int), (np.zeros(0), np.zeros(0), np.zeros(0)), np.zeros(0), np.zeros(0)
+
+    states, hand_obs, obs = map(np.concatenate, zip(*obs))
+    rewards = np.array(rewards)
+    dones = np.array(dones).astype(np.float32)
+    if has_metadata:
+      return np.array(env_nums), (states, hand_obs, obs), rewards, dones, tuple(metadata)
+    else:
+      return np.array(env_nums), (states, hand_obs, obs), rewards, dones
+
+  def _recoverPending(self, worker_idx):
+    '''
+    Restart a failed worker with pending async steps and build a single replacement reply
+    for all of them
+
+    Returns: (envs, reply)
+    '''
+    envs = [env_num for msg in self.pending_msgs[worker_idx] for env_num in msg]
+    self.pending_msgs[worker_idx].clear()
+    self.pending_times[worker_idx].clear()
+    self.last_cmds[worker_idx] = ('step', [(env_num % self.envs_per_worker, None) for env_num in envs])
+    return envs, self._recoverReply(worker_idx)
+
   def stepWait(self):
     '''
     Wait until each environment has completed its next step
@@ -171,24 +838,29 @@ class MultiRunner(object):
       - rewards: Numpy vector of rewards
       - dones: Numpy vector of 0/1 flags indicating if episode is done
     '''
-    results = [remote.recv() for remote in self.remotes]
+    results = [self._recvWorker(i) for i in range(self.num_processes)]
     self.waiting = False
+    return self._stackStepResults(results)
 
-    res = tuple(zip(*results))
+  def _stackStepResults(self, results):
+    '''
+    Batch the step results received from the workers
+
+    Returns: (obs, rewards, dones[, metadata])
+    '''
+    # Each worker returns (obs_block, rewards, dones[, metadata])
+    res = tuple(zip(*self._padMetadata(results, 4)))
 
     if len(res) == 3:
       metadata = None
       obs, rewards, dones = res
     else:
       obs, rewards, dones, metadata = res
+      metadata = sum(metadata, ())
 
-    states, hand_obs, obs = zip(*obs)
-
-    states = np.stack(states).astype(float)
-    hand_obs = np.stack(hand_obs)
-    obs = np.stack(obs)
-    rewards = np.stack(rewards)
-    dones = np.stack(dones).astype(np.float32)
+    states, hand_obs, obs = self._stackObs(obs)
+    rewards = np.concatenate(rewards)
+    dones = np.concatenate(dones).astype(np.float32)
 
     if metadata:
       return (states, hand_obs, obs), rewards, dones, metadata
@@ -201,35 +873,40 @@ class MultiRunner(object):
 
     Returns: Numpy vector of observations
     '''
-    for remote in self.remotes:
-      remote.send(('reset', None))
+    self._broadcast('reset')
 
-    obs = [remote.recv() for remote in self.remotes]
-    states, hand_obs, obs = zip(*obs)
-
-    states = np.stack(states).astype(float)
-    hand_obs = np.stack(hand_obs)
-    obs = np.stack(obs)
-
-    return (states, hand_obs, obs)
+    obs = [self._recvWorker(i) for i in range(self.num_processes)]
+    return self._stackObs(obs)
 
   def reset_envs(self, env_nums):
-    for env_num in env_nums:
-      self.remotes[env_num].send(('reset', None))
+    '''
+    Reset the given environments
 
-    obs = [self.remotes[env_num].recv() for env_num in env_nums]
-    states, hand_obs, obs = zip(*obs)
+    Returns: Numpy vector of observations in the order of env_nums
+    '''
+    env_nums = [int(env_num) for env_num in env_nums]
+    # Reset the envs in worker order and restore the requested order afterwards
+    sorted_env_nums = sorted(env_nums)
+    worker_envs = self._send('reset', [None] * len(sorted_env_nums), sorted_env_nums)
 
-    states = np.stack(states).astype(float)
-    hand_obs = np.stack(hand_obs)
-    obs = np.stack(obs)
+    obs = [self._recvWorker(worker_idx) for worker_idx in worker_envs]
+    return self._stackResetEnvsObs(obs, env_nums)
 
-    return (states, hand_obs, obs)
+  def _stackResetEnvsObs(self, obs, env_nums):
+    '''
+    Batch the observation blocks of reset_envs, which were reset in sorted order, in the order of env_nums
+    '''
+    if self.obs_buffer is not None:
+      return self._stackObs(obs, env_nums)
+
+    sorted_env_nums = sorted(env_nums)
+    states, hand_obs, obs = map(np.concatenate, zip(*obs))
+    order = [sorted_env_nums.index(env_num) for env_num in env_nums]
+    return states[order], hand_obs[order], obs[order]
 
   def getActiveEnvId(self):
-    for remote in self.remotes:
-      remote.send(('get_active_env_id', None))
-    active_env_id = [remote.recv() for remote in self.remotes]
+    self._broadcast('get_active_env_id')
+    active_env_id = self._recv()
     active_env_id = np.stack(active_env_id)
     return active_env_id
 
@@ -238,70 +915,90 @@ class MultiRunner(object):
     Close all worker processes
     '''
     self.closed = True
-    if self.waiting:
-      [remote.recv() for remote in self.remotes]
-    [remote.send(('close', None)) for remote in self.remotes]
-    [process.join() for process in self.processes]
+    for worker_idx, (remote, process) in enumerate(zip(self.remotes, self.processes)):
+      num_replies = len(self.pending_msgs[worker_idx]) + int(self.waiting)
+      try:
+        for _ in range(num_replies):
+          if not remote.poll(self.timeout):
+            break
+          remote.recv()
+        remote.send(('close', None))
+      except (EOFError, OSError):
+        pass
+    for process in self.processes:
+      process.join(self.timeout)
+      if process.is_alive():
+        process.terminate()
+        process.join()
 
-  def save(self):
+  def save(self, slot=None):
     '''
+    Save a snapshot of each environment
+
+    Args:
+      - slot: Slot to save the snapshots in, replacing the snapshots in it. New numbered slots if None
 
+    Returns: List with the slot of the snapshot of each env
     '''
-    for remote in self.remotes:
-      remote.send(('save', None))
+    self._broadcast('save', slot)
+    return self._recv()
 
-  def restore(self):
+  def restore(self, slot=None):
     '''
+    Restore a snapshot of each environment
 
+    Args:
+      - slot: Slot to restore or sequence with the slot of each env, the last saved snapshots if None
+
+    Returns: Numpy bool vector, False for the envs whose snapshot is not in the store (anymore)
     '''
-    for remote in self.remotes:
-      remote.send(('restore', None))
+    if isinstance(slot, (list, tuple, np.ndarray)):
+      self._send('restore', slot)
+    else:
+      self._broadcast('restore', slot)
+    return np.array(self._recv())
 
   def saveToFile(self, path):
     '''
 
     '''
-    for i, remote in enumerate(self.remotes):
-      p = os.path.join(path, str(i))
+    paths = [os.path.join(path, str(i)) for i in range(self.num_envs)]
+    for p in paths:
       if not os.path.exists(p):
         os.makedirs(p)
-      remote.send(('save_to_file', os.path.join(path, str(i))))
+    self._send('save_to_file', paths)
 
   def loadFromFile(self, path):
     '''
 
     '''
-    for i, remote in enumerate(self.remotes):
-      remote.send(('load_from_file', os.path.join(path, str(i))))
-    return np.array([remote.recv() for remote in self.remotes]).all()
+    self._send('load_from_file', [os.path.join(path, str(i)) for i in range(self.num_envs)])
+    return np.array(self._recv()).all()
 
   def getObjectPositions(self):
     '''
 
     '''
-    for remote in self.remotes:
-      remote.send(('get_object_positions', None))
+    self._broadcast('get_object_positions')
 
-    positions = [remote.recv() for remote in self.remotes]
+    positions = self._recv()
     return np.array(positions)
 
   def getObjectPoses(self):
     '''
 
     '''
-    for remote in self.remotes:
-      remote.send(('get_object_poses', None))
+    self._broadcast('get_object_poses')
 
-    poses = [remote.recv() for remote in self.remotes]
+    poses = self._recv()
     return np.array(poses)
 
   def getNextAction(self):
     '''
 
     '''
-    for remote in self.remotes:
-      remote.send(('get_next_action', None))
-    action = [remote.recv() for remote in self.remotes]
+    self._broadcast('get_next_action')
+    action = self._recv()
     action = np.stack(action)
     return action
 
@@ -309,9 +1006,8 @@ class MultiRunner(object):
     '''
 
     '''
-    for remote in self.remotes:
-      remote.send(('get_random_action', None))
-    action = [remote.recv() for remote in self.remotes]
+    self._broadcast('get_random_action')
+    action = self._recv()
     action = np.stack(action)
     return action
 
@@ -319,9 +1015,8 @@ class MultiRunner(object):
     '''
 
     '''
-    for remote in self.remotes:
-      remote.send(('get_value', None))
-    values = [remote.recv() for remote in self.remotes]
+    self._broadcast('get_value')
+    values = self._recv()
     values = np.stack(values)
     return values
 
@@ -329,25 +1024,46 @@ class MultiRunner(object):
     '''
 
     '''
-    for remote in self.remotes:
-      remote.send(('get_steps_left', None))
-    values = [remote.recv() for remote in self.remotes]
+    self._broadcast('get_steps_left')
+    values = self._recv()
     values = np.stack(values)
     return values
 
+  def getSettleSteps(self):
+    '''
+    Get the number of simulation steps each env used to settle after its last action
+    '''
+    self._broadcast('get_settle_steps')
+    return np.array(self._recv())
+
   def getObs(self, action=None):
     '''
 
     '''
-    for remote in self.remotes:
-      remote.send(('get_obs', action))
+    self._broadcast('get_obs', action)
+
+    obs = [self._recvWorker(i) for i in range(self.num_processes)]
+    return self._stackObs(obs)
+
+  def _stackObs(self, obs, env_nums=None):
+    '''
+    Batch the observation blocks received from the workers. When using the shared memory
+    transport the observations are read from the shared buffer instead.
+
+    Args:
+      - obs: List of observation blocks received over the pipes
+      - env_nums: Envs the observations belong to, all envs if None
+
+    Returns: (states, hand_obs, obs)
+    '''
+    if self.obs_buffer is not None:
+      return self.obs_buffer.read(env_nums)
 
-    obs = [remote.recv() for remote in self.remotes]
     states, hand_obs, obs = zip(*obs)
 
-    states = np.stack(states).astype(float)
-    hand_obs = np.stack(hand_obs)
-    obs = np.stack(obs)
+    states = np.concatenate(states)
+    hand_obs = np.concatenate(hand_obs)
+    obs = np.concatenate(obs)
 
     return states, hand_obs, obs
 
@@ -355,9 +1071,8 @@ class MultiRunner(object):
     '''
 
     '''
-    for remote in self.remotes:
-      remote.send(('are_objects_in_workspace', None))
-    in_workspace = [remote.recv() for remote in self.remotes]
+    self._broadcast('are_objects_in_workspace')
+    in_workspace = self._recv()
     in_workspace = np.stack(in_workspace)
     return in_workspace
 
@@ -365,9 +1080,8 @@ class MultiRunner(object):
     '''
 
     '''
-    for remote in self.remotes:
-      remote.send(('is_sim_valid', None))
-    valid = [remote.recv() for remote in self.remotes]
+    self._broadcast('is_sim_valid')
+    valid = self._recv()
     valid = np.stack(valid)
     return valid
 
@@ -375,9 +1089,8 @@ class MultiRunner(object):
     '''
 
     '''
-    for remote in self.remotes:
-      remote.send(('did_block_fall', None))
-    did_block_fall = [remote.recv() for remote in self.remotes]
+    self._broadcast('did_block_fall')
+    did_block_fall = self._recv()
     did_block_fall = np.stack(did_block_fall)
     return did_block_fall
 
@@ -385,16 +1098,14 @@ class MultiRunner(object):
     '''
 
     '''
-    for remote in self.remotes:
-      remote.send(('set_pos_candidate', pos_candidate))
+    self._broadcast('set_pos_candidate', pos_candidate)
 
   def getEmptyInHand(self):
     '''
 
     '''
-    for remote in self.remotes:
-      remote.send(('get_empty_in_hand', None))
-    hand_obs = [remote.recv() for remote in self.remotes]
+    self._broadcast('get_empty_in_hand')
+    hand_obs = self._recv()
     hand_obs = np.stack(hand_obs)
     return hand_obs
 
@@ -403,9 +1114,308 @@ class MultiRunner(object):
     '''
 
     '''
+    # GitPython is slow to import and only needed here
+    import git
     repo = git.Repo(helping_hands_rl_envs.__path__[0])
     return repo.head.object.hexsha
 
+
+class AsyncMultiRunner(MultiRunner):
+  '''
+  MultiRunner with awaitable commands for use within an asyncio event loop. Replies are read
+  once the event loop reports the worker pipes as readable, so many runners can be driven
+  concurrently from a single loop without blocking it. Commands on the same runner are
+  serialized. Restarting failed workers and closing the runner run in the loop's default executor.
+  The blocking stepWait and the partial-batch step_async and poll are not supported. Requires an
+  event loop which supports add_reader (not the Windows proactor loop).
+
+  Args:
+    - env_fns: Functions which create the environments
+    - planner_fns: Functions which create the planners
+    - obs_shapes: (in_hand_shape, heightmap_shape) tuple. If given, the workers write their observations
+                  into a shared memory buffer instead of sending them over the pipes
+    - envs_per_worker: Number of environments hosted by each worker process
+    - timeout: Max number of seconds to wait for the reply of a worker. Workers which die or do not
+               reply in time are restarted, wait forever for workers which are alive if None
+  '''
+  def __init__(self, env_fns, planner_fns, obs_shapes=None, envs_per_worker=1, timeout=None):
+    super(AsyncMultiRunner, self).__init__(env_fns, planner_fns, obs_shapes, envs_per_worker, timeout)
+    self.lock = None
+
+  async def _recvWorkerAsync(self, worker_idx):
+    '''
+    Wait for the worker to reply or die without blocking the event loop and receive its reply.
+    Workers which died or did not reply within the timeout are restarted.
+    '''
+    remote = self.remotes[worker_idx]
+    try:
+      if not remote.poll():
+        loop = asyncio.get_running_loop()
+        readable = loop.create_future()
+        fds = [remote.fileno(), self.processes[worker_idx].sentinel]
+        for fd in fds:
+          loop.add_reader(fd, lambda: readable.done() or readable.set_result(None))
+        try:
+          await asyncio.wait_for(readable, self.timeout)
+        finally:
+          for fd in fds:
+            loop.remove_reader(fd)
+      # The remote is not readable if the worker died without replying
+      if remote.poll():
+        return self._recordReply(worker_idx, remote.recv())
+    except (asyncio.TimeoutError, EOFError, OSError):
+      pass
+    # Restarting blocks until the new worker has rebuilt and reset its envs, so it runs in a thread
+    return await asyncio.get_running_loop().run_in_executor(None, self._recoverReply, worker_idx)
+
+  async def _recvReplies(self, worker_idxs=None):
+    '''
+    Receive the raw reply of each worker
+    '''
+    if worker_idxs is None:
+      worker_idxs = range(self.num_processes)
+    return await asyncio.gather(*[self._recvWorkerAsync(i) for i in worker_idxs])
+
+  async def _command(self, cmd, data=None):
+    '''
+    Send a command with the same data to every env and receive the per-env results
+    '''
+    return await self._commandEnvs(cmd, [data] * self.num_envs)
+
+  async def _commandEnvs(self, cmd, env_data):
+    '''
+    Send a command with the given data for each env and receive the per-env results
+    '''
+    async with self._getLock():
+      worker_envs = self._send(cmd, env_data)
+      replies = await self._recvReplies(worker_envs)
+    return [res for reply in replies for res in reply]
+
+  def _getLock(self):
+    # The lock is created lazily so it belongs to the loop the runner is used from
+    if self.lock is None:
+      self.lock = asyncio.Lock()
+    return self.lock
+
+  async def step(self, actions, auto_reset=False):
+    '''
+    Step the environments.
+
+    Args:
+      - actions: Numpy variable of environment actions
+      - auto_reset: Reset the envs which are done, the returned obs is then the one after the reset
+
+    Returns: (obs, rewards, dones)
+    '''
+    async with self._getLock():
+      self.stepAsync(actions, auto_reset)
+      results = await self._recvReplies()
+      self.waiting = False
+      return self._stackStepResults(results)
+
+  async def stepWithPlanner(self, auto_reset=False):
+    '''
+    Take the next planner action in each environment.
+
+    Returns: (obs, rewards, dones, actions, steps_left)
+    '''
+    async with self._getLock():
+      self._broadcast('step_with_planner', auto_reset)
+      results = await self._recvReplies()
+      return self._stackPlannerStepResults(results)
+
+  async def reset(self):
+    '''
+    Reset each environment
+
+    Returns: Numpy vector of observations
+    '''
+    async with self._getLock():
+      self._broadcast('reset')
+      obs = await self._recvReplies()
+      return self._stackObs(obs)
+
+  async def reset_envs(self, env_nums):
+    '''
+    Reset the given environments
+
+    Returns: Numpy vector of observations in the order of env_nums
+    '''
+    env_nums = [int(env_num) for env_num in env_nums]
+    async with self._getLock():
+      worker_envs = self._send('reset', [None] * len(env_nums), sorted(env_nums))
+      obs = await self._recvReplies(worker_envs)
+      return self._stackResetEnvsObs(obs, env_nums)
+
+  async def save(self, slot=None):
+    '''
+    Save a snapshot of each environment
+
+    Args:
+      - slot: Slot to save the snapshots in, replacing the snapshots in it. New numbered slots if None
+
+    Returns: List with the slot of the snapshot of each env
+    '''
+    return await self._command('save', slot)
+
+  async def restore(self, slot=None):
+    '''
+    Restore a snapshot of each environment
+
+    Args:
+      - slot: Slot to restore or sequence with the slot of each env, the last saved snapshots if None
+
+    Returns: Numpy bool vector, False for the envs whose snapshot is not in the store (anymore)
+    '''
+    if not isinstance(slot, (list, tuple, np.ndarray)):
+      return np.array(await self._command('restore', slot))
+    return np.array(await self._commandEnvs('restore', slot))
+
+  async def collectExpertTransitions(self, num_steps):
+    '''
+    Collect num_steps planner transitions in each environment within the workers and return them
+    in one batch. Episodes are reset when they are done.
+
+    Args:
+      - num_steps: Number of transitions to collect in each env
+
+    Returns: (obs, actions, rewards, next_obs, dones, steps_left), each with shape (num_envs, num_steps, ...)
+    '''
+    return self._stackExpertTransitions(await self._command('collect_expert_transitions', num_steps))
+
+  async def reconfigure(self, env_type, env_config, planner_config={}, simulator='pybullet'):
+    '''
+    Replace the environments with new ones of the given type and config. The worker
+    processes are kept alive and reuse their physics clients where possible.
+
+    Args:
+      - env_type: String indicating the type of environment to create
+      - env_config: Dict containing intialization arguments for the env
+      - planner_config: Dict containing intialization arguments for the planner
+      - simulator: String indicating the type of simulator to use
+    '''
+    async with self._getLock():
+      self._sendReconfigure(env_type, env_config, planner_config, simulator)
+      await self._recvReplies()
+
+  async def saveToFile(self, path):
+    '''
+
+    '''
+    async with self._getLock():
+      super(AsyncMultiRunner, self).saveToFile(path)
+
+  async def loadFromFile(self, path):
+    '''
+
+    '''
+    paths = [os.path.join(path, str(i)) for i in range(self.num_envs)]
+    return np.array(await self._commandEnvs('load_from_file', paths)).all()
+
+  async def setPosCandidate(self, pos_candidate):
+    '''
+
+    '''
+    async with self._getLock():
+      super(AsyncMultiRunner, self).setPosCandidate(pos_candidate)
+
+  async def close(self):
+    '''
+    Close all worker processes. Waiting for the workers to exit runs in a thread.
+    '''
+    async with self._getLock():
+      await asyncio.get_running_loop().run_in_executor(None, super(AsyncMultiRunner, self).close)
+
+  def stepWait(self):
+    raise NotImplementedError('AsyncMultiRunner does not support blocking waits, await step instead.')
+
+  def step_async(self, env_nums, actions, auto_reset=False):
+    raise NotImplementedError('AsyncMultiRunner does not support partial-batch stepping, await step instead.')
+
+  def poll(self, timeout=None, min_ready=1):
+    raise NotImplementedError('AsyncMultiRunner does not support partial-batch stepping, await step instead.')
+
+  async def getObs(self, action=None):
+    '''
+
+    '''
+    async with self._getLock():
+      self._broadcast('get_obs', action)
+      obs = await self._recvReplies()
+      return self._stackObs(obs)
+
+  async def getNextAction(self):
+    '''
+
+    '''
+    return np.stack(await self._command('get_next_action'))
+
+  async def getRandomAction(self):
+    '''
+
+    '''
+    return np.stack(await self._command('get_random_action'))
+
+  async def getValue(self):
+    '''
+
+    '''
+    return np.stack(await self._command('get_value'))
+
+  async def getSettleSteps(self):
+    '''
+    Get the number of simulation steps each env used to settle after its last action
+    '''
+    return np.array(await self._command('get_settle_steps'))
+
+  async def getStepsLeft(self):
+    '''
+
+    '''
+    return np.stack(await self._command('get_steps_left'))
+
+  async def getActiveEnvId(self):
+    '''
+
+    '''
+    return np.stack(await self._command('get_active_env_id'))
+
+  async def getObjectPositions(self):
+    '''
+
+    '''
+    return np.array(await self._command('get_object_positions'))
+
+  async def getObjectPoses(self):
+    '''
+
+    '''
+    return np.array(await self._command('get_object_poses'))
+
+  async def areObjectsInWorkspace(self):
+    '''
+
+    '''
+    return np.stack(await self._command('are_objects_in_workspace'))
+
+  async def isSimValid(self):
+    '''
+
+    '''
+    return np.stack(await self._command('is_sim_valid'))
+
+  async def didBlockFall(self):
+    '''
+
+    '''
+    return np.stack(await self._command('did_block_fall'))
+
+  async def getEmptyInHand(self):
+    '''
+
+    '''
+    return np.stack(await self._command('get_empty_in_hand'))
+
 class SingleRunner(object):
   '''
   RL environment runner which runs a single environment
@@ -447,17 +1457,35 @@ class SingleRunner(object):
     '''
     return self.env.reset()
 
-  def save(self):
+  def stepWithPlanner(self, auto_reset=False):
     '''
+    Take the next planner action in the environment
 
+    Returns: (obs, reward, done, action, steps_left)
     '''
-    self.env.save()
+    return stepWithPlanner(self.env, self.planner, auto_reset)
 
-  def restore(self):
+  def save(self, slot=None):
     '''
+    Save a snapshot of the environment
 
+    Args:
+      - slot: Slot to save the snapshot in, replacing the snapshot in it. A new numbered slot if None
+
+    Returns: The slot of the snapshot
+    '''
+    return self.env.saveState(slot)
+
+  def restore(self, slot=None):
+    '''
+    Restore a snapshot of the environment
+
+    Args:
+      - slot: Slot of the snapshot, the last saved snapshot if None
+
+    Returns: True if the snapshot was restored, False if it is not in the store (anymore)
     '''
-    self.env.restore()
+    return self.env.restoreState(slot)
 
   def saveToFile(self, path):
     '''
@@ -510,6 +1538,12 @@ class SingleRunner(object):
     else:
       raise ValueError('Attempting to use a planner which was not initialized.')
 
+  def getSettleSteps(self):
+    '''
+    Get the number of simulation steps the env used to settle after the last action
+    '''
+    return self.env.settle_steps
+
   def getStepsLeft(self):
     '''
 
@@ -567,5 +1601,7 @@ class SingleRunner(object):
 
   @staticmethod
   def getEnvGitHash():
+    # GitPython is slow to import and only needed here
+    import git
     repo = git.Repo(helping_hands_rl_envs.__path__[0])
     return repo.head.object.hexsha
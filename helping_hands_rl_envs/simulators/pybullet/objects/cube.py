@@ -7,6 +7,7 @@ import os
 
 import helping_hands_rl_envs
 from helping_hands_rl_envs.simulators.pybullet.objects.pybullet_object import PybulletObject
+from helping_hands_rl_envs.simulators.pybullet.utils import convex_shape
 from helping_hands_rl_envs.simulators import constants
 
 class Cube(PybulletObject):
@@ -22,3 +23,6 @@ class Cube(PybulletObject):
 
   def getHeight(self):
     return self.size
+
+  def getHalfSpaces(self):
+    return convex_shape.boxHalfSpaces([self.size / 2] * 3)
@@ -7,6 +7,7 @@ import os
 
 import helping_hands_rl_envs
 from helping_hands_rl_envs.simulators.pybullet.objects.pybullet_object import PybulletObject
+from helping_hands_rl_envs.simulators.pybullet.utils import convex_shape
 from helping_hands_rl_envs.simulators import constants
 
 class Cylinder(PybulletObject):
@@ -25,3 +26,6 @@ class Cylinder(PybulletObject):
 
   def getHeight(self):
     return self.height
+
+  def getHalfSpaces(self):
+    return convex_shape.cylinderHalfSpaces(self.size / 2, self.height / 2)
@@ -0,0 +1,138 @@
+from collections import defaultdict, OrderedDict
+
+import pybullet as pb
+
+from helping_hands_rl_envs.simulators import constants
+from helping_hands_rl_envs.simulators.pybullet.objects.cube import Cube
+from helping_hands_rl_envs.simulators.pybullet.objects.brick import Brick
+from helping_hands_rl_envs.simulators.pybullet.objects.triangle import Triangle
+from helping_hands_rl_envs.simulators.pybullet.objects.roof import Roof
+from helping_hands_rl_envs.simulators.pybullet.objects.cylinder import Cylinder
+from helping_hands_rl_envs.simulators.pybullet.objects import random_object
+from helping_hands_rl_envs.simulators.pybullet.utils import scene_snapshot
+
+OBJECT_CLASSES = {
+  constants.CUBE: Cube,
+  constants.BRICK: Brick,
+  constants.TRIANGLE: Triangle,
+  constants.ROOF: Roof,
+  constants.CYLINDER: Cylinder,
+  constants.RANDOM: random_object.RandomObject,
+}
+
+# Parked bodies are moved below the ground plane, out of the view of all sensors
+PARK_POS = [0, 0, -10]
+
+class ObjectPool(object):
+  '''
+  Pool of the object bodies of a pybullet client. Released objects are not removed but parked below the
+  workspace with their collisions disabled, their mass set to 0 and a transparent color, which keeps the
+  renderer from drawing them. The next request for the same shape type and scale bucket re-activates a parked
+  body with resetBasePositionAndOrientation, which skips loading the urdf or parsing the mesh of the object.
+
+  pybullet bakes the scale of a body in when it is created, so a re-activated object keeps the scale it was
+  created with, which differs from the requested scale by less than one scale bucket. Parked bodies still add
+  to the cost of each simulation step, so once more than capacity bodies are parked the least recently parked
+  one is removed.
+
+  Args:
+    - scale_bucket: Width of the scale buckets
+    - capacity: Max number of parked bodies, unbounded if None
+  '''
+  def __init__(self, scale_bucket=0.01, capacity=None):
+    self.scale_bucket = scale_bucket
+    self.capacity = capacity
+    # Pool key -> parked objects
+    self.parked = defaultdict(list)
+    # Object id -> parked object, in the order the objects were parked
+    self.park_order = OrderedDict()
+    # Object id -> (pool key, mass, rgba color) of all bodies created by the pool
+    self.bodies = dict()
+    self.hits = 0
+    self.misses = 0
+
+  def __len__(self):
+    return len(self.park_order)
+
+  def getObject(self, shape_type, pos, rot, scale, z_scale=1, simplified_collision=False):
+    '''
+    Get an object, re-activating a parked body if there is one for the shape type and scale bucket
+
+    Args:
+      - shape_type: Shape type of the object
+      - pos: Position of the object
+      - rot: Orientation of the object as quaternion
+      - scale: Scale of the object
+      - z_scale: Additional scale along the z axis of random objects
+      - simplified_collision: Use the simplified collision mesh of random objects
+
+    Returns: The object
+    '''
+    if shape_type not in OBJECT_CLASSES:
+      raise NotImplementedError
+    key = (shape_type, self._getBucket(scale))
+    if shape_type == constants.RANDOM:
+      # Sample the mesh whether or not a body is reused to draw the same random numbers as without the pool
+      obj_filepath, color = random_object.sampleMesh()
+      key += (self._getBucket(scale * z_scale), obj_filepath, simplified_collision)
+
+    if self.parked[key]:
+      obj = self.parked[key].pop()
+      del self.park_order[obj.object_id]
+      self._activate(obj, pos, rot, color if shape_type == constants.RANDOM else None)
+      self.hits += 1
+      return obj
+
+    if shape_type == constants.RANDOM:
+      obj = random_object.RandomObject(pos, rot, scale, z_scale, obj_filepath, color, simplified_collision)
+    else:
+      obj = OBJECT_CLASSES[shape_type](pos, rot, scale)
+    self.bodies[obj.object_id] = (key, pb.getDynamicsInfo(obj.object_id, -1)[0],
+                                  pb.getVisualShapeData(obj.object_id)[0][7])
+    self.misses += 1
+    return obj
+
+  def release(self, obj):
+    '''
+    Park an object until it is re-activated by getObject. Objects not created by the pool are removed.
+
+    Args:
+      - obj: The object
+    '''
+    if obj.object_id not in self.bodies:
+      pb.removeBody(obj.object_id)
+      scene_snapshot.invalidate()
+      return
+    pb.resetBasePositionAndOrientation(obj.object_id, PARK_POS, [0, 0, 0, 1])
+    pb.resetBaseVelocity(obj.object_id, [0, 0, 0], [0, 0, 0])
+    pb.changeDynamics(obj.object_id, -1, mass=0)
+    pb.setCollisionFilterGroupMask(obj.object_id, -1, 0, 0)
+    pb.changeVisualShape(obj.object_id, -1, rgbaColor=[0, 0, 0, 0])
+    scene_snapshot.invalidate()
+    self.parked[self.bodies[obj.object_id][0]].append(obj)
+    self.park_order[obj.object_id] = obj
+    while self.capacity is not None and len(self.park_order) > self.capacity:
+      object_id, evicted = self.park_order.popitem(last=False)
+      self.parked[self.bodies.pop(object_id)[0]].remove(evicted)
+      pb.removeBody(object_id)
+      scene_snapshot.invalidate()
+
+  def clear(self):
+    '''
+    Forget all bodies, e.g. after they were removed by pb.resetSimulation
+    '''
+    self.parked.clear()
+    self.park_order.clear()
+    self.bodies.clear()
+
+  def _activate(self, obj, pos, rot, color=None):
+    _, mass, original_color = self.bodies[obj.object_id]
+    pb.resetBasePositionAndOrientation(obj.object_id, pos, rot)
+    pb.changeDynamics(obj.object_id, -1, mass=mass)
+    # The default collision filter of dynamic bodies
+    pb.setCollisionFilterGroupMask(obj.object_id, -1, 1, -1)
+    pb.changeVisualShape(obj.object_id, -1, rgbaColor=original_color if color is None else color)
+    scene_snapshot.invalidate()
+
+  def _getBucket(self, scale):
+    return int(round(scale / self.scale_bucket))
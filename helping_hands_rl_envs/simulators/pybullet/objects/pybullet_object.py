@@ -1,9 +1,13 @@
 import pybullet as pb
 
+from helping_hands_rl_envs.simulators.pybullet.utils import scene_snapshot
+
 class PybulletObject(object):
   def __init__(self, object_type_id, object_id):
     self.object_type_id = object_type_id
     self.object_id = object_id
+    # The new body can re-use the id of a removed one
+    scene_snapshot.invalidate()
 
   def getXPosition(self):
     return self.getPosition()[0]
@@ -18,38 +22,44 @@ class PybulletObject(object):
     return self.getPosition()[2]
 
   def getPosition(self):
-    pos, _ = pb.getBasePositionAndOrientation(self.object_id)
-    return list(pos)
+    return list(scene_snapshot.getSnapshot(self.object_id).getPose(self.object_id)[0])
 
   def getRotation(self):
-    _, rot = pb.getBasePositionAndOrientation(self.object_id)
-    return list(rot)
+    return list(scene_snapshot.getSnapshot(self.object_id).getPose(self.object_id)[1])
+
+  def getEulerRotation(self):
+    return list(scene_snapshot.getSnapshot(self.object_id).getEulerRotation(self.object_id))
 
   def getPose(self):
-    pos, rot = pb.getBasePositionAndOrientation(self.object_id)
+    pos, rot = scene_snapshot.getSnapshot(self.object_id).getPose(self.object_id)
     return list(pos), list(rot)
 
   def setVelocity(self, linear_velocity, angular_velocity):
-    return pb.resetBaseVelocity(self.object_id, linear_velocity, angular_velocity)
+    pb.resetBaseVelocity(self.object_id, linear_velocity, angular_velocity)
+    scene_snapshot.invalidate()
 
   def getVelocity(self):
-    return pb.getBaseVelocity(self.object_id)
+    return scene_snapshot.getSnapshot(self.object_id).getVelocity(self.object_id)
 
   def getBoundingBox(self):
-    return list(pb.getAABB(self.object_id))
+    return list(scene_snapshot.getSnapshot(self.object_id).getAABB(self.object_id))
 
   def getContactPoints(self):
     return pb.getContactPoints(self.object_id)
 
   def isTouching(self, obj):
-    contact_points = self.getContactPoints()
-    for p in contact_points:
-      if p[2] == obj.object_id:
-        return True
-    return False
+    return scene_snapshot.getSnapshot().isTouching(self.object_id, obj.object_id)
+
+  def getHalfSpaces(self):
+    '''
+    Get the convex shape of the object as (normals, offsets) half-spaces in the object frame.
+    None if the shape of the object is not known.
+    '''
+    return None
 
   def resetPose(self, pos, rot):
     pb.resetBasePositionAndOrientation(self.object_id, pos, rot)
+    scene_snapshot.invalidate()
 
   def __eq__(self, other):
     if not isinstance(other, PybulletObject):
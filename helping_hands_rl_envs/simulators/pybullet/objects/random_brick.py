@@ -7,14 +7,16 @@ import os
 
 import helping_hands_rl_envs
 from helping_hands_rl_envs.simulators.pybullet.objects.pybullet_object import PybulletObject
+from helping_hands_rl_envs.simulators.pybullet.utils import convex_shape
 from helping_hands_rl_envs.simulators import constants
 
 class RandomBrick(PybulletObject):
   def __init__(self, pos, rot, x_scale, y_scale, z_scale):
+    self.half_extents = [0.05/2*x_scale, 0.15/2*y_scale, 0.05/2*z_scale]
     visualShapeId = pb.createVisualShape(shapeType=pb.GEOM_BOX,
-                                         halfExtents=[0.05/2*x_scale, 0.15/2*y_scale, 0.05/2*z_scale])
+                                         halfExtents=self.half_extents)
     collisionShapeId = pb.createCollisionShape(shapeType=pb.GEOM_BOX,
-                                               halfExtents=[0.05/2*x_scale, 0.15/2*y_scale, 0.05/2*z_scale])
+                                               halfExtents=self.half_extents)
     object_id = pb.createMultiBody(baseMass=0.1,
                                    baseInertialFramePosition=[0, 0, 0],
                                    baseCollisionShapeIndex=collisionShapeId,
@@ -22,3 +24,6 @@ class RandomBrick(PybulletObject):
                                    basePosition=pos,
                                    baseOrientation=rot)
     super(RandomBrick, self).__init__(constants.BRICK, object_id)
+
+  def getHalfSpaces(self):
+    return convex_shape.boxHalfSpaces(self.half_extents)
@@ -1,37 +1,92 @@
 import sys
 sys.path.append('..')
 
+import functools
 import pybullet as pb
 import numpy as np
 import os
-import glob
-import re
 
 import helping_hands_rl_envs
 from helping_hands_rl_envs.simulators.pybullet.objects.pybullet_object import PybulletObject
+from helping_hands_rl_envs.simulators.pybullet.utils import pybullet_util
 from helping_hands_rl_envs.simulators import constants
 
-root_dir = os.path.dirname(helping_hands_rl_envs.__file__)
-obj_pattern = os.path.join(root_dir, constants.URDF_PATH, 'random_urdfs/*/*.obj')
-found_object_directories = glob.glob(obj_pattern)
-found_object_directories = list(filter(lambda x: re.search(r'(002|005|027|032|066|075|083'
-                                                           r'|116|118|131|137|142|143|149|154|176|187'
-                                                           r'|199|200)\.obj', x),
-                                       found_object_directories))
-total_num_objects = len(found_object_directories)
+# Ids of the meshes in random_urdfs which are sampled by RandomObject
+MESH_IDS = ('002', '005', '027', '032', '066', '075', '083', '116', '118', '131', '137', '142', '143', '149', '154',
+            '176', '187', '199', '200')
+
+# Suffix of the simplified collision meshes written by scripts/generate_collision_meshes.py
+COLLISION_SUFFIX = '_collision.obj'
+
+# Client id -> {(mesh file, mesh scale, simplified collision): (collision shape id, visual shape id)}
+_shape_cache = dict()
+
+def sampleMesh():
+  '''
+  Sample the mesh file and the color of a random object
+
+  Returns: (mesh file path, rgba color)
+  '''
+  mesh_filepaths = getMeshFilepaths()
+  obj_filepath = mesh_filepaths[np.random.choice(np.arange(len(mesh_filepaths)), 1)[0]]
+  color = [np.random.random(), np.random.random(), np.random.random(), 1]
+  return obj_filepath, color
+
+@functools.lru_cache(maxsize=None)
+def getMeshFilepaths():
+  '''
+  Get the paths of the meshes sampled by RandomObject. Built on first use to keep the file system out of the import.
+  '''
+  mesh_dir = os.path.join(os.path.dirname(helping_hands_rl_envs.__file__), constants.URDF_PATH, 'random_urdfs')
+  mesh_filepaths = [os.path.join(mesh_dir, mesh_id, mesh_id + '.obj') for mesh_id in MESH_IDS]
+  return [mesh_filepath for mesh_filepath in mesh_filepaths if os.path.exists(mesh_filepath)]
+
+def getCollisionFilepath(obj_filepath):
+  '''
+  Get the path of the simplified collision mesh of a mesh
+  '''
+  return obj_filepath[:-len('.obj')] + COLLISION_SUFFIX
+
+def getShapes(obj_filepath, mesh_scale, simplified_collision=False):
+  '''
+  Get the collision and visual shape of a mesh. The shapes are created once per client and mesh scale and shared
+  by all bodies created from them, which skips parsing the mesh and cooking its collision shape for every object.
+
+  Args:
+    - obj_filepath: Path of the .obj mesh
+    - mesh_scale: Scale of the mesh along x, y and z
+    - simplified_collision: Use the simplified collision mesh instead of the convex parts of the mesh
+
+  Returns: (collision shape id, visual shape id)
+  '''
+  cache = _shape_cache.setdefault(pybullet_util.getActiveClient(), dict())
+  key = (obj_filepath, tuple(mesh_scale), simplified_collision)
+  if key not in cache:
+    collision_filepath = getCollisionFilepath(obj_filepath) if simplified_collision else obj_filepath
+    if simplified_collision and not os.path.exists(collision_filepath):
+      raise ValueError('No collision mesh {}, run scripts/generate_collision_meshes.py'.format(collision_filepath))
+    visual_shape_id = pb.createVisualShape(shapeType=pb.GEOM_MESH,
+                                           fileName=obj_filepath,
+                                           meshScale=mesh_scale)
+    collision_shape_id = pb.createCollisionShape(shapeType=pb.GEOM_MESH,
+                                                 fileName=collision_filepath,
+                                                 meshScale=mesh_scale)
+    cache[key] = (collision_shape_id, visual_shape_id)
+  return cache[key]
+
+def clearShapeCache():
+  '''
+  Forget the shapes of the active client, which are removed by pb.resetSimulation
+  '''
+  _shape_cache.pop(pybullet_util.getActiveClient(), None)
 
 class RandomObject(PybulletObject):
-  def __init__(self, pos, rot, scale, z_scale=1):
+  def __init__(self, pos, rot, scale, z_scale=1, obj_filepath=None, color=None, simplified_collision=False):
     self.z_scale = z_scale
-    obj_filepath = found_object_directories[np.random.choice(np.arange(total_num_objects), 1)[0]]
+    if obj_filepath is None:
+      obj_filepath, color = sampleMesh()
     mesh_scale = [0.01 * scale, 0.01 * scale, 0.01 * scale * z_scale]
-    visualShapeId = pb.createVisualShape(shapeType=pb.GEOM_MESH,
-                                         fileName=obj_filepath,
-                                         rgbaColor=[np.random.random(), np.random.random(), np.random.random(), 1],
-                                         meshScale=mesh_scale)
-    collisionShapeId = pb.createCollisionShape(shapeType=pb.GEOM_MESH,
-                                               fileName=obj_filepath,
-                                               meshScale=mesh_scale)
+    collisionShapeId, visualShapeId = getShapes(obj_filepath, mesh_scale, simplified_collision)
     # collisionShapeId = pb.createCollisionShape(shapeType=pb.GEOM_BOX,
     #                                            halfExtents=[0.024*scale, 0.024*scale, 0.024*scale])
     object_id = pb.createMultiBody(baseMass=0.1,
@@ -40,5 +95,7 @@ class RandomObject(PybulletObject):
                                    baseVisualShapeIndex=visualShapeId,
                                    basePosition=pos,
                                    baseOrientation=rot)
+    # The visual shape is shared with the other objects of this mesh, the color is set per body
+    pb.changeVisualShape(object_id, -1, rgbaColor=color)
     # pb.changeDynamics(object_id, -1, mass=0.1, lateralFriction=1.0, spinningFriction=0.0, rollingFriction=0.0)
     super(RandomObject, self).__init__(constants.RANDOM, object_id)
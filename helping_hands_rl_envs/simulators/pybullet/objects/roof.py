@@ -7,6 +7,7 @@ import os
 
 import helping_hands_rl_envs
 from helping_hands_rl_envs.simulators.pybullet.objects.pybullet_object import PybulletObject
+from helping_hands_rl_envs.simulators.pybullet.utils import convex_shape
 from helping_hands_rl_envs.simulators import constants
 
 class Roof(PybulletObject):
@@ -22,3 +23,8 @@ class Roof(PybulletObject):
 
   def getHeight(self):
     return self.size
+
+  def getHalfSpaces(self):
+    root_dir = os.path.dirname(helping_hands_rl_envs.__file__)
+    obj_filepath = os.path.join(root_dir, constants.URDF_PATH, '0.obj')
+    return convex_shape.meshHalfSpaces(obj_filepath, (1.5, 1., 1.), (0, 0, 1.5707), self.size / self.original_size)
@@ -7,6 +7,7 @@ import os
 
 import helping_hands_rl_envs
 from helping_hands_rl_envs.simulators.pybullet.objects.pybullet_object import PybulletObject
+from helping_hands_rl_envs.simulators.pybullet.utils import convex_shape
 from helping_hands_rl_envs.simulators import constants
 
 class Triangle(PybulletObject):
@@ -22,3 +23,8 @@ class Triangle(PybulletObject):
 
   def getHeight(self):
     return self.size
+
+  def getHalfSpaces(self):
+    root_dir = os.path.dirname(helping_hands_rl_envs.__file__)
+    obj_filepath = os.path.join(root_dir, constants.URDF_PATH, '0.obj')
+    return convex_shape.meshHalfSpaces(obj_filepath, (0.7, 1., 1.), (0, 0, 1.5707), self.size / self.original_size)
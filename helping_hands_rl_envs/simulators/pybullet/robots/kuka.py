@@ -13,6 +13,7 @@ from helping_hands_rl_envs.simulators.pybullet.robots.robot_base import RobotBas
 import time
 
 from helping_hands_rl_envs.simulators.pybullet.utils import pybullet_util
+from helping_hands_rl_envs.simulators.pybullet.utils import scene_snapshot
 from helping_hands_rl_envs.simulators.pybullet.utils import object_generation
 from helping_hands_rl_envs.simulators.pybullet.utils import transformations
 
@@ -62,6 +63,9 @@ class Kuka(RobotBase):
     # self.is_holding = False
     self.gripper_closed = False
     self.holding_obj = None
+    # The hold constraint was removed with the rest of the simulation
+    self.teleport_constraint = None
+    self.teleport_end_to_obj = None
     self.num_joints = pb.getNumJoints(self.id)
     [pb.resetJointState(self.id, idx, self.home_positions[idx]) for idx in range(self.num_joints)]
     self.openGripper()
@@ -77,8 +81,16 @@ class Kuka(RobotBase):
   def reset(self):
     self.gripper_closed = False
     self.holding_obj = None
+    self._releaseTeleportObj()
+    self.teleport_end_to_obj = None
     [pb.resetJointState(self.id, idx, self.home_positions[idx]) for idx in range(self.num_joints)]
 
+  def resetMotors(self):
+    super().resetMotors()
+    # initialize opens the gripper
+    target = self.gripper_joint_limit[1]
+    self._sendGripperCommand(target, target)
+
   def closeGripper(self, max_it=100):
     ''''''
     p1, p2 = self._getGripperJointPosition()
@@ -87,7 +99,7 @@ class Kuka(RobotBase):
     self.gripper_closed = True
     it = 0
     while abs(target-p1) + abs(target-p2) > 0.001:
-      pb.stepSimulation()
+      scene_snapshot.stepSimulation()
       it += 1
       p1_, p2_ = self._getGripperJointPosition()
       if it > max_it or (abs(p1 - p1_) < 0.0001 and abs(p2 - p2_) < 0.0001):
@@ -124,7 +136,7 @@ class Kuka(RobotBase):
     while abs(target-p1) + abs(target-p2) > 0.001:
       if self.holding_obj and it < 5:
         self.holding_obj.resetPose(pos, rot)
-      pb.stepSimulation()
+      scene_snapshot.stepSimulation()
       it += 1
       if it > 100:
         return False
@@ -135,8 +147,11 @@ class Kuka(RobotBase):
       p2 = p2_
     return True
 
-  def _calculateIK(self, pos, rot):
-    return pb.calculateInverseKinematics(self.id, self.end_effector_index, pos, rot, jointDamping=self.jd)[:7]
+  def _calculateIK(self, pos, rot, current_positions=None):
+    if current_positions is None:
+      return pb.calculateInverseKinematics(self.id, self.end_effector_index, pos, rot, jointDamping=self.jd)[:7]
+    return pb.calculateInverseKinematics(self.id, self.end_effector_index, pos, rot, jointDamping=self.jd,
+                                         currentPositions=current_positions)[:7]
 
   def _getGripperJointPosition(self):
     p1 = -pb.getJointState(self.id, 8)[0]
@@ -3,6 +3,7 @@ import numpy as np
 import pybullet as pb
 
 from helping_hands_rl_envs.simulators.pybullet.robots.kuka import Kuka
+from helping_hands_rl_envs.simulators.pybullet.utils import scene_snapshot
 
 class KukaFloatPick(Kuka):
   def __init__(self):
@@ -31,7 +32,7 @@ class KukaFloatPick(Kuka):
         self.moveTo(pre_pos, pre_rot, True)
         self.adjustGripperCommand()
         for i in range(10):
-          pb.stepSimulation()
+          scene_snapshot.stepSimulation()
         self.holding_obj = self.getPickedObj(objects)
       self.moveToJ(self.home_positions_joint, dynamic)
       self.checkGripperClosed()
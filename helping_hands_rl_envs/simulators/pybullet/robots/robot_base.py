@@ -3,7 +3,7 @@ import copy
 import math
 import numpy as np
 import numpy.random as npr
-from collections import deque
+from collections import deque, OrderedDict
 from abc import abstractmethod
 
 import pybullet as pb
@@ -13,6 +13,7 @@ import helping_hands_rl_envs
 import time
 
 from helping_hands_rl_envs.simulators.pybullet.utils import pybullet_util
+from helping_hands_rl_envs.simulators.pybullet.utils import scene_snapshot
 from helping_hands_rl_envs.simulators.pybullet.utils import object_generation
 from helping_hands_rl_envs.simulators.pybullet.utils import transformations
 
@@ -28,35 +29,63 @@ class RobotBase:
     self.end_effector_index = None
     self.holding_obj = None
     self.gripper_closed = False
+    # Transform from the end effector to the object held by teleportPick, None if not teleport holding
+    self.teleport_end_to_obj = None
+    # Constraint fixing the object held by teleportPick in place
+    self.teleport_constraint = None
     self.state = {
       'holding_obj': self.holding_obj,
-      'gripper_closed': self.gripper_closed
+      'gripper_closed': self.gripper_closed,
+      'teleport_end_to_obj': self.teleport_end_to_obj
     }
 
     self.position_gain = 0.02
+    # 'analytic' uses the closed form IK of the robots which have one, 'iterative' always uses
+    # pb.calculateInverseKinematics
+    self.ik_mode = 'analytic'
+
+    # LRU cache of IK solutions keyed by the quantized target pose. Each entry holds the last target pose
+    # solved in its cell and its IK solution. Repeated targets reuse the joint positions
+    # directly, other targets in the same cell use them to warm start the IK.
+    self.ik_cache = OrderedDict()
+    self.ik_cache_size = 1024
+    self.ik_cache_pos_resolution = 0.01
+    self.ik_cache_rot_resolution = 0.05
+    self.ik_cache_hits = 0
+    self.ik_cache_warm_starts = 0
+    self.ik_cache_misses = 0
 
   def saveState(self):
     self.state = {
       'holding_obj': self.holding_obj,
-      'gripper_closed': self.gripper_closed
+      'gripper_closed': self.gripper_closed,
+      'teleport_end_to_obj': self.teleport_end_to_obj
     }
 
   def restoreState(self):
     self.holding_obj = self.state['holding_obj']
     self.gripper_closed = self.state['gripper_closed']
+    self.teleport_end_to_obj = self.state.get('teleport_end_to_obj')
     if self.gripper_closed:
       self.closeGripper(max_it=0)
     else:
       self.openGripper()
 
-  def getPickedObj(self, objects):
+    # The hold constraint is not part of the saved simulation state, create it again for the restored held object
+    self._releaseTeleportObj()
+    if self.teleport_end_to_obj is not None and self.holding_obj:
+      self._holdTeleportObj()
+
+  def getPickedObj(self, objects, end_pos=None):
     if not objects:
       return None
-    end_pos = self._getEndEffectorPosition()
-    sorted_obj = sorted(objects, key=lambda o: np.linalg.norm(end_pos-o.getPosition()))
-    obj_pos = sorted_obj[0].getPosition()
+    if end_pos is None:
+      end_pos = self._getEndEffectorPosition()
+    object_ids = [o.object_id for o in objects]
+    nearest_obj = objects[scene_snapshot.getSnapshot(*object_ids).getSpatialIndex(object_ids).nearest(end_pos)]
+    obj_pos = nearest_obj.getPosition()
     if np.linalg.norm(end_pos[:-1]-obj_pos[:-1]) < 0.05 and np.abs(end_pos[-1]-obj_pos[-1]) < 0.025:
-      return sorted_obj[0]
+      return nearest_obj
 
   def pick(self, pos, rot, offset, dynamic=True, objects=None, simulate_grasp=True):
     ''''''
@@ -81,7 +110,7 @@ class RobotBase:
 
       self.moveTo(pre_pos, pre_rot, True)
       for i in range(10):
-        pb.stepSimulation()
+        scene_snapshot.stepSimulation()
     else:
       self.moveTo(pos, rot, dynamic)
 
@@ -110,6 +139,82 @@ class RobotBase:
     self.moveTo(pre_pos, pre_rot, dynamic)
     self.moveToJ(self.home_positions_joint, dynamic)
 
+  def teleportPick(self, pos, rot, objects=None):
+    '''
+    Pick without moving the arm. The object picked with the end effector at the grasp pose is chosen by
+    getPickedObj and is held in the pose relative to the end effector in its home pose.
+
+    Args:
+      - pos: Position of the end effector at the grasp pose
+      - rot: Orientation quaternion of the end effector at the grasp pose
+      - objects: List of the objects which can be picked
+    '''
+    self.holding_obj = self.getPickedObj(objects, end_pos=np.array(pos))
+    if not self.holding_obj:
+      return
+
+    oTend = pybullet_util.getMatrix(pos, rot)
+    oTobj = pybullet_util.getMatrix(*self.holding_obj.getPose())
+    self.teleport_end_to_obj = np.linalg.inv(oTend).dot(oTobj)
+    self.gripper_closed = True
+
+    oTobj_ = pybullet_util.getMatrix(self._getEndEffectorPosition(), self._getEndEffectorRotation()).dot(
+      self.teleport_end_to_obj)
+    self.holding_obj.resetPose(oTobj_[:3, -1], transformations.quaternion_from_matrix(oTobj_))
+    self.holding_obj.setVelocity([0, 0, 0], [0, 0, 0])
+    self._holdTeleportObj()
+
+  def teleportPlace(self, pos, rot):
+    '''
+    Place without moving the arm. The held object is teleported to its pose relative to the end effector at
+    the place pose and released to drop from there.
+
+    Args:
+      - pos: Position of the end effector at the place pose
+      - rot: Orientation quaternion of the end effector at the place pose
+    '''
+    if not self.holding_obj or self.teleport_end_to_obj is None:
+      return
+
+    self._releaseTeleportObj()
+    oTobj = pybullet_util.getMatrix(pos, rot).dot(self.teleport_end_to_obj)
+    self.holding_obj.resetPose(oTobj[:3, -1], transformations.quaternion_from_matrix(oTobj))
+    self.holding_obj.setVelocity([0, 0, 0], [0, 0, 0])
+    self.holding_obj = None
+    self.teleport_end_to_obj = None
+    self.gripper_closed = False
+
+  def disableCollisions(self):
+    '''
+    Remove all links of the robot from the collision world. Used when the arm is never moved.
+    '''
+    for link_id in range(-1, pb.getNumJoints(self.id)):
+      pb.setCollisionFilterGroupMask(self.id, link_id, 0, 0)
+
+  def resetMotors(self):
+    '''
+    Reset the joint motors to their state after initialize. Saved pybullet states do not include the motor
+    commands, so this is needed after restoring a state saved right after initialize.
+    '''
+    # pybullet motorizes each joint with a velocity motor with an impulse of 1 per time step
+    force = 1. / pb.getPhysicsEngineParameters()['fixedTimeStep']
+    joints = [i for i in range(self.num_joints) if pb.getJointInfo(self.id, i)[2] != pb.JOINT_FIXED]
+    pb.setJointMotorControlArray(self.id, joints, pb.VELOCITY_CONTROL, targetVelocities=[0.] * len(joints),
+                                 forces=[force] * len(joints))
+
+  def _holdTeleportObj(self):
+    pos, rot = self.holding_obj.getPose()
+    self.teleport_constraint = pb.createConstraint(self.holding_obj.object_id, -1, -1, -1, pb.JOINT_FIXED,
+                                                   [0, 0, 0], [0, 0, 0], pos, childFrameOrientation=rot)
+
+  def _releaseTeleportObj(self):
+    if self.teleport_constraint is None:
+      return
+    # The constraint is already gone if the simulation was reset or the object was removed
+    if self.teleport_constraint in [pb.getConstraintUniqueId(i) for i in range(pb.getNumConstraints())]:
+      pb.removeConstraint(self.teleport_constraint)
+    self.teleport_constraint = None
+
   def moveTo(self, pos, rot, dynamic=True, pos_th=1e-3, rot_th=1e-3):
     if dynamic or not self.holding_obj:
       self._moveToCartesianPose(pos, rot, dynamic, pos_th, rot_th)
@@ -142,7 +247,7 @@ class RobotBase:
       joint_pos = list(zip(*joint_state))[0]
       n_it = 0
       while not np.allclose(joint_pos, target_pose, atol=1e-2) and n_it < max_it:
-        pb.stepSimulation()
+        scene_snapshot.stepSimulation()
         n_it += 1
         # Check to see if the arm can't move any close to the desired joint position
         if len(past_joint_pos) == 5 and np.allclose(past_joint_pos[-1], past_joint_pos, atol=1e-3):
@@ -160,20 +265,101 @@ class RobotBase:
     max_outer_it = 10
     max_inner_it = 100
 
+    cache_key, cached = self._getCachedIK(pos, rot)
     while not close_enough and outer_it < max_outer_it:
-      ik_solve = self._calculateIK(pos, rot)
+      if outer_it == 0 and cached is not None and self._isSamePose(cached[0], cached[1], pos, rot):
+        ik_solve = cached[2]
+      elif outer_it == 0 and cached is not None:
+        ik_solve = self._calculateIK(pos, rot, current_positions=self._getWarmStartPositions(cached[2]))
+      else:
+        ik_solve = self._calculateIK(pos, rot)
       self._moveToJointPose(ik_solve, dynamic, max_inner_it)
 
       ls = pb.getLinkState(self.id, self.end_effector_index)
       new_pos = list(ls[4])
       new_rot = list(ls[5])
+      # q and -q are the same orientation
       close_enough = np.allclose(np.array(new_pos), pos, atol=pos_th) and \
-                     np.allclose(np.array(new_rot), rot, atol=rot_th)
+                     (np.allclose(np.array(new_rot), rot, atol=rot_th) or
+                      np.allclose(-np.array(new_rot), rot, atol=rot_th))
       # close_enough = np.allclose(np.array(new_pos + new_rot), np.array(list(pos) + list(rot)), atol=threshold)
       outer_it += 1
 
+    # Only an IK solution which reached the target is a solution for it
+    if close_enough:
+      self._cacheIK(cache_key, pos, rot, ik_solve)
+
+  def getIKCacheStats(self):
+    '''
+    Get the counters of the IK cache
+
+    Returns: Dict with the number of hits, warm starts and misses and the number of cached entries
+    '''
+    return {'hits': self.ik_cache_hits, 'warm_starts': self.ik_cache_warm_starts,
+            'misses': self.ik_cache_misses, 'size': len(self.ik_cache)}
+
+  def _getIKCacheKey(self, pos, rot):
+    rot = np.asarray(rot)
+    # q and -q are the same orientation
+    if rot[np.flatnonzero(np.abs(rot) > 1e-6)[0]] < 0:
+      rot = -rot
+    return (tuple(np.round(np.asarray(pos) / self.ik_cache_pos_resolution).astype(int)),
+            tuple(np.round(rot / self.ik_cache_rot_resolution).astype(int)))
+
+  def _getCachedIK(self, pos, rot):
+    '''
+    Look up the IK cache for a target pose and update the counters
+
+    Returns: (cache key, cached (pos, rot, joint positions) or None)
+    '''
+    if self.ik_cache_size <= 0:
+      return None, None
+    cache_key = self._getIKCacheKey(pos, rot)
+    cached = self.ik_cache.get(cache_key)
+    if cached is None:
+      self.ik_cache_misses += 1
+      return cache_key, None
+
+    self.ik_cache.move_to_end(cache_key)
+    if self._isSamePose(cached[0], cached[1], pos, rot):
+      self.ik_cache_hits += 1
+    else:
+      self.ik_cache_warm_starts += 1
+    return cache_key, cached
+
+  def _cacheIK(self, cache_key, pos, rot, ik_solve):
+    '''
+    Store the IK solution of the target pose
+    '''
+    if cache_key is None:
+      return
+    joint_positions = list(ik_solve)
+    self.ik_cache[cache_key] = (np.array(pos), np.array(rot), joint_positions)
+    self.ik_cache.move_to_end(cache_key)
+    if len(self.ik_cache) > self.ik_cache_size:
+      self.ik_cache.popitem(last=False)
+
+  def _isSamePose(self, pos1, rot1, pos2, rot2, atol=1e-6):
+    return np.allclose(pos1, pos2, atol=atol) and \
+           (np.allclose(rot1, rot2, atol=atol) or np.allclose(rot1, -np.asarray(rot2), atol=atol))
+
+  def _getWarmStartPositions(self, arm_joint_positions):
+    '''
+    Get the positions of all movable joints for the currentPositions of pb.calculateInverseKinematics, with
+    the arm joints at the given positions
+    '''
+    positions = list()
+    for i in range(pb.getNumJoints(self.id)):
+      if pb.getJointInfo(self.id, i)[2] == pb.JOINT_FIXED:
+        continue
+      if i in self.arm_joint_indices:
+        positions.append(arm_joint_positions[self.arm_joint_indices.index(i)])
+      else:
+        positions.append(pb.getJointState(self.id, i)[0])
+    return positions
+
   @abstractmethod
-  def _calculateIK(self, pos, rot):
+  def _calculateIK(self, pos, rot, current_positions=None):
     raise NotImplementedError
 
   def _teleportArmWithObj(self, pos, rot):
@@ -4,7 +4,6 @@ import math
 import numpy as np
 import numpy.random as npr
 from collections import deque, namedtuple
-from attrdict import AttrDict
 from threading import Thread
 
 import pybullet as pb
@@ -13,6 +12,8 @@ import pybullet_data
 import helping_hands_rl_envs
 import time
 from helping_hands_rl_envs.simulators.pybullet.robots.robot_base import RobotBase
+from helping_hands_rl_envs.simulators.pybullet.utils.ur5_ik import UR5IK
+from helping_hands_rl_envs.simulators.pybullet.utils import scene_snapshot
 
 jointInfo = namedtuple("jointInfo",
                        ["id", "name", "type", "lowerLimit", "upperLimit", "maxForce", "maxVelocity"])
@@ -61,7 +62,7 @@ class UR5_Robotiq(RobotBase):
       "robotiq_85_right_finger_tip_joint"
     ]
     self.robotiq_mimic_multiplier = [1, 1, 1, 1, -1, -1]
-    self.robotiq_joints = AttrDict()
+    self.robotiq_joints = dict()
 
   def initialize(self):
     ''''''
@@ -70,6 +71,9 @@ class UR5_Robotiq(RobotBase):
     # self.is_holding = False
     self.gripper_closed = False
     self.holding_obj = None
+    # The hold constraint was removed with the rest of the simulation
+    self.teleport_constraint = None
+    self.teleport_end_to_obj = None
     self.num_joints = pb.getNumJoints(self.id)
     [pb.resetJointState(self.id, idx, self.home_positions[idx]) for idx in range(self.num_joints)]
 
@@ -99,9 +103,14 @@ class UR5_Robotiq(RobotBase):
                                jointMaxVelocity)
         self.robotiq_joints[singleInfo.name] = singleInfo
 
+    # Joint 0 is fixed to the base link and link 8 is tool0
+    self.analytic_ik = UR5IK(self.id, self.arm_joint_indices, 0, 8, self.end_effector_index)
+
   def reset(self):
     self.gripper_closed = False
     self.holding_obj = None
+    self._releaseTeleportObj()
+    self.teleport_end_to_obj = None
     [pb.resetJointState(self.id, idx, self.home_positions[idx]) for idx in range(self.num_joints)]
 
   def closeGripper(self, max_it=100):
@@ -114,7 +123,7 @@ class UR5_Robotiq(RobotBase):
     it = 0
     while (limit-p1) + (limit-p2) > 0.001:
       self._setRobotiqPosition((p1 + p2) / 2)
-      pb.stepSimulation()
+      scene_snapshot.stepSimulation()
       it += 1
       p1_, p2_ = self._getGripperJointPosition()
       if it > max_it or (abs(p1-p1_)<0.0001 and abs(p2-p2_)<0.0001):
@@ -147,15 +156,22 @@ class UR5_Robotiq(RobotBase):
     it = 0
     while p1 > 0.0:
       self._setRobotiqPosition((p1 + p2) / 2)
-      pb.stepSimulation()
+      scene_snapshot.stepSimulation()
       it += 1
       if it > 100:
         return False
       p1, p2 = self._getGripperJointPosition()
     return True
 
-  def _calculateIK(self, pos, rot):
-    return pb.calculateInverseKinematics(self.id, self.end_effector_index, pos, rot)[:-8]
+  def _calculateIK(self, pos, rot, current_positions=None):
+    if self.ik_mode == 'analytic':
+      ik_solve = self.analytic_ik.solve(pos, rot)
+      if ik_solve is not None:
+        return ik_solve
+    if current_positions is None:
+      return pb.calculateInverseKinematics(self.id, self.end_effector_index, pos, rot)[:-8]
+    return pb.calculateInverseKinematics(self.id, self.end_effector_index, pos, rot,
+                                         currentPositions=current_positions)[:-8]
 
   def _getGripperJointPosition(self):
     p1 = pb.getJointState(self.id, self.gripper_joint_indices[0])[0]
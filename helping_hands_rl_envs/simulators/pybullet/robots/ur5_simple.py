@@ -10,8 +10,10 @@ import pybullet_data
 import helping_hands_rl_envs
 import time
 from helping_hands_rl_envs.simulators.pybullet.robots.robot_base import RobotBase
+from helping_hands_rl_envs.simulators.pybullet.utils.ur5_ik import UR5IK
 
 from helping_hands_rl_envs.simulators.pybullet.utils import pybullet_util
+from helping_hands_rl_envs.simulators.pybullet.utils import scene_snapshot
 from helping_hands_rl_envs.simulators.pybullet.utils import object_generation
 from helping_hands_rl_envs.simulators.pybullet.utils import transformations
 
@@ -40,6 +42,9 @@ class UR5_Simple(RobotBase):
     self.id = pb.loadURDF(ur5_urdf_filepath, [0,0,0], [0,0,0,1])
     self.gripper_closed = False
     self.holding_obj = None
+    # The hold constraint was removed with the rest of the simulation
+    self.teleport_constraint = None
+    self.teleport_end_to_obj = None
     self.num_joints = pb.getNumJoints(self.id)
     [pb.resetJointState(self.id, idx, self.home_positions[idx]) for idx in range(self.num_joints)]
 
@@ -56,9 +61,14 @@ class UR5_Simple(RobotBase):
         self.gripper_joint_names.append(str(joint_info[1]))
         self.gripper_joint_indices.append(i)
 
+    # Joint 0 is fixed to the base link and link 8 is tool0
+    self.analytic_ik = UR5IK(self.id, self.arm_joint_indices, 0, 8, self.end_effector_index)
+
   def reset(self):
     self.gripper_closed = False
     self.holding_obj = None
+    self._releaseTeleportObj()
+    self.teleport_end_to_obj = None
     [pb.resetJointState(self.id, idx, self.home_positions[idx]) for idx in range(self.num_joints)]
 
   def adjustGripperCommand(self):
@@ -76,7 +86,7 @@ class UR5_Simple(RobotBase):
     it = 0
     while (limit-p1) + (limit-p2) > 0.001:
     # while p1 < 0.036:
-      pb.stepSimulation()
+      scene_snapshot.stepSimulation()
       it += 1
       p1_, p2_ = self._getGripperJointPosition()
       if it > max_it or (abs(p1-p1_)<0.0001 and abs(p2-p2_)<0.0001):
@@ -103,15 +113,22 @@ class UR5_Simple(RobotBase):
     self.gripper_closed = False
     it = 0
     while p1 > 0.0:
-      pb.stepSimulation()
+      scene_snapshot.stepSimulation()
       it += 1
       if it > 100:
         return False
       p1, p2 = self._getGripperJointPosition()
     return True
 
-  def _calculateIK(self, pos, rot):
-    return pb.calculateInverseKinematics(self.id, self.end_effector_index, pos, rot)[:-2]
+  def _calculateIK(self, pos, rot, current_positions=None):
+    if self.ik_mode == 'analytic':
+      ik_solve = self.analytic_ik.solve(pos, rot)
+      if ik_solve is not None:
+        return ik_solve
+    if current_positions is None:
+      return pb.calculateInverseKinematics(self.id, self.end_effector_index, pos, rot)[:-2]
+    return pb.calculateInverseKinematics(self.id, self.end_effector_index, pos, rot,
+                                         currentPositions=current_positions)[:-2]
 
   def _getGripperJointPosition(self):
     p1 = pb.getJointState(self.id, self.gripper_joint_indices[0])[0]
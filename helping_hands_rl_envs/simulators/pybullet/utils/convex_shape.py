@@ -0,0 +1,182 @@
+import functools
+import numpy as np
+import pybullet as pb
+
+# Convex shapes are described by half-spaces (normals, offsets) in the object frame such that
+# a point p lies inside the shape if normals.dot(p) <= offsets for all half-spaces
+
+def boxHalfSpaces(half_extents):
+  '''
+  Get the half-spaces of a box centered at the origin
+
+  Args:
+    - half_extents: Half extents of the box along x, y and z
+
+  Returns: (normals, offsets)
+  '''
+  half_extents = np.asarray(half_extents, dtype=np.float64)
+  normals = np.concatenate([np.eye(3), -np.eye(3)])
+  offsets = np.concatenate([half_extents, half_extents])
+  return normals, offsets
+
+def cylinderHalfSpaces(radius, half_height, num_sides=32):
+  '''
+  Get the half-spaces of a cylinder along z centered at the origin, approximated as a prism with
+  num_sides sides circumscribing the cylinder
+
+  Args:
+    - radius: Radius of the cylinder
+    - half_height: Half height of the cylinder
+    - num_sides: Number of sides of the prism
+
+  Returns: (normals, offsets)
+  '''
+  angles = np.arange(num_sides) * 2 * np.pi / num_sides
+  side_normals = np.stack([np.cos(angles), np.sin(angles), np.zeros(num_sides)], axis=1)
+  normals = np.concatenate([side_normals, [[0, 0, 1], [0, 0, -1]]])
+  offsets = np.concatenate([np.full(num_sides, radius), [half_height, half_height]])
+  return normals, offsets
+
+def meshHalfSpaces(obj_filepath, mesh_scale=(1, 1, 1), mesh_rpy=(0, 0, 0), scale=1):
+  '''
+  Get the half-spaces of the convex hull of an obj mesh as it is placed by a URDF
+
+  Args:
+    - obj_filepath: Path to the obj file
+    - mesh_scale: Scale of the mesh in the URDF
+    - mesh_rpy: Rotation of the mesh origin in the URDF
+    - scale: Global scaling the URDF is loaded with
+
+  Returns: (normals, offsets)
+  '''
+  normals, offsets = _meshHullHalfSpaces(obj_filepath, tuple(mesh_scale), tuple(mesh_rpy))
+  return normals, offsets * scale
+
+@functools.lru_cache(maxsize=None)
+def _meshHullHalfSpaces(obj_filepath, mesh_scale, mesh_rpy):
+  # Only needed by the analytic sensor, keep it out of the import of the objects
+  from scipy.spatial import ConvexHull
+
+  with open(obj_filepath) as f:
+    vertices = np.array([list(map(float, line.split()[1:4])) for line in f if line.startswith('v ')])
+  rot = np.array(pb.getMatrixFromQuaternion(pb.getQuaternionFromEuler(mesh_rpy))).reshape(3, 3)
+  vertices = (vertices * np.asarray(mesh_scale)).dot(rot.T)
+
+  equations = ConvexHull(vertices).equations
+  return equations[:, :3], -equations[:, 3]
+
+def transformHalfSpaces(half_spaces, pos, rot):
+  '''
+  Transform half-spaces from the object frame into the world frame
+
+  Args:
+    - half_spaces: (normals, offsets) in the object frame
+    - pos: Position of the object
+    - rot: Orientation quaternion of the object
+
+  Returns: (normals, offsets) in the world frame
+  '''
+  normals, offsets = half_spaces
+  rot_mat = np.array(pb.getMatrixFromQuaternion(rot)).reshape(3, 3)
+  world_normals = normals.dot(rot_mat.T)
+  return world_normals, offsets + world_normals.dot(pos)
+
+def getTopSurface(half_spaces, xs, ys, eps=1e-9):
+  '''
+  Intersect vertical lines with a convex shape in the world frame
+
+  Args:
+    - half_spaces: (normals, offsets) in the world frame
+    - xs: Numpy array of the x coordinates of the lines
+    - ys: Numpy array of the y coordinates of the lines, same shape as xs
+
+  Returns: (top, hit) with the height of the highest point of the shape on each line and
+           whether the line intersects the shape at all
+  '''
+  normals, offsets = half_spaces
+  # Constraint normal_z * z <= offset - normal_x * x - normal_y * y for each half-space
+  bounds = offsets[:, None] - normals[:, 0:1] * xs.ravel() - normals[:, 1:2] * ys.ravel()
+  nz = normals[:, 2]
+
+  upper = nz > eps
+  lower = nz < -eps
+  side = ~(upper | lower)
+  top = np.min(bounds[upper] / nz[upper, None], axis=0)
+  bottom = np.max(bounds[lower] / nz[lower, None], axis=0) if lower.any() else np.full_like(top, -np.inf)
+  hit = top >= bottom
+  if side.any():
+    hit &= np.all(bounds[side] >= 0, axis=0)
+
+  return top.reshape(xs.shape), hit.reshape(xs.shape)
+
+def readObjParts(obj_filepath):
+  '''
+  Read the vertices of the objects ('o' groups) of an obj mesh, e.g. the convex parts of a convex decomposition
+
+  Returns: List of numpy arrays with the vertices of each part
+  '''
+  parts = [[]]
+  with open(obj_filepath) as f:
+    for line in f:
+      if line.startswith('o ') and parts[-1]:
+        parts.append([])
+      elif line.startswith('v '):
+        parts[-1].append(list(map(float, line.split()[1:4])))
+  return [np.array(part) for part in parts if part]
+
+def simplifyConvexParts(parts, max_vertices=None, single_hull=False):
+  '''
+  Replace the parts of a mesh by their convex hulls with at most max_vertices vertices each. The vertices are a
+  farthest point sampling of the hull vertices, so the simplified hulls lie inside the original ones.
+
+  Args:
+    - parts: List of numpy arrays with the vertices of each part
+    - max_vertices: Max number of vertices of each hull, not limited if None
+    - single_hull: Merge all parts into one convex hull
+
+  Returns: List of (vertices, triangles) of the hulls, triangles index into the vertices of their hull
+  '''
+  from scipy.spatial import ConvexHull
+
+  if single_hull:
+    parts = [np.concatenate(parts)]
+  hulls = list()
+  for vertices in parts:
+    vertices = vertices[ConvexHull(vertices).vertices]
+    if max_vertices is not None and len(vertices) > max_vertices:
+      vertices = vertices[_farthestPointSample(vertices, max_vertices)]
+    hull = ConvexHull(vertices)
+    # Keep only the vertices on the hull and orient the triangles to face outwards
+    used = np.unique(hull.simplices)
+    remap = np.zeros(len(vertices), dtype=int)
+    remap[used] = np.arange(len(used))
+    triangles = remap[hull.simplices]
+    vertices = vertices[used]
+    normals = np.cross(vertices[triangles[:, 1]] - vertices[triangles[:, 0]],
+                       vertices[triangles[:, 2]] - vertices[triangles[:, 0]])
+    flip = np.sum(normals * (vertices[triangles[:, 0]] - vertices.mean(axis=0)), axis=1) < 0
+    triangles[flip] = triangles[flip][:, ::-1]
+    hulls.append((vertices, triangles))
+  return hulls
+
+def writeObjParts(obj_filepath, hulls):
+  '''
+  Write hulls returned by simplifyConvexParts as the objects of an obj mesh
+  '''
+  with open(obj_filepath, 'w') as f:
+    offset = 1
+    for i, (vertices, triangles) in enumerate(hulls):
+      f.write('o convex_{}\n'.format(i))
+      for vertex in vertices:
+        f.write('v {:f} {:f} {:f}\n'.format(*vertex))
+      for triangle in triangles + offset:
+        f.write('f {} {} {}\n'.format(*triangle))
+      offset += len(vertices)
+
+def _farthestPointSample(points, num_points):
+  idxs = [int(np.argmax(np.linalg.norm(points - points.mean(axis=0), axis=1)))]
+  distances = np.linalg.norm(points - points[idxs[0]], axis=1)
+  while len(idxs) < num_points:
+    idxs.append(int(np.argmax(distances)))
+    distances = np.minimum(distances, np.linalg.norm(points - points[idxs[-1]], axis=1))
+  return idxs
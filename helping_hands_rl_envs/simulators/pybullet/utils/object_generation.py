@@ -33,8 +33,8 @@ def generateRoof(pos, rot, scale):
 def generateCylinder(pos, rot, scale):
   return Cylinder(pos, rot, scale)
 
-def generateRandomObj(pos, rot, scale, z_scale=1):
-  return RandomObject(pos, rot, scale, z_scale)
+def generateRandomObj(pos, rot, scale, z_scale=1, simplified_collision=False):
+  return RandomObject(pos, rot, scale, z_scale, simplified_collision=simplified_collision)
 
 def generateRandomBrick(pos, rot, x_scale, y_scale, z_scale):
   return RandomBrick(pos, rot, x_scale, y_scale, z_scale)
\ No newline at end of file
@@ -1,7 +1,49 @@
+import functools
+import inspect
 import pybullet as pb
 import numpy as np
 from helping_hands_rl_envs.simulators import constants
 
+# Functions which do not talk to a physics server and are never routed to a client
+CLIENT_FREE_FNS = ('connect', 'getQuaternionFromEuler', 'getEulerFromQuaternion', 'getMatrixFromQuaternion',
+                   'getQuaternionFromAxisAngle', 'getAxisAngleFromQuaternion', 'getDifferenceQuaternion',
+                   'getQuaternionSlerp', 'invertTransform', 'multiplyTransforms', 'rotateVector',
+                   'computeViewMatrix', 'computeViewMatrixFromYawPitchRoll', 'computeProjectionMatrix',
+                   'computeProjectionMatrixFOV')
+
+_pb_fns = dict()
+_active_client = 0
+
+def setActiveClient(client_id):
+  '''
+  Route all pybullet calls which do not specify a physicsClientId to the given physics client.
+  pybullet sends these calls to client 0, this allows several envs with their own clients to
+  share one process. Routing to client 0 restores the original pybullet functions.
+
+  Args:
+    - client_id: Id returned by pb.connect
+  '''
+  global _active_client
+  if client_id == _active_client:
+    return
+  if not _pb_fns:
+    for name, fn in vars(pb).items():
+      if inspect.isbuiltin(fn) and name not in CLIENT_FREE_FNS:
+        _pb_fns[name] = fn
+
+  for name, fn in _pb_fns.items():
+    setattr(pb, name, fn if client_id == 0 else functools.partial(fn, physicsClientId=client_id))
+  _active_client = client_id
+
+def getActiveClient():
+  return _active_client
+
+def getBodyIds():
+  '''
+  Get the unique ids of all bodies of the active client
+  '''
+  return [pb.getBodyUniqueId(i) for i in range(pb.getNumBodies())]
+
 def getMatrix(pos, rot):
   T = np.eye(4)
   T[:3, :3] = np.array(pb.getMatrixFromQuaternion(rot)).reshape((3, 3))
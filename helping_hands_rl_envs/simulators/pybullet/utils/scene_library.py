@@ -0,0 +1,124 @@
+import os
+import json
+import numpy as np
+import numpy.random as npr
+
+import helping_hands_rl_envs.simulators.pybullet.utils.object_generation as pb_obj_generation
+from helping_hands_rl_envs.simulators import constants
+
+# Each scene is a row of object records, rows of scenes with fewer objects are padded with EMPTY objects
+SCENE_DTYPE = np.dtype([('type', np.int8),
+                        ('pos', np.float32, 3),
+                        ('rot', np.float32, 4),
+                        ('scale', np.float32),
+                        ('structure', np.bool_)])
+EMPTY = -1
+
+GENERATE_FNS = {
+  constants.CUBE: pb_obj_generation.generateCube,
+  constants.BRICK: pb_obj_generation.generateBrick,
+  constants.TRIANGLE: pb_obj_generation.generateTriangle,
+  constants.ROOF: pb_obj_generation.generateRoof,
+  constants.CYLINDER: pb_obj_generation.generateCylinder,
+}
+
+def getScene(objects, object_types, structure_objs=()):
+  '''
+  Record the current poses and scales of the objects of an env
+
+  Args:
+    - objects: List of objects
+    - object_types: Dict with the shape type of each object
+    - structure_objs: Objects which are part of the structure of a deconstruct env
+
+  Returns: Numpy array of SCENE_DTYPE records, one for each object
+  '''
+  scene = np.zeros(len(objects), dtype=SCENE_DTYPE)
+  for i, obj in enumerate(objects):
+    if object_types[obj] not in GENERATE_FNS:
+      raise ValueError('Scene library does not support objects of shape type {}'.format(object_types[obj]))
+    pos, rot = obj.getPose()
+    scene[i] = (object_types[obj], pos, rot, obj.size / obj.original_size, obj in structure_objs)
+  return scene
+
+def getMetadataPath(path):
+  '''
+  Get the path of the metadata file stored next to a scene library
+  '''
+  return os.path.splitext(path)[0] + '.json'
+
+def saveSceneLibrary(path, scenes, metadata):
+  '''
+  Save scenes as a .npy file which can be memory mapped, and the metadata of the env which generated them as a
+  .json file next to it
+
+  Args:
+    - path: Path of the .npy file
+    - scenes: List of scenes returned by getScene
+    - metadata: Dict returned by getSceneLibraryMetadata of the env
+  '''
+  library = np.zeros((len(scenes), max(map(len, scenes))), dtype=SCENE_DTYPE)
+  library['type'] = EMPTY
+  for i, scene in enumerate(scenes):
+    library[i, :len(scene)] = scene
+  np.save(path, library)
+  with open(getMetadataPath(path), 'w') as f:
+    json.dump(metadata, f)
+
+class SceneLibrary(object):
+  '''
+  Memory mapped library of pre-generated initial scenes
+
+  Args:
+    - path: Path of the .npy file saved by saveSceneLibrary
+    - metadata: Dict returned by getSceneLibraryMetadata of the env loading the library. Raises a ValueError if
+                the library was generated by an env with other metadata
+  '''
+  def __init__(self, path, metadata=None):
+    self.scenes = np.load(path, mmap_mode='r')
+    metadata_path = getMetadataPath(path)
+    if not os.path.exists(metadata_path):
+      raise ValueError('Scene library {} has no metadata file {}'.format(path, metadata_path))
+    with open(metadata_path) as f:
+      self.metadata = json.load(f)
+    if metadata is not None:
+      # Compare the values as they are stored in the file, e.g. tuples as lists
+      metadata = json.loads(json.dumps(metadata))
+      for key in sorted(set(metadata) | set(self.metadata)):
+        if metadata.get(key) != self.metadata.get(key):
+          raise ValueError('Scene library {} was generated with {}={}, not {}'
+                           .format(path, key, self.metadata.get(key), metadata.get(key)))
+
+  def __len__(self):
+    return len(self.scenes)
+
+  def sample(self):
+    '''
+    Get a random scene
+
+    Returns: Numpy array of SCENE_DTYPE records without the padding
+    '''
+    scene = np.array(self.scenes[npr.randint(len(self.scenes))])
+    return scene[scene['type'] != EMPTY]
+
+  def loadScene(self, scene, create_fn=None):
+    '''
+    Load the objects of a scene at their recorded poses
+
+    Args:
+      - scene: Numpy array of SCENE_DTYPE records
+      - create_fn: Function creating an object from (shape type, pos, rot, scale), e.g. to take the objects from
+                   an object pool. The object generation functions if None
+
+    Returns: List of (object, shape type, is structure object) tuples
+    '''
+    objects = list()
+    for record in scene:
+      obj_type = int(record['type'])
+      pos, rot, scale = record['pos'].tolist(), record['rot'].tolist(), float(record['scale'])
+      if create_fn is None:
+        handle = GENERATE_FNS[obj_type](pos, rot, scale)
+      else:
+        handle = create_fn(obj_type, pos, rot, scale)
+      objects.append((handle, obj_type, bool(record['structure'])))
+    return objects
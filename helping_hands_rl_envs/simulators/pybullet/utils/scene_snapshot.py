@@ -0,0 +1,190 @@
+from collections import defaultdict
+
+import numpy as np
+import pybullet as pb
+
+from helping_hands_rl_envs.simulators.pybullet.utils import pybullet_util
+from helping_hands_rl_envs.simulators.pybullet.utils.spatial_index import SpatialIndex
+
+# Client id -> snapshot of the current scene of the client, dropped by invalidate
+_snapshots = dict()
+# Client id -> version of the scene of the client, increased by invalidate
+_versions = defaultdict(int)
+
+def stepSimulation():
+  '''
+  Step the simulation of the active client and invalidate its scene snapshot. Code which moves bodies through
+  pybullet directly must call invalidate afterwards.
+  '''
+  pb.stepSimulation()
+  invalidate()
+
+def invalidate():
+  '''
+  Drop the scene snapshot of the active client, e.g. after bodies were moved, added or removed
+  '''
+  client_id = pybullet_util.getActiveClient()
+  _versions[client_id] += 1
+  _snapshots.pop(client_id, None)
+
+def getVersion():
+  '''
+  Get the version of the scene of the active client, which changes whenever its snapshot is invalidated
+  '''
+  return _versions[pybullet_util.getActiveClient()]
+
+def getSnapshot(*body_ids):
+  '''
+  Get the snapshot of the current scene of the active client
+
+  Args:
+    - body_ids: Ids of bodies the snapshot must hold, the scene is captured again if one is missing
+
+  Returns: The SceneSnapshot
+  '''
+  client_id = pybullet_util.getActiveClient()
+  snapshot = _snapshots.get(client_id)
+  if snapshot is not None:
+    for body_id in body_ids:
+      if body_id not in snapshot.rows:
+        snapshot = None
+        break
+  if snapshot is None:
+    snapshot = _snapshots[client_id] = SceneSnapshot(_versions[client_id])
+    for body_id in body_ids:
+      if body_id not in snapshot.rows:
+        # Raise the error of pybullet for unknown bodies
+        pb.getBasePositionAndOrientation(body_id)
+  return snapshot
+
+class SceneSnapshot(object):
+  '''
+  Base poses, AABBs, velocities and contacts of all bodies of a scene. Each kind of data is read from pybullet for
+  all bodies the first time it is accessed and kept until the scene changes. The per body accessors return the
+  tuples read from pybullet, the array properties stack them into numpy arrays with one row per body.
+
+  Args:
+    - version: Version of the scene
+  '''
+  def __init__(self, version):
+    self.version = version
+    self.body_ids = pybullet_util.getBodyIds()
+    # Body id -> row of the body in the arrays
+    self.rows = {body_id: i for i, body_id in enumerate(self.body_ids)}
+    self._poses = None
+    self._euler_rotations = None
+    self._aabbs = None
+    self._velocities = None
+    self._contact_graph = None
+    self._arrays = dict()
+    self._spatial_indices = dict()
+
+  def getPose(self, body_id):
+    '''
+    Returns: (position, quaternion) of the base of the body
+    '''
+    if self._poses is None:
+      self._poses = [pb.getBasePositionAndOrientation(i) for i in self.body_ids]
+    return self._poses[self.rows[body_id]]
+
+  def getEulerRotation(self, body_id):
+    if self._euler_rotations is None:
+      self._euler_rotations = [pb.getEulerFromQuaternion(self.getPose(i)[1]) for i in self.body_ids]
+    return self._euler_rotations[self.rows[body_id]]
+
+  def getAABB(self, body_id):
+    '''
+    Returns: (aabb min, aabb max) of the base of the body
+    '''
+    if self._aabbs is None:
+      self._aabbs = [pb.getAABB(i) for i in self.body_ids]
+    return self._aabbs[self.rows[body_id]]
+
+  def getVelocity(self, body_id):
+    '''
+    Returns: (linear velocity, angular velocity) of the base of the body
+    '''
+    if self._velocities is None:
+      self._velocities = [pb.getBaseVelocity(i) for i in self.body_ids]
+    return self._velocities[self.rows[body_id]]
+
+  @property
+  def contact_graph(self):
+    '''
+    Body id -> set of the ids of the bodies in contact with it, built from a single sweep over all contact points
+    '''
+    if self._contact_graph is None:
+      self._contact_graph = defaultdict(set)
+      for point in pb.getContactPoints():
+        self._contact_graph[point[1]].add(point[2])
+        self._contact_graph[point[2]].add(point[1])
+    return self._contact_graph
+
+  def isTouching(self, body_id_1, body_id_2):
+    '''
+    Returns: True if the two bodies are in contact
+    '''
+    contacts = self.contact_graph.get(body_id_1)
+    return contacts is not None and body_id_2 in contacts
+
+  @property
+  def positions(self):
+    return self._getArray('positions', lambda i: self.getPose(i)[0], 3)
+
+  @property
+  def rotations(self):
+    '''
+    Base orientations as quaternions
+    '''
+    return self._getArray('rotations', lambda i: self.getPose(i)[1], 4)
+
+  @property
+  def euler_rotations(self):
+    return self._getArray('euler_rotations', self.getEulerRotation, 3)
+
+  @property
+  def aabb_mins(self):
+    return self._getArray('aabb_mins', lambda i: self.getAABB(i)[0], 3)
+
+  @property
+  def aabb_maxs(self):
+    return self._getArray('aabb_maxs', lambda i: self.getAABB(i)[1], 3)
+
+  @property
+  def linear_velocities(self):
+    return self._getArray('linear_velocities', lambda i: self.getVelocity(i)[0], 3)
+
+  @property
+  def angular_velocities(self):
+    return self._getArray('angular_velocities', lambda i: self.getVelocity(i)[1], 3)
+
+  def getSpatialIndex(self, body_ids, num_dims=3):
+    '''
+    Get the spatial index of the positions of bodies, which is kept until the scene changes
+
+    Args:
+      - body_ids: Ids of the bodies, the indices of the index are the indices in this list
+      - num_dims: 3 to index the positions, 2 to index the xy positions
+
+    Returns: The SpatialIndex
+    '''
+    key = (tuple(body_ids), num_dims)
+    if key not in self._spatial_indices:
+      self._spatial_indices[key] = SpatialIndex(self.positions[self.getRows(body_ids), :num_dims])
+    return self._spatial_indices[key]
+
+  def getRows(self, body_ids):
+    '''
+    Get the rows of bodies in the arrays of the snapshot
+
+    Args:
+      - body_ids: Ids of the bodies
+
+    Returns: numpy array of the rows
+    '''
+    return np.array([self.rows[body_id] for body_id in body_ids], dtype=int)
+
+  def _getArray(self, name, get_fn, size):
+    if name not in self._arrays:
+      self._arrays[name] = np.array([get_fn(i) for i in self.body_ids]).reshape(-1, size)
+    return self._arrays[name]
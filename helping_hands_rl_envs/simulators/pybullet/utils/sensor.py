@@ -1,6 +1,37 @@
 import pybullet as pb
 import numpy as np
 
+from helping_hands_rl_envs.simulators.pybullet.utils import convex_shape
+
+def getPixelCenters(target_pos, target_size, size):
+  '''
+  Get the x and y coordinates of the pixel centers of a top-down heightmap. Rows go along x and
+  columns along y, matching the camera heightmap.
+
+  Returns: (xs, ys)
+  '''
+  offsets = (np.arange(size) + 0.5) * target_size / size - target_size / 2
+  return target_pos[0] + offsets, target_pos[1] + offsets
+
+def getPixelWindow(xs, ys, aabb):
+  '''
+  Get the window of the pixels whose centers lie below an AABB
+
+  Returns: (x_start, x_end, y_start, y_end)
+  '''
+  aabb_min, aabb_max = aabb
+  x_start, x_end = np.searchsorted(xs, [aabb_min[0], aabb_max[0]])
+  y_start, y_end = np.searchsorted(ys, [aabb_min[1], aabb_max[1]])
+  return x_start, x_end, y_start, y_end
+
+def _hasMoved(state, old_state, tolerance):
+  '''
+  Check if a body moved by comparing nested sequences of coordinates, e.g. AABBs or poses
+  '''
+  if state is None or old_state is None:
+    return True
+  return any(np.abs(np.subtract(a, b)).max() > tolerance for a, b in zip(state, old_state))
+
 class Sensor(object):
   def __init__(self, cam_pos, cam_up_vector, target_pos, target_size):
     self.view_matrix = pb.computeViewMatrix(
@@ -23,3 +54,202 @@ class Sensor(object):
     depth = self.far * self.near / (self.far - (self.far - self.near) * depth_img)
 
     return np.abs(depth - np.max(depth)).reshape(size, size)
+
+class RaySensor(object):
+  '''
+  Sensor which computes a true orthographic top-down heightmap by casting vertical rays at the
+  pixel centers with pb.rayTestBatch instead of rendering a camera image. Rays are only cast at
+  the pixels below the AABB of a body, all other pixels see the ground.
+
+  The heightmap is updated incrementally: only the pixels below the old and new AABBs of the body
+  links which moved by more than MOVE_TOLERANCE since they were last cast are cast again.
+
+  Args:
+    - target_pos: Center of the ground area covered by the heightmap
+    - target_size: Side length of the area covered by the heightmap
+    - max_height: Height above target_pos the rays are cast from at most
+    - incremental: Only cast the rays again below the bodies which moved
+  '''
+  # Bodies which do not rise more than this above the ground, e.g. the ground plane, are not cast against
+  GROUND_MARGIN = 0.002
+  # Bodies which moved less than this are not cast again
+  MOVE_TOLERANCE = 1e-4
+
+  def __init__(self, target_pos, target_size, max_height=1., incremental=True):
+    self.target_pos = np.asarray(target_pos)
+    self.target_size = target_size
+    self.ray_top = self.target_pos[2] + max_height
+    self.ray_bottom = self.target_pos[2]
+    self.incremental = incremental
+
+    self.size = None
+    self.heights = None
+    self.aabbs = dict()
+
+  def _buildGrid(self, size):
+    '''
+    Compute the x/y coordinates of the pixel centers
+    '''
+    self.xs, self.ys = getPixelCenters(self.target_pos, self.target_size, size)
+    grid_xs, grid_ys = np.meshgrid(self.xs, self.ys, indexing='ij')
+    self.grid_xs, self.grid_ys = grid_xs.ravel(), grid_ys.ravel()
+    self.size = size
+    self.heights = None
+
+  def _getBodyAABBs(self):
+    '''
+    Get the AABBs of all body links which rise above the ground
+
+    Returns: Dict mapping (body id, link id) onto the AABB of the link
+    '''
+    aabbs = dict()
+    for i in range(pb.getNumBodies()):
+      body_id = pb.getBodyUniqueId(i)
+      for link_id in range(-1, pb.getNumJoints(body_id)):
+        aabb = pb.getAABB(body_id, link_id)
+        if aabb[1][2] > self.ray_bottom + self.GROUND_MARGIN:
+          aabbs[(body_id, link_id)] = aabb
+    return aabbs
+
+  def _castRays(self, ray_idxs, top):
+    '''
+    Cast vertical rays from top down to the ground at the given flat pixel indices
+
+    Returns: Numpy array of the heights the rays hit
+    '''
+    ray_from = np.stack([self.grid_xs[ray_idxs], self.grid_ys[ray_idxs], np.full(len(ray_idxs), top)], axis=1)
+    ray_to = np.stack([self.grid_xs[ray_idxs], self.grid_ys[ray_idxs], np.full(len(ray_idxs), self.ray_bottom)], axis=1)
+
+    # pybullet only returns MAX_RAY_INTERSECTION_BATCH_SIZE - 1 results per call
+    batch_size = pb.MAX_RAY_INTERSECTION_BATCH_SIZE - 1
+    fractions = list()
+    for i in range(0, len(ray_idxs), batch_size):
+      hits = pb.rayTestBatch(ray_from[i:i+batch_size].tolist(), ray_to[i:i+batch_size].tolist())
+      fractions.extend(hit[2] for hit in hits)
+
+    # Rays which do not hit anything return a hit fraction of 1, i.e. the ground
+    return (top - self.ray_bottom) * (1 - np.array(fractions))
+
+  def getHeightmap(self, size):
+    if size != self.size:
+      self._buildGrid(size)
+
+    aabbs = self._getBodyAABBs()
+    covered = np.zeros((size, size), dtype=bool)
+    for aabb in aabbs.values():
+      x_start, x_end, y_start, y_end = getPixelWindow(self.xs, self.ys, aabb)
+      covered[x_start:x_end, y_start:y_end] = True
+    top = max([self.ray_bottom] + [aabb[1][2] for aabb in aabbs.values()])
+    top = min(top + self.GROUND_MARGIN, self.ray_top)
+
+    if self.heights is None or not self.incremental:
+      self.heights = np.zeros((size, size))
+      dirty = np.ones((size, size), dtype=bool)
+    else:
+      dirty = np.zeros((size, size), dtype=bool)
+      for key in set(aabbs) | set(self.aabbs):
+        if not _hasMoved(aabbs.get(key), self.aabbs.get(key), self.MOVE_TOLERANCE):
+          # Keep the AABB the link was cast with so small movements do not add up
+          aabbs[key] = self.aabbs[key]
+          continue
+        for aabb in (aabbs.get(key), self.aabbs.get(key)):
+          if aabb is not None:
+            x_start, x_end, y_start, y_end = getPixelWindow(self.xs, self.ys, aabb)
+            dirty[x_start:x_end, y_start:y_end] = True
+    self.aabbs = aabbs
+
+    # Only cast rays at the dirty pixels below a body, the other dirty pixels see the ground
+    heights = self.heights.reshape(-1)
+    heights[dirty.reshape(-1)] = 0
+    ray_idxs = np.flatnonzero(dirty & covered)
+    heights[ray_idxs] = self._castRays(ray_idxs, top)
+
+    return self.heights - np.min(self.heights)
+
+class AnalyticSensor(object):
+  '''
+  Sensor which rasterizes the top-down heightmap from the poses and convex shapes of the objects
+  instead of rendering it. Only the given objects are drawn, other bodies such as the robot are not.
+  Scenes with objects of unknown shape are rendered by the fallback sensor.
+
+  The heightmap is updated incrementally: only the pixels below the old and new AABBs of the objects
+  which moved by more than MOVE_TOLERANCE since they were last drawn are drawn again.
+
+  Args:
+    - target_pos: Center of the ground area covered by the heightmap
+    - target_size: Side length of the area covered by the heightmap
+    - fallback_sensor: Sensor used for scenes which can not be rasterized
+    - incremental: Only draw the objects which moved again
+  '''
+  # Objects which moved less than this are not drawn again
+  MOVE_TOLERANCE = 1e-4
+
+  def __init__(self, target_pos, target_size, fallback_sensor, incremental=True):
+    self.target_pos = np.asarray(target_pos)
+    self.target_size = target_size
+    self.fallback_sensor = fallback_sensor
+    self.incremental = incremental
+
+    self.size = None
+    self.heightmap = None
+    self.object_states = dict()
+
+  def getHeightmap(self, size, objects):
+    half_spaces = [obj.getHalfSpaces() for obj in objects]
+    if any(h is None for h in half_spaces):
+      self.heightmap = None
+      return self.fallback_sensor.getHeightmap(size)
+
+    if size != self.size:
+      self.xs, self.ys = getPixelCenters(self.target_pos, self.target_size, size)
+      self.size = size
+      self.heightmap = None
+
+    object_states = dict()
+    for obj, obj_half_spaces in zip(objects, half_spaces):
+      window = getPixelWindow(self.xs, self.ys, obj.getBoundingBox())
+      object_states[obj.object_id] = (obj, obj_half_spaces, obj.getPose(), window)
+
+    dirty = np.zeros((size, size), dtype=bool)
+    if self.heightmap is None or not self.incremental:
+      self.heightmap = np.zeros((size, size))
+      dirty[:] = True
+    else:
+      for object_id in set(object_states) | set(self.object_states):
+        state, old_state = object_states.get(object_id), self.object_states.get(object_id)
+        # Objects are compared by identity as body ids are reused after the simulation is reset
+        if state and old_state and state[0] is old_state[0] and \
+           not _hasMoved(state[2], old_state[2], self.MOVE_TOLERANCE):
+          # Keep the pose the object was drawn with so small movements do not add up
+          object_states[object_id] = old_state
+          continue
+        for x_start, x_end, y_start, y_end in (s[3] for s in (state, old_state) if s is not None):
+          dirty[x_start:x_end, y_start:y_end] = True
+    self.object_states = object_states
+
+    if dirty.any():
+      self._draw(dirty)
+
+    return self.heightmap - np.min(self.heightmap)
+
+  def _draw(self, dirty):
+    '''
+    Redraw the dirty pixels of the cached heightmap from all objects overlapping them
+    '''
+    self.heightmap[dirty] = 0
+    for obj, half_spaces, (pos, rot), (x_start, x_end, y_start, y_end) in self.object_states.values():
+      # Only draw the part of the AABB window of the object containing dirty pixels
+      window_dirty = dirty[x_start:x_end, y_start:y_end]
+      dirty_rows, dirty_cols = np.flatnonzero(window_dirty.any(1)), np.flatnonzero(window_dirty.any(0))
+      if len(dirty_rows) == 0:
+        continue
+      x_end, y_end = x_start + dirty_rows[-1] + 1, y_start + dirty_cols[-1] + 1
+      x_start, y_start = x_start + dirty_rows[0], y_start + dirty_cols[0]
+
+      half_spaces = convex_shape.transformHalfSpaces(half_spaces, pos, rot)
+      xs, ys = np.meshgrid(self.xs[x_start:x_end], self.ys[y_start:y_end], indexing='ij')
+      top, hit = convex_shape.getTopSurface(half_spaces, xs, ys)
+
+      region = self.heightmap[x_start:x_end, y_start:y_end]
+      heights = np.maximum(region, np.where(hit, top - self.target_pos[2], 0))
+      region[:] = np.where(dirty[x_start:x_end, y_start:y_end], heights, region)
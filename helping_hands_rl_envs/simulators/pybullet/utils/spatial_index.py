@@ -0,0 +1,114 @@
+import numpy as np
+
+# Up to this number of points, radius and pair queries compute the distances between all points, which costs
+# less than sorting and pruning them
+DENSE_SIZE = 32
+
+class SpatialIndex(object):
+  '''
+  Index of points for nearest, radius and pair queries. Above DENSE_SIZE points, the points are sorted along their
+  first axis, so radius and pair queries only compute the distances to the points in the slab around the query
+  along that axis (sweep and prune) instead of to all points.
+
+  Args:
+    - points: (n, d) array of the points, e.g. the positions or the xy positions of objects
+  '''
+  def __init__(self, points):
+    self.points = np.asarray(points, dtype=float)
+    self.order = None
+    self.sorted_x = None
+
+  def __len__(self):
+    return len(self.points)
+
+  def getDistances(self, point):
+    '''
+    Get the distances of all points to a point
+
+    Args:
+      - point: The query point
+
+    Returns: numpy array of the distances
+    '''
+    return np.linalg.norm(self.points - np.asarray(point, dtype=float), axis=1)
+
+  def getPairwiseDistances(self):
+    '''
+    Returns: (n, n) numpy array of the distances between all points
+    '''
+    return np.linalg.norm(self.points[:, None] - self.points[None], axis=2)
+
+  def nearest(self, point, k=None):
+    '''
+    Get the points nearest to a point. Points at the same distance are ordered by their index.
+
+    Args:
+      - point: The query point
+      - k: Number of points, None for only the nearest one
+
+    Returns: Index of the nearest point or numpy array of the indices of the k nearest points
+    '''
+    distances = self.getDistances(point)
+    if k is None:
+      return int(distances.argmin())
+    return np.argsort(distances, kind='stable')[:k]
+
+  def queryRadius(self, point, radius):
+    '''
+    Get the points closer than radius to a point
+
+    Args:
+      - point: The query point
+      - radius: The radius
+
+    Returns: Sorted numpy array of the indices of the points
+    '''
+    point = np.asarray(point, dtype=float)
+    if len(self.points) <= DENSE_SIZE:
+      return np.flatnonzero(self.getDistances(point) < radius)
+    self._sort()
+    slab = self._getSlab(radius)
+    start = np.searchsorted(self.sorted_x, point[0] - slab, side='left')
+    end = np.searchsorted(self.sorted_x, point[0] + slab, side='right')
+    candidates = self.order[start:end]
+    distances = np.linalg.norm(self.points[candidates] - point, axis=1)
+    return np.sort(candidates[distances < radius])
+
+  def queryPairs(self, max_distance):
+    '''
+    Get the pairs of points closer than max_distance to each other
+
+    Args:
+      - max_distance: The distance
+
+    Returns: (m, 2) numpy array of the [i, j] index pairs with i < j, sorted by i and then j
+    '''
+    n = len(self.points)
+    if n <= DENSE_SIZE:
+      is_close = (self.getPairwiseDistances() < max_distance) & (np.arange(n)[:, None] < np.arange(n))
+      return np.argwhere(is_close)
+    self._sort()
+    # Each point is paired with the points after it in the sorted order which lie in its slab
+    ends = np.searchsorted(self.sorted_x, self.sorted_x + self._getSlab(max_distance), side='right')
+    counts = ends - np.arange(n) - 1
+    first = np.repeat(np.arange(n), counts)
+    second = first + 1 + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    pairs = np.stack((self.order[first], self.order[second]), axis=1).reshape(-1, 2)
+    distances = np.linalg.norm(self.points[pairs[:, 0]] - self.points[pairs[:, 1]], axis=1)
+    pairs = np.sort(pairs[distances < max_distance], axis=1)
+    return pairs[np.lexsort((pairs[:, 1], pairs[:, 0]))]
+
+  def hasPairCloserThan(self, max_distance):
+    '''
+    Returns: True if two of the points are closer than max_distance to each other
+    '''
+    return len(self.queryPairs(max_distance)) > 0
+
+  def _sort(self):
+    if self.order is None:
+      self.order = np.argsort(self.points[:, 0], kind='stable')
+      self.sorted_x = self.points[self.order, 0]
+
+  def _getSlab(self, distance):
+    # Grown a little so rounding can not drop a point whose computed distance is below the query distance
+    return distance * (1 + 1e-9) + 1e-12
@@ -0,0 +1,173 @@
+import math
+import numpy as np
+import pybullet as pb
+
+from helping_hands_rl_envs.simulators.pybullet.utils import pybullet_util
+
+# Denavit-Hartenberg parameters of the UR5. Frame 0 is the base link of the URDF rotated by pi around z
+# and frame 6 is the tool0 link of the URDF.
+D = np.array([0.089159, 0, 0, 0.10915, 0.09465, 0.0823])
+A = np.array([0, -0.425, -0.39225, 0, 0, 0])
+ALPHA = np.array([np.pi / 2, 0, 0, np.pi / 2, -np.pi / 2, 0])
+
+BASE_LINK_TO_BASE = np.array([[-1, 0, 0, 0],
+                              [0, -1, 0, 0],
+                              [0, 0, 1, 0],
+                              [0, 0, 0, 1]], dtype=np.float64)
+
+def _dhTransform(i, theta):
+  '''
+  Get the transform from DH frame i to frame i+1 for joint angle theta
+  '''
+  ct, st = np.cos(theta), np.sin(theta)
+  ca, sa = np.cos(ALPHA[i]), np.sin(ALPHA[i])
+  return np.array([[ct, -st * ca, st * sa, A[i] * ct],
+                   [st, ct * ca, -ct * sa, A[i] * st],
+                   [0, sa, ca, D[i]],
+                   [0, 0, 0, 1]])
+
+def forwardKinematics(q):
+  '''
+  Compute the pose of the tool0 link in the base link frame
+
+  Args:
+    - q: The 6 arm joint positions
+
+  Returns: 4x4 transform
+  '''
+  T = BASE_LINK_TO_BASE.copy()
+  for i in range(6):
+    T = T.dot(_dhTransform(i, q[i]))
+  return T
+
+def inverseKinematics(T):
+  '''
+  Compute all 8 closed form IK solutions of the UR5. The solutions are computed with scalar math since the
+  small numpy operations would dominate the run time.
+
+  Args:
+    - T: 4x4 transform of the tool0 link in the base link frame
+
+  Returns: 8x6 numpy array of joint positions in [-pi, pi], rows of unreachable solutions are nan
+  '''
+  d1, d4, d5, d6 = D[0], D[3], D[4], D[5]
+  a2, a3 = A[1], A[2]
+  # The DH base frame is the base link rotated by pi around z
+  (r00, r01, r02, px), (r10, r11, r12, py), (r20, r21, r22, pz) = (-T[0]).tolist(), (-T[1]).tolist(), T[2].tolist()
+  solutions = [[math.nan] * 6 for _ in range(8)]
+
+  # Shoulder pan from the position of the wrist center, two solutions for the shoulder left and right
+  p05x, p05y = px - d6 * r02, py - d6 * r12
+  r05 = math.hypot(p05x, p05y)
+  if r05 < abs(d4):
+    return np.array(solutions)
+  psi = math.atan2(p05y, p05x)
+  phi = math.acos(d4 / r05)
+  for i, theta1 in enumerate([psi + phi + math.pi / 2, psi - phi + math.pi / 2]):
+    s1, c1 = math.sin(theta1), math.cos(theta1)
+
+    # Wrist 2, two solutions for the wrist up and down
+    c5 = (px * s1 - py * c1 - d4) / d6
+    if abs(c5) > 1 + 1e-9:
+      continue
+    c5 = min(max(c5, -1.), 1.)
+    for j, theta5 in enumerate([math.acos(c5), -math.acos(c5)]):
+      s5 = math.sin(theta5)
+
+      # Wrist 3, arbitrary if the wrist is singular
+      if abs(s5) < 1e-9:
+        theta6 = 0.
+      else:
+        theta6 = math.atan2((-r01 * s1 + r11 * c1) / s5, (r00 * s1 - r10 * c1) / s5)
+      s6, c6 = math.sin(theta6), math.cos(theta6)
+
+      # Shoulder lift and elbow from the planar 2 link problem in frame 1, two solutions for the elbow up and down
+      x1 = r00 * c1 + r10 * s1
+      y1 = r01 * c1 + r11 * s1
+      z1 = r02 * c1 + r12 * s1
+      p13x = d5 * (s6 * x1 + c6 * y1) - d6 * z1 + px * c1 + py * s1
+      p13y = pz - d1 - d6 * r22 + d5 * (r21 * c6 + r20 * s6)
+      c3 = (p13x ** 2 + p13y ** 2 - a2 ** 2 - a3 ** 2) / (2 * a2 * a3)
+      if abs(c3) > 1 + 1e-9:
+        continue
+      c3 = min(max(c3, -1.), 1.)
+      # x axis of frame 4 in frame 1
+      x04x = -s5 * z1 - c5 * (s6 * y1 - c6 * x1)
+      x04y = c5 * (r20 * c6 - r21 * s6) - r22 * s5
+      for k, theta3 in enumerate([math.acos(c3), -math.acos(c3)]):
+        s3 = math.sin(theta3)
+        theta2 = math.atan2((a2 + a3 * c3) * p13y - a3 * s3 * p13x, (a2 + a3 * c3) * p13x + a3 * s3 * p13y)
+        c23, s23 = math.cos(theta2 + theta3), math.sin(theta2 + theta3)
+        theta4 = math.atan2(c23 * x04y - s23 * x04x, x04x * c23 + x04y * s23)
+        solutions[i * 4 + j * 2 + k] = [theta1, theta2, theta3, theta4, theta5, theta6]
+
+  solutions = np.array(solutions)
+  return (solutions + np.pi) % (2 * np.pi) - np.pi
+
+def selectSolution(solutions, current, lower_limits, upper_limits):
+  '''
+  Select the IK solution closest to the current joint positions which is within the joint limits. Each joint
+  position is shifted by multiples of 2*pi to be as close as possible to the current position.
+
+  Args:
+    - solutions: Nx6 numpy array of IK solutions, rows of unreachable solutions are nan
+    - current: The current 6 joint positions
+    - lower_limits: Lower limits of the 6 joints
+    - upper_limits: Upper limits of the 6 joints
+
+  Returns: The 6 selected joint positions, None if no solution is within the joint limits
+  '''
+  current = np.asarray(current)
+  solutions = solutions[~np.isnan(solutions).any(1)]
+  solutions = solutions + np.round((current - solutions) / (2 * np.pi)) * 2 * np.pi
+  # Shift the joints which ended up outside of the limits back by 2*pi if possible
+  solutions = np.where(solutions > upper_limits, solutions - 2 * np.pi, solutions)
+  solutions = np.where(solutions < lower_limits, solutions + 2 * np.pi, solutions)
+  valid = np.all((solutions >= lower_limits) & (solutions <= upper_limits), axis=1)
+  if not valid.any():
+    return None
+  solutions = solutions[valid]
+  return solutions[np.argmin(np.abs(solutions - current).sum(1))]
+
+class UR5IK(object):
+  '''
+  Closed form IK for the end effector of a loaded UR5 URDF
+
+  Args:
+    - robot_id: Body id of the robot
+    - arm_joint_indices: Indices of the 6 arm joints
+    - base_link_index: Index of the base link
+    - tool_link_index: Index of the tool0 link
+    - end_effector_index: Index of the end effector link, rigidly attached to tool0
+  '''
+  def __init__(self, robot_id, arm_joint_indices, base_link_index, tool_link_index, end_effector_index):
+    self.robot_id = robot_id
+    self.arm_joint_indices = arm_joint_indices
+
+    joint_infos = [pb.getJointInfo(robot_id, i) for i in arm_joint_indices]
+    self.lower_limits = np.array([info[8] for info in joint_infos])
+    self.upper_limits = np.array([info[9] for info in joint_infos])
+
+    tool_state = pb.getLinkState(robot_id, tool_link_index, computeForwardKinematics=True)
+    end_state = pb.getLinkState(robot_id, end_effector_index, computeForwardKinematics=True)
+    oTtool = pybullet_util.getMatrix(tool_state[4], tool_state[5])
+    oTend = pybullet_util.getMatrix(end_state[4], end_state[5])
+    self.end_to_tool = np.linalg.inv(oTend).dot(oTtool)
+    # The base of the UR5 is fixed
+    base_state = pb.getLinkState(robot_id, base_link_index)
+    self.base_inv = np.linalg.inv(pybullet_util.getMatrix(base_state[4], base_state[5]))
+
+  def solve(self, pos, rot):
+    '''
+    Compute the arm joint positions which put the end effector at the given pose
+
+    Args:
+      - pos: Position of the end effector
+      - rot: Orientation quaternion of the end effector
+
+    Returns: The 6 joint positions closest to the current ones, None if the pose is not reachable
+    '''
+    baseTtool = self.base_inv.dot(pybullet_util.getMatrix(pos, rot)).dot(self.end_to_tool)
+
+    current = [state[0] for state in pb.getJointStates(self.robot_id, self.arm_joint_indices)]
+    return selectSolution(inverseKinematics(baseTtool), current, self.lower_limits, self.upper_limits)
@@ -0,0 +1,76 @@
+'''
+Benchmark the heightmap sensor backends.
+
+Runs planner steps and times Sensor.getHeightmap ('camera'), RaySensor ('ray') and
+AnalyticSensor ('analytic') after each step, both recomputing the full heightmap and
+updating it incrementally. Reports the mean time per heightmap and the mean difference
+to the camera heightmap.
+
+Usage: python scripts/benchmark_heightmap.py --env house_building_3 --num_objects 4 --sizes 90 128 256
+'''
+
+import argparse
+import time
+import numpy as np
+
+from helping_hands_rl_envs import env_factory
+from helping_hands_rl_envs.simulators.pybullet.utils.sensor import RaySensor, AnalyticSensor
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser()
+  parser.add_argument('--env', type=str, default='block_stacking')
+  parser.add_argument('--robot', type=str, default='kuka')
+  parser.add_argument('--num_objects', type=int, default=4)
+  parser.add_argument('--sizes', type=int, nargs='+', default=[90, 128])
+  parser.add_argument('--num_steps', type=int, default=20)
+  parser.add_argument('--seed', type=int, default=0)
+  args = parser.parse_args()
+
+  workspace = np.asarray([[0.3, 0.6],
+                          [-0.15, 0.15],
+                          [0, 0.50]])
+  env_config = {'workspace': workspace, 'max_steps': 10, 'render': False, 'fast_mode': True, 'seed': args.seed,
+                'action_sequence': 'pxyr', 'num_objects': args.num_objects, 'random_orientation': True,
+                'robot': args.robot}
+  planner_config = {'random_orientation': True}
+
+  names = ['camera', 'ray', 'ray incr', 'analytic', 'analytic incr']
+  print('{:>6} '.format('size') + ' '.join('{:>22}'.format(name) for name in names))
+  for size in args.sizes:
+    runner = env_factory.createEnvs(0, 'pybullet', args.env, dict(env_config, obs_size=size), planner_config)
+    env = runner.env
+
+    # All sensors observe the same scene
+    target_pos = [workspace[0].mean(), workspace[1].mean(), 0]
+    target_size = workspace[0][1] - workspace[0][0]
+    camera_sensor = env.sensor
+    sensors = [camera_sensor,
+               RaySensor(target_pos, target_size, incremental=False),
+               RaySensor(target_pos, target_size),
+               AnalyticSensor(target_pos, target_size, camera_sensor, incremental=False),
+               AnalyticSensor(target_pos, target_size, camera_sensor)]
+    def getHeightmap(sensor):
+      if isinstance(sensor, AnalyticSensor):
+        return sensor.getHeightmap(size, env.objects)
+      return sensor.getHeightmap(size)
+
+    times = np.zeros(len(sensors))
+    diffs = np.zeros(len(sensors))
+    runner.reset()
+    [getHeightmap(sensor) for sensor in sensors]
+    for step in range(args.num_steps):
+      obs, reward, done = runner.step(runner.planner.getNextAction())
+      if done:
+        runner.reset()
+
+      heightmaps = list()
+      for i, sensor in enumerate(sensors):
+        start = time.perf_counter()
+        heightmaps.append(getHeightmap(sensor))
+        times[i] += time.perf_counter() - start
+      diffs += [np.abs(heightmaps[0] - heightmap).mean() for heightmap in heightmaps]
+
+    times /= args.num_steps
+    diffs /= args.num_steps
+    results = ['{:.2f}ms {:.1f}x {:.5f}'.format(t * 1000, times[0] / t, d) for t, d in zip(times, diffs)]
+    print('{:>6} '.format(size) + ' '.join('{:>22}'.format(result) for result in results))
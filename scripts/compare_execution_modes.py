@@ -0,0 +1,87 @@
+'''
+Compare the arm and teleport execution modes.
+
+Runs the planner for the same episodes in both execution modes for each task and reports the
+success rate, the rate of the steps in which a block fell, the rate of failed picks, the mean
+episode length and the mean time per step.
+
+Usage: python scripts/compare_execution_modes.py --envs block_stacking house_building_1 --num_episodes 50
+'''
+
+import argparse
+import time
+import numpy as np
+
+from helping_hands_rl_envs import env_factory
+from helping_hands_rl_envs.simulators import constants
+
+def runEpisodes(env_type, env_config, planner_config, num_episodes):
+  '''
+  Run planner episodes and collect statistics
+
+  Returns: Dict with the success, fall and failed pick rates, the mean episode length and the mean step time
+  '''
+  runner = env_factory.createEnvs(0, 'pybullet', env_type, env_config, planner_config)
+  env = runner.env
+  successes, falls, picks, failed_picks, steps, step_time = 0, 0, 0, 0, 0, 0.
+  for episode in range(num_episodes):
+    runner.reset()
+    done = False
+    while not done:
+      action = runner.getNextAction()
+      motion_primative = env._decodeAction(action)[0]
+      is_holding = env._isHolding()
+
+      start = time.perf_counter()
+      obs, reward, done = runner.step(action)
+      step_time += time.perf_counter() - start
+      steps += 1
+
+      if motion_primative == constants.PICK_PRIMATIVE and not is_holding:
+        picks += 1
+        failed_picks += not env._isHolding()
+      falls += env.didBlockFall()
+    successes += reward
+
+  return {'success': successes / num_episodes,
+          'fall': falls / steps,
+          'failed pick': failed_picks / max(picks, 1),
+          'length': steps / num_episodes,
+          'step time': step_time / steps}
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser()
+  parser.add_argument('--envs', type=str, nargs='+', default=['block_stacking', 'house_building_1'])
+  parser.add_argument('--robot', type=str, default='kuka')
+  parser.add_argument('--num_objects', type=int, nargs='+', default=[4, 3],
+                      help='Number of objects for each env, the last one is used for the remaining envs')
+  parser.add_argument('--num_episodes', type=int, default=20)
+  parser.add_argument('--seed', type=int, default=0)
+  args = parser.parse_args()
+
+  workspace = np.asarray([[0.3, 0.6],
+                          [-0.15, 0.15],
+                          [0, 0.50]])
+  planner_config = {'random_orientation': True}
+
+  modes = ['arm', 'teleport']
+  names = ['success', 'fall', 'failed pick', 'length', 'step time']
+  print('{:>32} {:>9} '.format('env', 'mode') + ' '.join('{:>11}'.format(name) for name in names))
+  for i, env_type in enumerate(args.envs):
+    num_objects = args.num_objects[min(i, len(args.num_objects) - 1)]
+    results = dict()
+    for mode in modes:
+      env_config = {'workspace': workspace, 'max_steps': 10, 'obs_size': 90, 'render': False, 'fast_mode': True,
+                    'seed': args.seed, 'action_sequence': 'pxyr', 'num_objects': num_objects,
+                    'random_orientation': True, 'robot': args.robot, 'execution_mode': mode}
+      results[mode] = runEpisodes(env_type, env_config, planner_config, args.num_episodes)
+      print('{:>32} {:>9} '.format(env_type, mode) +
+            ' '.join('{:>11.3f}'.format(results[mode][name]) for name in names[:-1]) +
+            ' {:>9.2f}ms'.format(results[mode]['step time'] * 1000))
+    print('{:>32} {:>9} {:>11.3f} {:>11.3f} {:>11.3f} {:>11.3f} {:>10.1f}x'.format(
+      env_type, 'diff',
+      results['teleport']['success'] - results['arm']['success'],
+      results['teleport']['fall'] - results['arm']['fall'],
+      results['teleport']['failed pick'] - results['arm']['failed pick'],
+      results['teleport']['length'] - results['arm']['length'],
+      results['arm']['step time'] / results['teleport']['step time']))
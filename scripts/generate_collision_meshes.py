@@ -0,0 +1,74 @@
+'''
+Generate the simplified collision meshes of the random objects for random_object_collision='simplified'.
+
+The meshes in random_urdfs are convex decompositions with one obj object per convex part. Each part is replaced
+by its convex hull with at most --max_vertices vertices, or all parts are merged into one convex hull with
+--single_hull, and written next to the mesh as <mesh>_collision.obj. The simplified hulls make loading the
+collision shapes and computing the contacts of the random objects cheaper at the cost of less accurate shapes.
+
+Usage: python scripts/generate_collision_meshes.py --max_vertices 12
+'''
+
+import argparse
+import glob
+import os
+import time
+import numpy as np
+import pybullet as pb
+
+import helping_hands_rl_envs
+from helping_hands_rl_envs.simulators import constants
+from helping_hands_rl_envs.simulators.pybullet.objects import random_object
+from helping_hands_rl_envs.simulators.pybullet.utils import convex_shape
+
+def timeContacts(obj_filepaths, num_objects=40, num_steps=500):
+  '''
+  Time the simulation steps of a pile of objects with the given collision meshes
+  '''
+  pb.resetSimulation()
+  pb.setGravity(0, 0, -10)
+  pb.createMultiBody(0, pb.createCollisionShape(pb.GEOM_PLANE))
+  rng = np.random.RandomState(0)
+  for i in range(num_objects):
+    collision_shape = pb.createCollisionShape(pb.GEOM_MESH, fileName=obj_filepaths[i % len(obj_filepaths)],
+                                              meshScale=[0.006] * 3)
+    pos = [0.05 * (i % 5), 0.05 * (i // 5 % 4), 0.05 + 0.04 * (i // 20)]
+    pb.createMultiBody(0.1, collision_shape, -1, pos, pb.getQuaternionFromEuler(rng.uniform(0, np.pi, 3)))
+  start = time.perf_counter()
+  for i in range(num_steps):
+    pb.stepSimulation()
+  return (time.perf_counter() - start) / num_steps
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser()
+  parser.add_argument('--max_vertices', type=int, default=12)
+  parser.add_argument('--single_hull', action='store_true')
+  parser.add_argument('--used_only', action='store_true', help='Only the meshes sampled by RandomObject')
+  args = parser.parse_args()
+
+  if args.used_only:
+    obj_filepaths = random_object.getMeshFilepaths()
+  else:
+    root_dir = os.path.dirname(helping_hands_rl_envs.__file__)
+    obj_filepaths = sorted(glob.glob(os.path.join(root_dir, constants.URDF_PATH, 'random_urdfs/*/[0-9][0-9][0-9].obj')))
+
+  num_written, num_vertices, num_simplified_vertices = 0, 0, 0
+  for obj_filepath in obj_filepaths:
+    parts = convex_shape.readObjParts(obj_filepath)
+    try:
+      hulls = convex_shape.simplifyConvexParts(parts, args.max_vertices, args.single_hull)
+    except (ValueError, RuntimeError) as e:
+      # Some meshes are broken, e.g. 168.obj has NaN vertices
+      print('Skipped {}: {}'.format(obj_filepath, str(e).splitlines()[0]))
+      continue
+    convex_shape.writeObjParts(random_object.getCollisionFilepath(obj_filepath), hulls)
+    num_written += 1
+    num_vertices += sum(map(len, parts))
+    num_simplified_vertices += sum(len(vertices) for vertices, _ in hulls)
+  print('Wrote {} collision meshes, {:.1f} -> {:.1f} vertices per mesh'.format(
+    num_written, num_vertices / num_written, num_simplified_vertices / num_written))
+
+  pb.connect(pb.DIRECT)
+  used = random_object.getMeshFilepaths()
+  print('Step time of a pile of 40 objects: mesh {:.2f}ms, simplified {:.2f}ms'.format(
+    timeContacts(used) * 1000, timeContacts(list(map(random_object.getCollisionFilepath, used))) * 1000))
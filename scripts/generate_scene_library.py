@@ -0,0 +1,56 @@
+'''
+Generate a library of initial scenes for the 'library' reset mode.
+
+Resets the env with the default reset mode and stores the settled poses, shape types and scales of the
+objects of each scene in a .npy file. The env type, number of objects and object related config are stored
+in a .json file next to it, the library can only be loaded by envs with the same config.
+
+Usage: python scripts/generate_scene_library.py --env house_building_1_deconstruct --num_objects 3 --num_scenes 1000 --output house_1_deconstruct.npy
+'''
+
+import argparse
+import time
+import numpy as np
+
+from helping_hands_rl_envs import env_factory
+from helping_hands_rl_envs.simulators.pybullet.utils import scene_library
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser()
+  parser.add_argument('--env', type=str, default='block_stacking')
+  parser.add_argument('--num_objects', type=int, default=4)
+  parser.add_argument('--num_scenes', type=int, default=1000)
+  parser.add_argument('--random_orientation', type=int, default=1)
+  parser.add_argument('--object_scale_range', type=float, nargs=2, default=[0.6, 0.7])
+  parser.add_argument('--seed', type=int, default=0)
+  parser.add_argument('--output', type=str, required=True)
+  args = parser.parse_args()
+
+  workspace = np.asarray([[0.3, 0.6],
+                          [-0.15, 0.15],
+                          [0, 0.50]])
+  env_config = {'workspace': workspace, 'max_steps': 10, 'obs_size': 90, 'render': False, 'fast_mode': True,
+                'seed': args.seed, 'action_sequence': 'pxyr', 'num_objects': args.num_objects,
+                'random_orientation': bool(args.random_orientation), 'object_scale_range': args.object_scale_range,
+                'robot': 'kuka', 'sensor_mode': 'analytic'}
+  runner = env_factory.createEnvs(0, 'pybullet', args.env, env_config)
+  env = runner.env
+
+  scenes = list()
+  start = time.perf_counter()
+  for i in range(args.num_scenes):
+    env.reset()
+    scenes.append(env.getScene())
+  reset_time = (time.perf_counter() - start) / args.num_scenes
+  scene_library.saveSceneLibrary(args.output, scenes, env.getSceneLibraryMetadata())
+
+  # Time the library resets for comparison
+  runner = env_factory.createEnvs(0, 'pybullet', args.env,
+                                  dict(env_config, reset_mode='library', scene_library=args.output))
+  start = time.perf_counter()
+  for i in range(min(args.num_scenes, 100)):
+    runner.env.reset()
+  library_reset_time = (time.perf_counter() - start) / min(args.num_scenes, 100)
+
+  print('Saved {} scenes to {}'.format(args.num_scenes, args.output))
+  print('Reset time: generate {:.2f}ms, library {:.2f}ms'.format(reset_time * 1000, library_reset_time * 1000))
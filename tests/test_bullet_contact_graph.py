@@ -0,0 +1,64 @@
+import unittest
+from itertools import combinations
+import numpy as np
+import pybullet as pb
+
+from helping_hands_rl_envs import env_factory
+from helping_hands_rl_envs.simulators import constants
+from helping_hands_rl_envs.simulators.pybullet.utils import pybullet_util
+
+def isTouching(body_id_1, body_id_2):
+  '''
+  Look for the contact in the contact points of the first body, as isTouching did before the contact graph
+  '''
+  return any(p[2] == body_id_2 for p in pb.getContactPoints(body_id_1))
+
+class TestBulletContactGraph(unittest.TestCase):
+  workspace = np.asarray([[0.3, 0.6],
+                          [-0.15, 0.15],
+                          [0, 0.50]])
+  env_config = {'workspace': workspace, 'max_steps': 10, 'obs_size': 90, 'render': False, 'fast_mode': True,
+                'seed': 0, 'action_sequence': 'pxyr', 'num_objects': 4, 'random_orientation': True,
+                'robot': 'kuka'}
+  planner_config = {'random_orientation': True}
+
+  def testContacts(self):
+    for env_type, num_objects in [('block_stacking', 4), ('house_building_1', 3)]:
+      env_config = dict(self.env_config, num_objects=num_objects)
+      runner = env_factory.createEnvs(0, 'pybullet', env_type, env_config, self.planner_config)
+      env = runner.env
+      for i in range(2):
+        runner.reset()
+        done = False
+        while not done:
+          contact_graph = env.getContactGraph()
+          body_ids = pybullet_util.getBodyIds()
+          for body_id_1 in body_ids:
+            for body_id_2 in body_ids:
+              expected = isTouching(body_id_1, body_id_2)
+              self.assertEqual(body_id_2 in contact_graph.get(body_id_1, ()), expected)
+          for obj in env.objects:
+            self.assertEqual(env._isObjOnGround(obj), isTouching(obj.object_id, env.table_id))
+            for other in env.objects:
+              self.assertEqual(obj.isTouching(other), isTouching(obj.object_id, other.object_id))
+          obs, reward, done = runner.step(runner.getNextAction())
+        # The graph is built again for the scene after the step
+        self.assertIsNot(env.getContactGraph(), contact_graph)
+
+  def testImproviseTermination(self):
+    env_config = dict(self.env_config, num_objects=3)
+    runner = env_factory.createEnvs(0, 'pybullet', 'improvise_house_building_2', env_config, self.planner_config)
+    env = runner.env
+    num_done = 0
+    for i in range(3):
+      runner.reset()
+      done = False
+      while not done:
+        obs, reward, done = runner.step(runner.getNextAction())
+        rand_objs = [obj for obj in env.objects if env.object_types[obj] == constants.RANDOM]
+        roof = [obj for obj in env.objects if env.object_types[obj] == constants.ROOF][0]
+        expected = any(env._checkOnTop(obj1, roof) and env._checkOnTop(obj2, roof)
+                       for obj1, obj2 in combinations(rand_objs, 2))
+        self.assertEqual(env._checkTermination(), expected)
+      num_done += reward
+    self.assertGreater(num_done, 0)
@@ -0,0 +1,77 @@
+import unittest
+import numpy as np
+import pybullet as pb
+
+from helping_hands_rl_envs import env_factory
+
+class TestBulletIKCache(unittest.TestCase):
+  env_config = {'max_steps': 10, 'obs_size': 90, 'render': False, 'fast_mode': True, 'seed': 0,
+                'action_sequence': 'pxyr', 'num_objects': 1, 'robot': 'kuka'}
+
+  def countIKCalls(self, robot):
+    calls = [0]
+    calculate_ik = robot._calculateIK
+    def _calculateIK(*args, **kwargs):
+      calls[0] += 1
+      return calculate_ik(*args, **kwargs)
+    robot._calculateIK = _calculateIK
+    return calls
+
+  def testCache(self):
+    env = env_factory.createEnvs(0, 'pybullet', 'block_stacking', self.env_config).env
+    env.reset()
+    robot = env.robot
+    calls = self.countIKCalls(robot)
+    pos = [0.45, 0.05, 0.1]
+    rot = pb.getQuaternionFromEuler([0, 0, -0.5])
+
+    robot.moveTo(pos, rot, dynamic=False)
+    miss_calls = calls[0]
+    self.assertEqual(robot.getIKCacheStats(), {'hits': 0, 'warm_starts': 0, 'misses': 1, 'size': 1})
+
+    # Repeated targets reuse the cached solution, also for the equivalent negated quaternion
+    robot.moveToJ(robot.home_positions_joint, dynamic=False)
+    robot.moveTo(pos, -np.array(rot), dynamic=False)
+    self.assertEqual(robot.ik_cache_hits, 1)
+    self.assertLess(calls[0] - miss_calls, miss_calls)
+    np.testing.assert_allclose(robot._getEndEffectorPosition(), pos, atol=1e-3)
+
+    # Nearby targets are warm started from the cached solution
+    robot.moveToJ(robot.home_positions_joint, dynamic=False)
+    robot.moveTo([0.451, 0.05, 0.1], rot, dynamic=False)
+    self.assertEqual(robot.ik_cache_warm_starts, 1)
+    np.testing.assert_allclose(robot._getEndEffectorPosition(), [0.451, 0.05, 0.1], atol=1e-3)
+
+  def testWarmStart(self):
+    env_config = dict(self.env_config, robot='ur5', ik_mode='iterative')
+    env = env_factory.createEnvs(0, 'pybullet', 'block_picking', env_config).env
+    env.reset()
+    robot = env.robot
+    rot = pb.getQuaternionFromEuler([0, np.pi, 0])
+    robot.moveTo([0.45, 0.05, 0.1], rot, dynamic=False)
+
+    # Nearby targets are warm started from the cached solution
+    robot.moveToJ(robot.home_positions_joint, dynamic=False)
+    robot.moveTo([0.451, 0.05, 0.1], rot, dynamic=False)
+    self.assertEqual(robot.ik_cache_warm_starts, 1)
+    np.testing.assert_allclose(robot._getEndEffectorPosition(), [0.451, 0.05, 0.1], atol=1e-3)
+
+  def testEviction(self):
+    env = env_factory.createEnvs(0, 'pybullet', 'block_stacking', dict(self.env_config, ik_cache_size=2)).env
+    env.reset()
+    robot = env.robot
+    rot = pb.getQuaternionFromEuler([0, 0, -0.5])
+    for x in [0.35, 0.45, 0.55]:
+      robot.moveTo([x, 0, 0.1], rot, dynamic=False)
+    self.assertEqual(len(robot.ik_cache), 2)
+
+    # The least recently used target was evicted
+    robot.moveTo([0.35, 0, 0.1], rot, dynamic=False)
+    self.assertEqual(robot.ik_cache_hits, 0)
+    robot.moveTo([0.55, 0, 0.1], rot, dynamic=False)
+    self.assertEqual(robot.ik_cache_hits, 1)
+
+    env = env_factory.createEnvs(0, 'pybullet', 'block_stacking', dict(self.env_config, ik_cache_size=0)).env
+    env.reset()
+    env.robot.moveTo([0.45, 0, 0.1], rot, dynamic=False)
+    self.assertEqual(env.robot.getIKCacheStats(), {'hits': 0, 'warm_starts': 0, 'misses': 0, 'size': 0})
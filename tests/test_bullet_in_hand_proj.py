@@ -0,0 +1,75 @@
+import unittest
+import numpy as np
+import numpy.random as npr
+from scipy.ndimage import median_filter
+
+from helping_hands_rl_envs import env_factory
+from helping_hands_rl_envs.envs.base_env import BaseEnv
+from helping_hands_rl_envs.simulators.pybullet.utils import transformations
+
+def getInHandOccupancyGridProj(crop, z, rot, size, heightmap_resolution):
+  '''
+  Project the occupancy with a dense occupancy cube, as getInHandOccupancyGridProj did before it was vectorized
+  '''
+  rx, ry, rz = rot
+  crop = np.round(crop, 5)
+  zs = np.array([z+(-size/2+i)*(heightmap_resolution) for i in range(size)])
+  zs = zs.reshape((1, 1, -1)).repeat(size, 0).repeat(size, 1)
+  c = crop.reshape(size, size, 1).repeat(size, 2)
+  point = np.argwhere(c > zs)
+  ori_point = point - size/2
+  R = transformations.euler_matrix(rx, ry, rz)[:3, :3].T
+  point = R.dot(ori_point.T)
+  point = point + size/2
+  point = np.round(point).astype(int)
+  point = point.T[(np.logical_and(0 < point.T, point.T < size)).all(1)].T
+  occupancy = np.zeros((size, size, size))
+  occupancy[point[0], point[1], point[2]] = 1
+  occupancy = median_filter(occupancy, size=2)
+  occupancy = np.ceil(occupancy)
+  projection = np.stack((occupancy.sum(0), occupancy.sum(1), occupancy.sum(2)))
+  return np.rollaxis(projection, 0, 3)
+
+class TestBulletInHandProj(unittest.TestCase):
+  workspace = np.asarray([[0.3, 0.6],
+                          [-0.15, 0.15],
+                          [0, 0.50]])
+  env_config = {'workspace': workspace, 'max_steps': 10, 'obs_size': 90, 'render': False, 'fast_mode': True,
+                'seed': 0, 'action_sequence': 'pxyr', 'num_objects': 3, 'random_orientation': True,
+                'robot': 'kuka', 'in_hand_mode': 'proj'}
+  planner_config = {'random_orientation': True}
+
+  def testRandomCrops(self):
+    rng = npr.RandomState(0)
+    for size in [16, 24, 32]:
+      env = BaseEnv(0, self.workspace, 10, 90, in_hand_size=size, in_hand_mode='proj')
+      for i in range(100):
+        crop = np.zeros((size, size))
+        x, y = rng.randint(0, size - 4, 2)
+        w, h = rng.randint(2, size // 2, 2)
+        crop[x:x+w, y:y+h] = rng.uniform(0.01, 0.08)
+        crop += rng.uniform(0, 0.003, crop.shape) * (i % 2)
+        z = rng.uniform(-0.01, 0.1)
+        rot = rng.uniform(-np.pi, np.pi, 3) * [0.3 * (i % 3 > 0), 0.3 * (i % 3 > 0), 1]
+        expected = getInHandOccupancyGridProj(crop, z, rot, size, env.heightmap_resolution)
+        np.testing.assert_array_equal(env.getInHandOccupancyGridProj(crop, z, rot), expected)
+
+  def testEnv(self):
+    runner = env_factory.createEnvs(0, 'pybullet', 'block_stacking', self.env_config, self.planner_config)
+    env = runner.env
+    calls = []
+    get_proj = env.getInHandOccupancyGridProj
+    def recordProj(crop, z, rot):
+      calls.append((crop.copy(), z, rot))
+      return get_proj(crop, z, rot)
+    env.getInHandOccupancyGridProj = recordProj
+
+    for i in range(2):
+      runner.reset()
+      done = False
+      while not done:
+        obs, reward, done = runner.step(runner.getNextAction())
+    self.assertGreater(len(calls), 0)
+    for crop, z, rot in calls:
+      expected = getInHandOccupancyGridProj(crop, z, rot, env.in_hand_size, env.heightmap_resolution)
+      np.testing.assert_array_equal(get_proj(crop, z, rot), expected)
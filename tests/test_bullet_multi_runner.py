@@ -0,0 +1,301 @@
+import unittest
+import asyncio
+import os
+import signal
+import tempfile
+import time
+from functools import partial
+import numpy as np
+
+from helping_hands_rl_envs import env_factory
+from helping_hands_rl_envs.runner import MultiRunner
+
+def createLabelEnv(env_config):
+  '''
+  Create a block stacking env whose steps also return metadata, like HouseBuildingXEnv with custom labels
+  '''
+  env = env_factory.getEnvFn('pybullet', 'block_stacking')(env_config)
+  step = env.step
+  env.step = lambda action: (*step(action), {'labels': [0]})
+  return env
+
+class TestBulletMultiRunner(unittest.TestCase):
+  workspace = np.asarray([[0.3, 0.6],
+                          [-0.15, 0.15],
+                          [0, 0.50]])
+  env_config = {'workspace': workspace, 'max_steps': 10, 'obs_size': 90, 'render': False, 'fast_mode': True,
+                'seed': 0, 'action_sequence': 'pxyr', 'num_objects': 2, 'random_orientation': True,
+                'reward_type': 'sparse', 'simulate_grasp': True, 'perfect_grasp': False, 'robot': 'kuka',
+                'workspace_check': 'point'}
+
+  planner_config = {'random_orientation': True}
+
+  def runEpisode(self, env):
+    obs = [tuple(map(np.copy, env.reset()))]
+    for i in range(2):
+      action = env.getNextAction()
+      obs_, rewards, dones = env.step(action, auto_reset=True)
+      obs.append(tuple(map(np.copy, obs_)))
+    return obs, rewards, dones
+
+  def testSharedMemory(self):
+    num_processes = 2
+    env = env_factory.createEnvs(num_processes, 'pybullet', 'block_stacking', self.env_config, self.planner_config)
+    pipe_obs, pipe_rewards, pipe_dones = self.runEpisode(env)
+    env.close()
+
+    env = env_factory.createEnvs(num_processes, 'pybullet', 'block_stacking', self.env_config, self.planner_config,
+                                 shared_memory=True)
+    shm_obs, shm_rewards, shm_dones = self.runEpisode(env)
+
+    for (states, in_hands, heightmaps), (states_, in_hands_, heightmaps_) in zip(pipe_obs, shm_obs):
+      self.assertTrue(np.allclose(states, states_))
+      self.assertTrue(np.allclose(in_hands, in_hands_))
+      self.assertTrue(np.allclose(heightmaps, heightmaps_))
+    self.assertTrue(np.allclose(pipe_rewards, shm_rewards))
+    self.assertTrue(np.allclose(pipe_dones, shm_dones))
+
+    # Observations are not overwritten by later steps
+    obs = env.reset()
+    saved_obs = tuple(map(np.copy, obs))
+    env.step(env.getNextAction(), auto_reset=False)
+    for o, saved_o in zip(obs, saved_obs):
+      self.assertTrue(np.array_equal(o, saved_o))
+
+    states, in_hands, heightmaps = env.reset_envs([1])
+    self.assertEqual(heightmaps.shape, (1, 1, 90, 90))
+    states, in_hands, heightmaps = env.getObs()
+    self.assertEqual(heightmaps.shape, (num_processes, 1, 90, 90))
+    env.close()
+
+  def testEnvsPerWorker(self):
+    num_processes = 4
+    env = env_factory.createEnvs(num_processes, 'pybullet', 'block_stacking', self.env_config, self.planner_config)
+    single_obs, single_rewards, single_dones = self.runEpisode(env)
+    env.close()
+
+    env = env_factory.createEnvs(num_processes, 'pybullet', 'block_stacking', self.env_config, self.planner_config,
+                                 envs_per_worker=3)
+    self.assertEqual(env.num_processes, 2)
+    multi_obs, multi_rewards, multi_dones = self.runEpisode(env)
+
+    for (states, in_hands, heightmaps), (states_, in_hands_, heightmaps_) in zip(single_obs, multi_obs):
+      self.assertTrue(np.allclose(states, states_))
+      self.assertTrue(np.allclose(in_hands, in_hands_))
+      self.assertTrue(np.allclose(heightmaps, heightmaps_))
+    self.assertTrue(np.allclose(single_rewards, multi_rewards))
+    self.assertTrue(np.allclose(single_dones, multi_dones))
+
+    states, in_hands, heightmaps = env.reset_envs([3, 0])
+    self.assertEqual(heightmaps.shape, (2, 1, 90, 90))
+    self.assertEqual(env.getObjectPositions().shape, (num_processes, 2, 3))
+    env.close()
+
+  def testStepAsync(self):
+    num_processes = 4
+    env = env_factory.createEnvs(num_processes, 'pybullet', 'block_stacking', self.env_config, self.planner_config,
+                                 shared_memory=True, envs_per_worker=2)
+    env.reset()
+    actions = env.getNextAction()
+    env.step_async([3, 0], actions[[3, 0]])
+    with self.assertRaises(ValueError):
+      env.step_async([0], actions[[0]])
+    env.step_async([1], actions[[1]])
+
+    returned = list()
+    while len(returned) < 3:
+      env_nums, (states, in_hands, heightmaps), rewards, dones = env.poll(timeout=60)
+      self.assertEqual(heightmaps.shape, (len(env_nums), 1, 90, 90))
+      returned.extend(env_nums)
+    self.assertEqual(sorted(returned), [0, 1, 3])
+
+    env_nums, obs, rewards, dones = env.poll(timeout=0)
+    self.assertEqual(len(env_nums), 0)
+
+    # the remaining env can be stepped asynchronously with auto reset as well
+    env.step_async([2], actions[[2]], auto_reset=True)
+    env_nums, obs, rewards, dones = env.poll(min_ready=1)
+    self.assertEqual(list(env_nums), [2])
+    env.close()
+
+  def testStepWithPlanner(self):
+    num_processes = 2
+    env = env_factory.createEnvs(num_processes, 'pybullet', 'block_stacking', self.env_config, self.planner_config)
+    env.reset()
+    for i in range(1, -1, -1):
+      (states, in_hands, heightmaps), rewards, dones, actions, steps_left = env.stepWithPlanner()
+      self.assertEqual(actions.shape, (num_processes, 4))
+      self.assertTrue((steps_left == i).all())
+    self.assertTrue((rewards == 1).all())
+    self.assertTrue((dones == 1).all())
+
+    obs, actions, rewards, next_obs, dones, steps_left = env.collectExpertTransitions(5)
+    self.assertEqual(obs[2].shape, (num_processes, 5, 1, 90, 90))
+    self.assertEqual(next_obs[1].shape, (num_processes, 5, 1, 24, 24))
+    self.assertEqual(actions.shape, (num_processes, 5, 4))
+    self.assertTrue(np.allclose(rewards, dones))
+    env.close()
+
+  def testReconfigure(self):
+    num_processes = 2
+    env = env_factory.createEnvs(num_processes, 'pybullet', 'block_stacking', self.env_config, self.planner_config,
+                                 envs_per_worker=2)
+    env.reset()
+    processes = list(env.processes)
+
+    env_config = dict(self.env_config, num_objects=3)
+    env.reconfigure('house_building_1', env_config, self.planner_config)
+    self.assertEqual(env.processes, processes)
+    env.reset()
+    self.assertEqual(env.getObjectPositions().shape, (num_processes, 3, 3))
+    for i in range(3, -1, -1):
+      action = env.getNextAction()
+      (states_, in_hands_, obs_), rewards, dones = env.step(action, auto_reset=False)
+      self.assertTrue((env.getStepsLeft() == i).all())
+    self.assertTrue((dones == 1).all())
+    env.close()
+
+  def testWorkerRestart(self):
+    num_processes = 2
+    env = env_factory.createEnvs(num_processes, 'pybullet', 'block_stacking', self.env_config, self.planner_config,
+                                 timeout=10)
+    reset_states, reset_in_hands, reset_obs = tuple(map(np.copy, env.reset()))
+
+    # Crashed worker
+    action = env.getNextAction()
+    os.kill(env.processes[1].pid, signal.SIGKILL)
+    (states_, in_hands_, obs_), rewards, dones = env.step(action)
+    self.assertEqual(env.restarted.tolist(), [False, True])
+    self.assertEqual(dones[1], 1)
+    self.assertEqual(rewards[1], 0)
+    self.assertTrue(np.allclose(obs_[1], reset_obs[1]))
+    self.assertEqual(env.getNextAction().shape[0], num_processes)
+    self.assertFalse(env.restarted.any())
+
+    # Hung worker during an async step
+    action = env.getNextAction()
+    os.kill(env.processes[0].pid, signal.SIGSTOP)
+    env.step_async([0], action[:1])
+    env_nums, (states_, in_hands_, obs_), rewards, dones = env.poll()
+    self.assertEqual(env_nums.tolist(), [0])
+    self.assertEqual(env.restarted.tolist(), [True, False])
+    self.assertTrue(np.allclose(obs_[0], reset_obs[0]))
+    env.close()
+
+  def testWorkerRestartMetadata(self):
+    num_processes = 2
+    def createRunner():
+      env_fns = [partial(createLabelEnv, env_factory.getEnvConfig('block_stacking', self.env_config, i))
+                 for i in range(num_processes)]
+      planner_fns = [env_factory.getPlannerFn('block_stacking', self.planner_config)] * num_processes
+      return MultiRunner(env_fns, planner_fns, timeout=10)
+
+    # Worker crashed before its first step reply, the other reply of the batch has metadata
+    env = createRunner()
+    env.reset()
+    action = env.getNextAction()
+    os.kill(env.processes[1].pid, signal.SIGKILL)
+    obs_, rewards, dones, metadata = env.step(action)
+    self.assertEqual(env.restarted.tolist(), [False, True])
+    self.assertEqual(metadata, ({'labels': [0]}, {}))
+
+    # Worker whose last step reply had metadata, alone in the batch
+    env.reset()
+    env.step(env.getNextAction())
+    action = env.getNextAction()
+    os.kill(env.processes[1].pid, signal.SIGKILL)
+    env.step_async([1], action[1:])
+    env_nums, obs_, rewards, dones, metadata = env.poll()
+    self.assertEqual(env_nums.tolist(), [1])
+    self.assertEqual(metadata, ({},))
+
+    os.kill(env.processes[0].pid, signal.SIGKILL)
+    obs_, rewards, dones, actions, steps_left, metadata = env.stepWithPlanner()
+    self.assertEqual(env.restarted.tolist(), [True, False])
+    self.assertEqual(len(metadata), num_processes)
+    env.close()
+
+    # The metadata returned by poll stays aligned with the envs
+    env = createRunner()
+    env.reset()
+    action = env.getNextAction()
+    os.kill(env.processes[0].pid, signal.SIGKILL)
+    env.step_async([0, 1], action)
+    env_nums, obs_, rewards, dones, metadata = env.poll(min_ready=2)
+    self.assertEqual(sorted(env_nums.tolist()), [0, 1])
+    self.assertEqual(metadata[env_nums.tolist().index(0)], {})
+    self.assertEqual(metadata[env_nums.tolist().index(1)], {'labels': [0]})
+    env.close()
+
+  def testAsyncRunner(self):
+    async def runPlanner(env):
+      await env.reset()
+      for i in range(1, -1, -1):
+        action = await env.getNextAction()
+        (states_, in_hands_, obs_), rewards, dones = await env.step(action, auto_reset=False)
+        steps_left = await env.getStepsLeft()
+        self.assertTrue((steps_left == i).all())
+      return rewards
+
+    async def runConcurrently(envs):
+      rewards = await asyncio.gather(*[runPlanner(env) for env in envs])
+      await asyncio.gather(*[env.close() for env in envs])
+      return rewards
+
+    envs = [env_factory.createEnvs(2, 'pybullet', 'block_stacking', self.env_config, self.planner_config,
+                                   async_runner=True),
+            env_factory.createEnvs(2, 'pybullet', 'block_stacking', self.env_config, self.planner_config,
+                                   shared_memory=True, envs_per_worker=2, async_runner=True)]
+    rewards = asyncio.run(runConcurrently(envs))
+    self.assertTrue(all((r == 1).all() for r in rewards))
+
+  def testAsyncWorkerRestart(self):
+    async def tick(ticks):
+      while True:
+        ticks.append(time.time())
+        await asyncio.sleep(0.01)
+
+    async def stepWithRestart(env):
+      await env.reset()
+      action = await env.getNextAction()
+      ticks = list()
+      ticker = asyncio.create_task(tick(ticks))
+      os.kill(env.processes[1].pid, signal.SIGKILL)
+      start = time.time()
+      (states_, in_hands_, obs_), rewards, dones = await env.step(action)
+      end = time.time()
+      ticker.cancel()
+      await env.close()
+      return dones, ticks, start, end
+
+    env = env_factory.createEnvs(2, 'pybullet', 'block_stacking', self.env_config, self.planner_config,
+                                 async_runner=True, timeout=10)
+    dones, ticks, start, end = asyncio.run(stepWithRestart(env))
+    self.assertEqual(env.restarted.tolist(), [False, True])
+    self.assertEqual(dones[1], 1)
+    # The other coroutine kept running while the worker was restarted
+    ticks = [start] + [t for t in ticks if start < t < end] + [end]
+    self.assertLess(np.diff(ticks).max(), (end - start) / 4)
+
+  def testAsyncRunnerCommands(self):
+    async def runCommands(env, path):
+      env_config = dict(self.env_config, num_objects=3)
+      await env.reconfigure('house_building_1', env_config, self.planner_config)
+      await env.reset()
+      self.assertEqual((await env.getObjectPositions()).shape, (2, 3, 3))
+      obs, actions, rewards, next_obs, dones, steps_left = await env.collectExpertTransitions(3)
+      self.assertEqual(actions.shape, (2, 3, 4))
+
+      positions = await env.getObjectPositions()
+      await env.saveToFile(path)
+      await env.step(await env.getNextAction())
+      self.assertTrue(await env.loadFromFile(path))
+      self.assertTrue(np.allclose(await env.getObjectPositions(), positions))
+      await env.close()
+
+    env = env_factory.createEnvs(2, 'pybullet', 'block_stacking', self.env_config, self.planner_config,
+                                 async_runner=True)
+    with self.assertRaises(NotImplementedError):
+      env.poll()
+    with tempfile.TemporaryDirectory() as path:
+      asyncio.run(runCommands(env, path))
@@ -0,0 +1,71 @@
+import unittest
+import numpy as np
+import pybullet as pb
+
+from helping_hands_rl_envs import env_factory
+from helping_hands_rl_envs.simulators.pybullet.objects import object_pool
+
+class TestBulletObjectPool(unittest.TestCase):
+  workspace = np.asarray([[0.3, 0.6],
+                          [-0.15, 0.15],
+                          [0, 0.50]])
+  env_config = {'workspace': workspace, 'max_steps': 10, 'obs_size': 90, 'render': False, 'fast_mode': True,
+                'seed': 0, 'action_sequence': 'pxyr', 'num_objects': 3, 'random_orientation': True,
+                'robot': 'kuka', 'hard_reset_freq': 100, 'object_pool': True}
+  planner_config = {'random_orientation': True}
+
+  def testReuseBodies(self):
+    # A single scale and mesh so every reset after the first one re-uses all bodies
+    env_config = dict(self.env_config, object_scale_range=(0.6, 0.6))
+    runner = env_factory.createEnvs(0, 'pybullet', 'block_stacking', env_config, self.planner_config)
+    env = runner.env
+    runner.reset()
+    num_bodies = pb.getNumBodies()
+    for i in range(5):
+      runner.reset()
+      self.assertEqual(pb.getNumBodies(), num_bodies)
+      self.assertEqual(len(env.object_pool), 0)
+      for obj in env.objects:
+        # The re-activated objects rest on the ground
+        self.assertGreater(obj.getZPosition(), 0)
+        self.assertLess(obj.getZPosition(), 0.05)
+    self.assertEqual(env.object_pool.misses, 3)
+    self.assertEqual(env.object_pool.hits, 15)
+
+  def testParkedObjects(self):
+    runner = env_factory.createEnvs(0, 'pybullet', 'random_picking', self.env_config)
+    env = runner.env
+    runner.reset()
+    objects = list(env.objects)
+    runner.reset()
+    parked = [obj for obj in objects if obj not in env.objects]
+    self.assertEqual(len(env.object_pool), len(parked))
+    for obj in parked:
+      self.assertEqual(obj.getPosition(), object_pool.PARK_POS)
+      self.assertEqual(pb.getDynamicsInfo(obj.object_id, -1)[0], 0)
+      self.assertEqual(len(pb.getContactPoints(obj.object_id)), 0)
+    for obj in env.objects:
+      self.assertGreater(pb.getDynamicsInfo(obj.object_id, -1)[0], 0)
+
+  def testPlanner(self):
+    runner = env_factory.createEnvs(0, 'pybullet', 'block_stacking', self.env_config, self.planner_config)
+    env = runner.env
+    total = 0
+    for i in range(10):
+      runner.reset()
+      done = False
+      while not done:
+        obs, reward, done = runner.step(runner.getNextAction())
+      total += reward
+    self.assertGreater(env.object_pool.hits, 0)
+    self.assertGreaterEqual(total, 8)
+
+  def testCapacity(self):
+    runner = env_factory.createEnvs(0, 'pybullet', 'random_picking', dict(self.env_config, object_pool_capacity=2))
+    env = runner.env
+    runner.reset()
+    num_bodies = pb.getNumBodies()
+    for i in range(5):
+      runner.reset()
+      self.assertLessEqual(len(env.object_pool), 2)
+      self.assertLessEqual(pb.getNumBodies(), num_bodies + 2)
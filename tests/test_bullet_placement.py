@@ -0,0 +1,118 @@
+import time
+import unittest
+import numpy as np
+import numpy.random as npr
+
+from helping_hands_rl_envs import env_factory
+from helping_hands_rl_envs.envs.numpy_envs.numpy_env import NumpyEnv
+from helping_hands_rl_envs.envs.utils import placement
+from helping_hands_rl_envs.simulators.constants import NoValidPositionException
+
+def sampleSequential(sample_range, min_distance, existing_positions, num_shapes, num_attempts=100):
+  '''
+  Draw and check the candidates one after the other, as _getValidPositions did before it was vectorized
+  '''
+  existing_positions = list(existing_positions)
+  valid_positions = list()
+  for i in range(num_shapes):
+    for j in range(num_attempts):
+      position = [(sample_range[0][1] - sample_range[0][0]) * npr.random_sample() + sample_range[0][0],
+                  (sample_range[1][1] - sample_range[1][0]) * npr.random_sample() + sample_range[1][0]]
+      if all(np.linalg.norm(np.array(p) - position) > min_distance for p in existing_positions):
+        break
+    else:
+      raise NoValidPositionException
+    existing_positions.append(position)
+    valid_positions.append(position)
+  return valid_positions
+
+class TestBulletPlacement(unittest.TestCase):
+  workspace = np.asarray([[0.3, 0.6],
+                          [-0.15, 0.15],
+                          [0, 0.50]])
+  env_config = {'workspace': workspace, 'max_steps': 10, 'obs_size': 90, 'render': False, 'fast_mode': True,
+                'seed': 0, 'action_sequence': 'xyrp', 'num_objects': 5, 'random_orientation': True,
+                'robot': 'kuka'}
+  sample_range = [[0.33, 0.57], [-0.12, 0.12]]
+
+  def testValidPositions(self):
+    existing_positions = [[0.45, 0, 0.02], [0.4, 0.1, 0.02]]
+    for seed in range(20):
+      npr.seed(seed)
+      try:
+        positions = np.array(placement.sampleValidPositions(self.sample_range, 0.08, existing_positions, 4))
+      except NoValidPositionException:
+        continue
+      self.assertEqual(positions.shape, (4, 2))
+      self.assertTrue(np.all(positions >= np.array(self.sample_range)[:, 0]))
+      self.assertTrue(np.all(positions <= np.array(self.sample_range)[:, 1]))
+      all_positions = np.concatenate((np.array(existing_positions)[:, :2], positions))
+      distances = np.linalg.norm(all_positions[:, None] - all_positions[None], axis=2)
+      self.assertTrue(np.all(distances[np.triu_indices(len(all_positions), 1)] > 0.08))
+
+  def testSequentialSampling(self):
+    for seed in range(20):
+      existing_positions = [[0.45, 0], [0.4, 0.1]]
+      npr.seed(seed)
+      try:
+        expected = sampleSequential(self.sample_range, 0.08, existing_positions, 4)
+      except NoValidPositionException:
+        expected = None
+      expected_next = npr.random_sample()
+
+      npr.seed(seed)
+      try:
+        positions = placement.sampleValidPositions(self.sample_range, 0.08, existing_positions, 4)
+      except NoValidPositionException:
+        positions = None
+      # The same positions and the same random numbers afterwards
+      if expected is None:
+        self.assertIsNone(positions)
+      else:
+        np.testing.assert_allclose(positions, expected)
+      self.assertEqual(npr.random_sample(), expected_next)
+
+  def testPosCandidate(self):
+    pos_candidate = [np.array([0.3, 0.4, 0.5, 0.6]), np.array([-0.15, -0.05, 0.05, 0.15])]
+    candidate_range = [[0.3, 0.6], [-0.15, 0.15]]
+    positions = placement.sampleValidPositions(self.sample_range, 0.05, [], 4, pos_candidate=pos_candidate,
+                                               candidate_range=candidate_range)
+    for x, y in positions:
+      self.assertIn(x, [0.4, 0.5])
+      self.assertIn(y, [-0.05, 0.05])
+    with self.assertRaises(NoValidPositionException):
+      placement.sampleValidPositions(self.sample_range, 0.05, [], 1, pos_candidate=pos_candidate,
+                                     candidate_range=[[0.3, 0.4], [-0.15, 0.15]])
+
+  def testInfeasible(self):
+    self.assertFalse(placement.isPackingFeasible(self.sample_range, 0.1, 20))
+    self.assertTrue(placement.isPackingFeasible(self.sample_range, 0.1, 4))
+    state = npr.get_state()[1].copy()
+    start = time.time()
+    with self.assertRaises(NoValidPositionException):
+      placement.sampleValidPositions(self.sample_range, 0.1, [], 20)
+    self.assertLess(time.time() - start, 0.01)
+    # No random numbers are drawn for a placement which can not succeed
+    np.testing.assert_array_equal(npr.get_state()[1], state)
+
+  def testEnv(self):
+    runner = env_factory.createEnvs(0, 'pybullet', 'block_stacking', self.env_config)
+    env = runner.env
+    for i in range(3):
+      runner.reset()
+      positions = np.array([o.getXYPosition() for o in env.objects])
+      distances = np.linalg.norm(positions[:, None] - positions[None], axis=2)
+      self.assertTrue(np.all(distances[np.triu_indices(len(positions), 1)] > 0.8 * env.max_block_size))
+    with self.assertRaises(NoValidPositionException):
+      env._getValidPositions(0.1, 0.2, [], 20)
+
+  def testNumpyEnv(self):
+    env = NumpyEnv({'seed': 0, 'workspace': np.asarray([[0, 90], [0, 90], [0, 90]]), 'max_steps': 10,
+                    'obs_size': 90, 'render': False, 'action_sequence': 'pxyr'})
+    positions = env._getValidPositions(10, 20, [], 4)
+    for x, y in positions:
+      self.assertIsInstance(x, int)
+      self.assertTrue(5 <= x <= 85 and 5 <= y <= 85)
+    # Used to retry forever
+    with self.assertRaises(NoValidPositionException):
+      env._getValidPositions(10, 40, [], 20)
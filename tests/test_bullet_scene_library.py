@@ -0,0 +1,83 @@
+import unittest
+import os
+import tempfile
+import numpy as np
+
+from helping_hands_rl_envs import env_factory
+from helping_hands_rl_envs.simulators import constants
+from helping_hands_rl_envs.simulators.pybullet.utils import scene_library
+
+class TestBulletSceneLibrary(unittest.TestCase):
+  workspace = np.asarray([[0.3, 0.6],
+                          [-0.15, 0.15],
+                          [0, 0.50]])
+  env_config = {'workspace': workspace, 'max_steps': 10, 'obs_size': 90, 'render': False, 'fast_mode': True,
+                'seed': 0, 'action_sequence': 'pxyr', 'num_objects': 3, 'random_orientation': True,
+                'robot': 'kuka'}
+  planner_config = {'random_orientation': True}
+
+  def generateLibrary(self, env_type, path, num_scenes=5):
+    env = env_factory.createEnvs(0, 'pybullet', env_type, self.env_config, self.planner_config).env
+    scenes = list()
+    for i in range(num_scenes):
+      env.reset()
+      scenes.append(env.getScene())
+    scene_library.saveSceneLibrary(path, scenes, env.getSceneLibraryMetadata())
+    return scenes
+
+  def testLibraryReset(self):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+      path = os.path.join(tmp_dir, 'block_stacking.npy')
+      scenes = self.generateLibrary('block_stacking', path)
+      self.assertEqual(len(scene_library.SceneLibrary(path)), 5)
+
+      env_config = dict(self.env_config, reset_mode='library', scene_library=path)
+      runner = env_factory.createEnvs(0, 'pybullet', 'block_stacking', env_config, self.planner_config)
+      env = runner.env
+      for i in range(3):
+        runner.reset()
+        # The objects are at the poses of one of the scenes
+        positions = np.array([obj.getPosition() for obj in env.objects])
+        self.assertTrue(any(np.allclose(scene['pos'], positions, atol=1e-4) for scene in scenes))
+        self.assertEqual([env.object_types[obj] for obj in env.objects], [constants.CUBE] * 3)
+
+        done = False
+        while not done:
+          obs, reward, done = runner.step(runner.getNextAction())
+        self.assertEqual(reward, 1)
+
+  def testDeconstructLibraryReset(self):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+      path = os.path.join(tmp_dir, 'house_building_1_deconstruct.npy')
+      self.generateLibrary('house_building_1_deconstruct', path)
+
+      env_config = dict(self.env_config, reset_mode='library', scene_library=path)
+      runner = env_factory.createEnvs(0, 'pybullet', 'house_building_1_deconstruct', env_config, self.planner_config)
+      env = runner.env
+      for i in range(3):
+        runner.reset()
+        self.assertTrue(env.checkStructure())
+        self.assertEqual(env.structure_objs, env.objects)
+        done = False
+        while not done:
+          obs, reward, done = runner.step(runner.getNextAction())
+        self.assertTrue(env._checkTermination())
+
+  def testMetadata(self):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+      path = os.path.join(tmp_dir, 'block_stacking.npy')
+      self.generateLibrary('block_stacking', path, num_scenes=2)
+      self.assertEqual(scene_library.SceneLibrary(path).metadata['env'], 'BlockStackingEnv')
+
+      # Libraries generated for another env type or object config are not loaded
+      for env_type, env_config in [('house_building_1', {}),
+                                   ('block_stacking', {'num_objects': 4}),
+                                   ('block_stacking', {'object_scale_range': (0.8, 0.8)}),
+                                   ('block_stacking', {'workspace': self.workspace + [[0.1, 0.1], [0, 0], [0, 0]]})]:
+        env_config = dict(self.env_config, reset_mode='library', scene_library=path, **env_config)
+        with self.assertRaises(ValueError):
+          env_factory.createEnvs(0, 'pybullet', env_type, env_config, self.planner_config)
+
+      os.remove(scene_library.getMetadataPath(path))
+      with self.assertRaises(ValueError):
+        scene_library.SceneLibrary(path)
@@ -0,0 +1,99 @@
+import unittest
+import numpy as np
+import pybullet as pb
+
+from helping_hands_rl_envs import env_factory
+from helping_hands_rl_envs.simulators import constants
+from helping_hands_rl_envs.simulators.pybullet.utils import scene_snapshot
+
+def getNumTopBlock(env):
+  '''
+  Count the stacks of blocks one block after the other, as _getNumTopBlock did before it used the snapshot
+  '''
+  cluster_pos = []
+  for obj in env.objects:
+    if env._isObjectHeld(obj):
+      continue
+    block_position = list(pb.getBasePositionAndOrientation(obj.object_id)[0])
+    for cluster in cluster_pos:
+      if np.allclose(block_position[:-1], cluster, atol=env.block_original_size*env.block_scale_range[0]*2/3):
+        cluster.append(block_position[:-1])
+        break
+    else:
+      cluster_pos.append([block_position[:-1]])
+  return len(cluster_pos) + env._isHolding()
+
+def isObjOnTop(env, obj):
+  obj_position = pb.getBasePositionAndOrientation(obj.object_id)[0]
+  for o in env.objects:
+    if env._isObjectHeld(o) or o is obj:
+      continue
+    block_position = pb.getBasePositionAndOrientation(o.object_id)[0]
+    if np.allclose(block_position[:-1], obj_position[:-1],
+                   atol=env.block_original_size * env.block_scale_range[0] * 2 / 3) and \
+        block_position[-1] > obj_position[-1]:
+      return False
+  return True
+
+class TestBulletSceneSnapshot(unittest.TestCase):
+  workspace = np.asarray([[0.3, 0.6],
+                          [-0.15, 0.15],
+                          [0, 0.50]])
+  env_config = {'workspace': workspace, 'max_steps': 10, 'obs_size': 90, 'render': False, 'fast_mode': True,
+                'seed': 0, 'action_sequence': 'pxyr', 'num_objects': 4, 'random_orientation': True,
+                'robot': 'kuka'}
+  planner_config = {'random_orientation': True}
+
+  def testInvalidate(self):
+    runner = env_factory.createEnvs(0, 'pybullet', 'block_stacking', self.env_config, self.planner_config)
+    env = runner.env
+    runner.reset()
+    obj = env.objects[0]
+    snapshot = scene_snapshot.getSnapshot()
+    # The snapshot is kept until the scene changes
+    obj.getPosition()
+    self.assertIs(scene_snapshot.getSnapshot(obj.object_id), snapshot)
+
+    version = scene_snapshot.getVersion()
+    obj.resetPose([0.45, 0.1, 0.2], pb.getQuaternionFromEuler([0, 0, 0.5]))
+    self.assertGreater(scene_snapshot.getVersion(), version)
+    np.testing.assert_allclose(obj.getPosition(), [0.45, 0.1, 0.2])
+    np.testing.assert_allclose(obj.getEulerRotation(), [0, 0, 0.5], atol=1e-6)
+
+    snapshot = scene_snapshot.getSnapshot()
+    env.wait(10)
+    self.assertIsNot(scene_snapshot.getSnapshot(), snapshot)
+    self.assertLess(obj.getPosition()[2], 0.2)
+
+    env.saveState()
+    env.wait(100)
+    env.restoreState()
+    self.assertEqual(obj.getPose(), tuple(map(list, pb.getBasePositionAndOrientation(obj.object_id))))
+
+    # Bodies added and removed since the snapshot was taken
+    env._removeObject(obj)
+    new_obj = env._generateShapes(shape_type=constants.CUBE, num_shapes=1)[0]
+    self.assertEqual(new_obj.getPosition(), list(pb.getBasePositionAndOrientation(new_obj.object_id)[0]))
+    with self.assertRaises(pb.error):
+      scene_snapshot.getSnapshot(1000)
+
+  def testValues(self):
+    runner = env_factory.createEnvs(0, 'pybullet', 'block_stacking', self.env_config, self.planner_config)
+    env = runner.env
+    for i in range(3):
+      runner.reset()
+      done = False
+      while not done:
+        for obj in env.objects:
+          pos, rot = pb.getBasePositionAndOrientation(obj.object_id)
+          self.assertEqual(obj.getPose(), (list(pos), list(rot)))
+          self.assertEqual(obj.getEulerRotation(), list(pb.getEulerFromQuaternion(rot)))
+          self.assertEqual(obj.getBoundingBox(), list(pb.getAABB(obj.object_id)))
+          self.assertEqual(obj.getVelocity(), pb.getBaseVelocity(obj.object_id))
+          self.assertEqual(env._isObjOnTop(obj), isObjOnTop(env, obj))
+        self.assertEqual(env._getNumTopBlock(), getNumTopBlock(env))
+        expected = [list(pb.getBasePositionAndOrientation(obj.object_id)[0]) +
+                    list(env.convertQuaternionToEuler(pb.getBasePositionAndOrientation(obj.object_id)[1]))
+                    for obj in env.objects if not env._isObjectHeld(obj)]
+        np.testing.assert_array_equal(env.getObjectPoses(), np.array(expected))
+        obs, reward, done = runner.step(runner.getNextAction())
@@ -0,0 +1,71 @@
+import unittest
+import numpy as np
+
+from helping_hands_rl_envs import env_factory
+from helping_hands_rl_envs.simulators.pybullet.utils.sensor import RaySensor, AnalyticSensor
+
+class TestBulletSensor(unittest.TestCase):
+  workspace = np.asarray([[0.3, 0.6],
+                          [-0.15, 0.15],
+                          [0, 0.50]])
+  env_config = {'workspace': workspace, 'max_steps': 10, 'obs_size': 90, 'render': False, 'fast_mode': True,
+                'seed': 0, 'action_sequence': 'pxyr', 'num_objects': 4, 'random_orientation': True,
+                'robot': 'kuka'}
+
+  def testRaySensor(self):
+    env = env_factory.createEnvs(0, 'pybullet', 'block_stacking', self.env_config).env
+    target_pos = [self.workspace[0].mean(), self.workspace[1].mean(), 0]
+    ray_sensor = RaySensor(target_pos, self.workspace[0][1] - self.workspace[0][0])
+
+    for i in range(3):
+      env.reset()
+      camera_heightmap = env.sensor.getHeightmap(90)
+      ray_heightmap = ray_sensor.getHeightmap(90)
+      self.assertEqual(ray_heightmap.shape, (90, 90))
+      self.assertAlmostEqual(camera_heightmap.max(), ray_heightmap.max(), places=3)
+      # The camera projection differs from the orthographic rays only along the object edges
+      self.assertLess(np.abs(camera_heightmap - ray_heightmap).mean(), 1e-3)
+
+    env = env_factory.createEnvs(0, 'pybullet', 'block_stacking', dict(self.env_config, sensor_mode='ray')).env
+    self.assertIsInstance(env.sensor, RaySensor)
+    states, in_hands, heightmaps = env.reset()
+    self.assertEqual(heightmaps.shape, (1, 90, 90))
+
+  def testAnalyticSensor(self):
+    for env_type, num_objects in [('block_stacking', 4), ('house_building_1', 3), ('house_building_3', 4)]:
+      env_config = dict(self.env_config, num_objects=num_objects, sensor_mode='analytic')
+      runner = env_factory.createEnvs(0, 'pybullet', env_type, env_config, {'random_orientation': True})
+      env = runner.env
+      self.assertIsInstance(env.sensor, AnalyticSensor)
+
+      runner.reset()
+      for i in range(4):
+        analytic_heightmap = env.sensor.getHeightmap(90, env.objects)
+        camera_heightmap = env.sensor.fallback_sensor.getHeightmap(90)
+        # The heightmaps only differ in how the pixels along the object edges are sampled
+        diff = np.abs(analytic_heightmap - camera_heightmap)
+        self.assertLess(diff.mean(), 1e-3)
+        self.assertLess((diff > 0.005).mean(), 0.03)
+        runner.step(runner.planner.getNextAction())
+
+  def testIncrementalHeightmap(self):
+    env_config = dict(self.env_config, num_objects=4)
+    runner = env_factory.createEnvs(0, 'pybullet', 'house_building_3', env_config, {'random_orientation': True})
+    env = runner.env
+    target_pos = [self.workspace[0].mean(), self.workspace[1].mean(), 0]
+    target_size = self.workspace[0][1] - self.workspace[0][0]
+    ray_sensor = RaySensor(target_pos, target_size)
+    analytic_sensor = AnalyticSensor(target_pos, target_size, env.sensor)
+
+    runner.reset()
+    for i in range(6):
+      # Objects which moved less than MOVE_TOLERANCE are not updated, which only flips a few edge pixels
+      full_heightmap = RaySensor(target_pos, target_size).getHeightmap(90)
+      diff = np.abs(ray_sensor.getHeightmap(90) - full_heightmap)
+      self.assertLess((diff > 1e-3).mean(), 0.005)
+
+      full_heightmap = AnalyticSensor(target_pos, target_size, env.sensor).getHeightmap(90, env.objects)
+      diff = np.abs(analytic_sensor.getHeightmap(90, env.objects) - full_heightmap)
+      self.assertLess((diff > 1e-3).mean(), 0.005)
+
+      runner.step(runner.planner.getNextAction())
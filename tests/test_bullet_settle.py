@@ -0,0 +1,38 @@
+import unittest
+import numpy as np
+
+from helping_hands_rl_envs import env_factory
+
+class TestBulletSettle(unittest.TestCase):
+  workspace = np.asarray([[0.3, 0.6],
+                          [-0.15, 0.15],
+                          [0, 0.50]])
+  env_config = {'workspace': workspace, 'max_steps': 10, 'obs_size': 90, 'render': False, 'fast_mode': True,
+                'seed': 0, 'action_sequence': 'pxyr', 'num_objects': 3, 'random_orientation': True,
+                'robot': 'kuka'}
+  planner_config = {'random_orientation': True}
+
+  def testFixedSettle(self):
+    runner = env_factory.createEnvs(0, 'pybullet', 'block_stacking', self.env_config, self.planner_config)
+    runner.reset()
+    runner.step(runner.getNextAction())
+    self.assertEqual(runner.getSettleSteps(), 100)
+
+  def testAdaptiveSettle(self):
+    env_config = dict(self.env_config, settle_mode='adaptive')
+    runner = env_factory.createEnvs(0, 'pybullet', 'block_stacking', env_config, self.planner_config)
+    for i in range(3):
+      runner.reset()
+      done = False
+      while not done:
+        obs, reward, done = runner.step(runner.getNextAction())
+        self.assertLessEqual(runner.getSettleSteps(), 100)
+      self.assertEqual(reward, 1)
+
+    runner = env_factory.createEnvs(2, 'pybullet', 'block_stacking', env_config, self.planner_config)
+    runner.reset()
+    runner.step(runner.getNextAction())
+    settle_steps = runner.getSettleSteps()
+    self.assertEqual(settle_steps.shape, (2,))
+    self.assertTrue(np.all(settle_steps <= 100))
+    runner.close()
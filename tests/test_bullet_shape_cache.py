@@ -0,0 +1,67 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+import pybullet as pb
+
+from helping_hands_rl_envs import env_factory
+from helping_hands_rl_envs.simulators.pybullet.objects import random_object
+from helping_hands_rl_envs.simulators.pybullet.utils import convex_shape
+from helping_hands_rl_envs.simulators.pybullet.utils import pybullet_util
+
+class TestBulletShapeCache(unittest.TestCase):
+  workspace = np.asarray([[0.3, 0.6],
+                          [-0.15, 0.15],
+                          [0, 0.50]])
+  env_config = {'workspace': workspace, 'max_steps': 10, 'obs_size': 90, 'render': False, 'fast_mode': True,
+                'seed': 0, 'action_sequence': 'pxyr', 'num_objects': 3, 'random_orientation': True,
+                'robot': 'kuka'}
+
+  def testSharedShapes(self):
+    runner = env_factory.createEnvs(0, 'pybullet', 'random_picking', self.env_config)
+    obj_filepath = random_object.getMeshFilepaths()[0]
+    obj1 = random_object.RandomObject([0.4, 0, 0.1], [0, 0, 0, 1], 0.6, obj_filepath=obj_filepath, color=[1, 0, 0, 1])
+    obj2 = random_object.RandomObject([0.5, 0, 0.1], [0, 0, 0, 1], 0.6, obj_filepath=obj_filepath, color=[0, 1, 0, 1])
+    cache = random_object._shape_cache[pybullet_util.getActiveClient()]
+    self.assertEqual(len([key for key in cache if key[0] == obj_filepath]), 1)
+    self.assertEqual(len(pb.getCollisionShapeData(obj1.object_id, -1)), len(convex_shape.readObjParts(obj_filepath)))
+    self.assertEqual(len(pb.getCollisionShapeData(obj2.object_id, -1)), len(convex_shape.readObjParts(obj_filepath)))
+    # The color is set per body
+    self.assertEqual(pb.getVisualShapeData(obj1.object_id)[0][7], (1, 0, 0, 1))
+    self.assertEqual(pb.getVisualShapeData(obj2.object_id)[0][7], (0, 1, 0, 1))
+
+  def testHardReset(self):
+    runner = env_factory.createEnvs(0, 'pybullet', 'random_picking', self.env_config)
+    env = runner.env
+    for i in range(3):
+      runner.reset()
+      cache = random_object._shape_cache[pybullet_util.getActiveClient()]
+      # Only the shapes of this episode are cached after each hard reset
+      self.assertLessEqual(len(cache), len(env.objects))
+      for obj in env.objects:
+        self.assertGreater(obj.getZPosition(), 0)
+
+  def testSimplifyConvexParts(self):
+    obj_filepath = random_object.getMeshFilepaths()[0]
+    parts = convex_shape.readObjParts(obj_filepath)
+    hulls = convex_shape.simplifyConvexParts(parts, max_vertices=8)
+    self.assertEqual(len(hulls), len(parts))
+    for (vertices, triangles), part in zip(hulls, parts):
+      self.assertLessEqual(len(vertices), 8)
+      self.assertTrue(all(np.any(np.all(part == vertex, axis=1)) for vertex in vertices))
+      self.assertEqual(triangles.max(), len(vertices) - 1)
+
+    if not pb.isConnected():
+      pb.connect(pb.DIRECT)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+      collision_filepath = os.path.join(tmp_dir, 'collision.obj')
+      convex_shape.writeObjParts(collision_filepath, hulls)
+      self.assertEqual(len(convex_shape.readObjParts(collision_filepath)), len(parts))
+      aabbs = list()
+      for filepath in [obj_filepath, collision_filepath]:
+        collision_shape = pb.createCollisionShape(pb.GEOM_MESH, fileName=filepath, meshScale=[0.01] * 3)
+        body = pb.createMultiBody(0.1, collision_shape, -1, [0, 0, 1])
+        aabbs.append(np.array(pb.getAABB(body)))
+      # The simplified hulls lie inside the original parts
+      self.assertTrue(np.all(aabbs[1][0] >= aabbs[0][0] - 1e-3))
+      self.assertTrue(np.all(aabbs[1][1] <= aabbs[0][1] + 1e-3))
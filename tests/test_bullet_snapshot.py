@@ -0,0 +1,71 @@
+import unittest
+import numpy as np
+
+from helping_hands_rl_envs import env_factory
+
+class TestBulletSnapshot(unittest.TestCase):
+  workspace = np.asarray([[0.3, 0.6],
+                          [-0.15, 0.15],
+                          [0, 0.50]])
+  env_config = {'workspace': workspace, 'max_steps': 10, 'obs_size': 90, 'render': False, 'fast_mode': True,
+                'seed': 0, 'action_sequence': 'pxyr', 'num_objects': 2, 'random_orientation': True,
+                'robot': 'kuka', 'snapshot_capacity': 3}
+  planner_config = {'random_orientation': True}
+
+  def testSlots(self):
+    runner = env_factory.createEnvs(0, 'pybullet', 'block_stacking', self.env_config, self.planner_config)
+    env = runner.env
+    obs = runner.reset()
+    self.assertEqual(runner.save(), 0)
+    self.assertEqual(runner.save('start'), 'start')
+
+    runner.step(runner.getNextAction())
+    obs_1 = env._getObservation()
+    self.assertEqual(runner.save(), 1)
+
+    # Restoring a slot gives the same observation as when it was saved
+    self.assertTrue(runner.restore(0))
+    np.testing.assert_allclose(env._getObservation()[2], obs[2], atol=1e-3)
+    self.assertTrue(runner.restore())
+    np.testing.assert_allclose(env._getObservation()[2], obs_1[2], atol=1e-3)
+    self.assertTrue(runner.restore('start'))
+    np.testing.assert_allclose(env._getObservation()[2], obs[2], atol=1e-3)
+
+    # Restoring the same snapshot again after stepping gives the same state
+    runner.step(runner.getNextAction())
+    self.assertTrue(runner.restore('start'))
+    np.testing.assert_allclose(env._getObservation()[2], obs[2], atol=1e-3)
+
+  def testEviction(self):
+    runner = env_factory.createEnvs(0, 'pybullet', 'block_stacking', self.env_config, self.planner_config)
+    env = runner.env
+    runner.reset()
+    slots = [runner.save() for _ in range(5)]
+    self.assertEqual(len(env.snapshots), 3)
+    self.assertFalse(runner.restore(slots[0]))
+    self.assertFalse(runner.restore(slots[1]))
+    self.assertTrue(runner.restore(slots[2]))
+
+    # Restoring marks the snapshot as recently used
+    runner.save()
+    self.assertTrue(runner.restore(slots[2]))
+    self.assertFalse(runner.restore(slots[3]))
+
+    # A hard reset drops all snapshots
+    runner.reset()
+    self.assertEqual(len(env.snapshots), 0)
+    self.assertFalse(runner.restore(slots[2]))
+
+  def testMultiRunner(self):
+    num_processes = 2
+    runner = env_factory.createEnvs(num_processes, 'pybullet', 'block_stacking', self.env_config, self.planner_config)
+    obs = runner.reset()
+    self.assertEqual(runner.save(), [0, 0])
+    runner.step(runner.getNextAction())
+    self.assertEqual(runner.save(), [1, 1])
+
+    np.testing.assert_array_equal(runner.restore([0, 1]), [True, True])
+    np.testing.assert_array_equal(runner.restore(5), [False, False])
+    self.assertTrue(runner.restore(0).all())
+    (states, in_hands, obs_), rewards, dones = runner.step(runner.getNextAction())
+    runner.close()
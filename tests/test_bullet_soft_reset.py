@@ -0,0 +1,56 @@
+import unittest
+import numpy as np
+import pybullet as pb
+
+from helping_hands_rl_envs import env_factory
+
+class TestBulletSoftReset(unittest.TestCase):
+  workspace = np.asarray([[0.3, 0.6],
+                          [-0.15, 0.15],
+                          [0, 0.50]])
+  env_config = {'workspace': workspace, 'max_steps': 4, 'obs_size': 90, 'render': False, 'fast_mode': True,
+                'seed': 0, 'action_sequence': 'pxyr', 'num_objects': 2, 'random_orientation': True,
+                'robot': 'kuka'}
+  planner_config = {'random_orientation': True}
+
+  def runEpisodes(self, env_config, num_episodes=3):
+    '''
+    Run planner episodes and record the object and arm joint positions after each reset and step
+
+    Returns: List of the recorded states of each episode
+    '''
+    runner = env_factory.createEnvs(0, 'pybullet', 'block_stacking', env_config, self.planner_config)
+    env = runner.env
+    episodes = list()
+    def recordState():
+      object_positions = np.array([obj.getPosition() for obj in env.objects]).ravel()
+      joint_positions = [state[0] for state in pb.getJointStates(env.robot.id, env.robot.arm_joint_indices)]
+      episodes[-1].append(np.concatenate([object_positions, joint_positions]))
+
+    for i in range(num_episodes):
+      runner.reset()
+      episodes.append(list())
+      recordState()
+      done = False
+      while not done:
+        obs, reward, done = runner.step(runner.getNextAction())
+        recordState()
+    return episodes
+
+  def testMatchesHardReset(self):
+    for robot in ['kuka', 'ur5', 'ur5_robotiq']:
+      for seed in range(3):
+        env_config = dict(self.env_config, robot=robot, seed=seed)
+        hard_episodes = self.runEpisodes(dict(env_config, hard_reset_freq=1))
+        soft_episodes = self.runEpisodes(dict(env_config, hard_reset_freq=100, soft_reset_mode='template'))
+        err_msg = '{} seed {}'.format(robot, seed)
+        for hard_states, soft_states in zip(hard_episodes, soft_episodes):
+          np.testing.assert_array_equal(soft_states[0], hard_states[0], err_msg=err_msg)
+          # pybullet keeps the contacts of the arm with the table across restoreState, which changes the order of
+          # the contact constraints in the solver. The UR5 arms press into the table when picking, so only the scenes
+          # after the resets match for them
+          if robot != 'kuka':
+            continue
+          self.assertEqual(len(hard_states), len(soft_states), err_msg)
+          for hard_state, soft_state in zip(hard_states, soft_states):
+            np.testing.assert_allclose(soft_state, hard_state, atol=1e-6, err_msg=err_msg)
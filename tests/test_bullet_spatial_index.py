@@ -0,0 +1,73 @@
+import unittest
+from itertools import combinations
+import numpy as np
+import numpy.random as npr
+
+from helping_hands_rl_envs import env_factory
+from helping_hands_rl_envs.simulators.pybullet.utils import spatial_index
+from helping_hands_rl_envs.simulators.pybullet.utils.spatial_index import SpatialIndex
+
+class TestBulletSpatialIndex(unittest.TestCase):
+  workspace = np.asarray([[0.3, 0.6],
+                          [-0.15, 0.15],
+                          [0, 0.50]])
+  env_config = {'workspace': workspace, 'max_steps': 10, 'obs_size': 90, 'render': False, 'fast_mode': True,
+                'seed': 0, 'action_sequence': 'pxyr', 'num_objects': 4, 'random_orientation': True,
+                'robot': 'kuka'}
+  planner_config = {'random_orientation': True}
+
+  def testQueries(self):
+    rng = npr.RandomState(0)
+    for num_points in [0, 1, 2, 10, spatial_index.DENSE_SIZE + 1, 100]:
+      for num_dims in [2, 3]:
+        # Rounded so some points share coordinates or distances
+        points = np.round(rng.uniform(0, 1, (num_points, num_dims)), 1)
+        index = SpatialIndex(points)
+        distances = np.linalg.norm(points[:, None] - points[None], axis=2)
+        np.testing.assert_allclose(index.getPairwiseDistances(), distances)
+        for max_distance in [0, 0.1, 0.25, 2]:
+          expected = [[i, j] for i, j in combinations(range(num_points), 2) if distances[i, j] < max_distance]
+          self.assertEqual(index.queryPairs(max_distance).tolist(), expected)
+          self.assertEqual(index.hasPairCloserThan(max_distance), len(expected) > 0)
+        for point in rng.uniform(0, 1, (5, num_dims)):
+          query_distances = [np.linalg.norm(point - p) for p in points]
+          for radius in [0.1, 0.3]:
+            expected = [i for i in range(num_points) if query_distances[i] < radius]
+            self.assertEqual(index.queryRadius(point, radius).tolist(), expected)
+          if num_points:
+            expected = sorted(range(num_points), key=lambda i: query_distances[i])
+            self.assertEqual(index.nearest(point), expected[0])
+            self.assertEqual(index.nearest(point, k=3).tolist(), expected[:3])
+
+  def testEnv(self):
+    env_config = dict(self.env_config, num_objects=8)
+    runner = env_factory.createEnvs(0, 'pybullet', 'random_picking', env_config, self.planner_config)
+    env = runner.env
+    for i in range(2):
+      runner.reset()
+      done = False
+      while not done:
+        for pos in np.array(env.getObjectPositions()) + [0.01, 0.01, 0]:
+          expected = sorted(env.objects, key=lambda o: np.linalg.norm(pos - o.getPosition()))[0]
+          self.assertIs(env._getNearestObject(pos), expected)
+        end_pos = env.robot._getEndEffectorPosition()
+        picked_obj = env.robot.getPickedObj(env.objects)
+        nearest_obj = sorted(env.objects, key=lambda o: np.linalg.norm(end_pos - o.getPosition()))[0]
+        self.assertIn(picked_obj, [None, nearest_obj])
+        obs, reward, done = runner.step(runner.getNextAction())
+
+  def testDeconstructTermination(self):
+    env_config = dict(self.env_config, num_objects=4)
+    runner = env_factory.createEnvs(0, 'pybullet', 'house_building_1_deconstruct', env_config,
+                                    self.planner_config)
+    env = runner.env
+    for i in range(2):
+      runner.reset()
+      done = False
+      while not done:
+        obs, reward, done = runner.step(runner.getNextAction())
+        too_close = any(np.linalg.norm(np.array(obj1.getXYPosition()) - np.array(obj2.getXYPosition())) <
+                        env.terminate_min_dist for obj1, obj2 in combinations(env.objects, 2))
+        if env.current_episode_steps >= (env.num_obj - 1) * 2:
+          self.assertEqual(env._checkTermination(), not too_close)
+      self.assertTrue(env._checkTermination())
@@ -0,0 +1,45 @@
+import unittest
+import numpy as np
+
+from helping_hands_rl_envs import env_factory
+
+class TestBulletTeleport(unittest.TestCase):
+  workspace = np.asarray([[0.3, 0.6],
+                          [-0.15, 0.15],
+                          [0, 0.50]])
+  env_config = {'workspace': workspace, 'max_steps': 10, 'obs_size': 90, 'render': False, 'fast_mode': True,
+                'seed': 0, 'action_sequence': 'pxyr', 'num_objects': 3, 'random_orientation': True,
+                'robot': 'kuka', 'execution_mode': 'teleport'}
+  planner_config = {'random_orientation': True}
+
+  def testPlanner(self):
+    runner = env_factory.createEnvs(0, 'pybullet', 'block_stacking', self.env_config, self.planner_config)
+    for i in range(3):
+      runner.reset()
+      done = False
+      while not done:
+        obs, reward, done = runner.step(runner.getNextAction())
+      self.assertEqual(reward, 1)
+
+  def testSaveRestore(self):
+    runner = env_factory.createEnvs(0, 'pybullet', 'block_stacking', self.env_config, self.planner_config)
+    env = runner.env
+    runner.reset()
+    (states, in_hands, obs), reward, done = runner.step(runner.getNextAction())
+    self.assertTrue(states)
+    held_pos = env.robot.holding_obj.getPosition()
+
+    # The held object stays in place while the scene is simulated
+    env.wait(100)
+    np.testing.assert_allclose(env.robot.holding_obj.getPosition(), held_pos, atol=1e-3)
+
+    env.saveState()
+    runner.step(runner.getNextAction())
+    self.assertFalse(env._isHolding())
+    env.restoreState()
+    self.assertTrue(env._isHolding())
+    env.wait(100)
+    np.testing.assert_allclose(env.robot.holding_obj.getPosition(), held_pos, atol=1e-3)
+
+    obs, reward, done = runner.step(runner.getNextAction())
+    self.assertFalse(env._isHolding())
@@ -0,0 +1,38 @@
+import unittest
+import numpy as np
+import pybullet as pb
+
+from helping_hands_rl_envs import env_factory
+from helping_hands_rl_envs.simulators.pybullet.utils import ur5_ik
+
+class TestBulletUR5IK(unittest.TestCase):
+  env_config = {'max_steps': 10, 'obs_size': 90, 'render': False, 'fast_mode': True, 'seed': 0,
+                'action_sequence': 'pxyr', 'num_objects': 1}
+
+  def testInverseKinematics(self):
+    rng = np.random.RandomState(0)
+    for i in range(100):
+      q = rng.uniform(-np.pi, np.pi, 6)
+      T = ur5_ik.forwardKinematics(q)
+      solutions = ur5_ik.inverseKinematics(T)
+      solutions = solutions[~np.isnan(solutions).any(1)]
+      self.assertGreater(len(solutions), 0)
+      for solution in solutions:
+        np.testing.assert_allclose(ur5_ik.forwardKinematics(solution), T, atol=1e-6)
+      # The original joint positions are one of the solutions
+      diff = (solutions - q + np.pi) % (2 * np.pi) - np.pi
+      self.assertLess(np.abs(diff).max(1).min(), 1e-6)
+
+  def testMoveTo(self):
+    for robot in ['ur5', 'ur5_robotiq']:
+      env = env_factory.createEnvs(0, 'pybullet', 'block_stacking', dict(self.env_config, robot=robot)).env
+      env.reset()
+      rng = np.random.RandomState(0)
+      for i in range(10):
+        pos = [rng.uniform(0.3, 0.6), rng.uniform(-0.15, 0.15), rng.uniform(0.02, 0.3)]
+        rot = pb.getQuaternionFromEuler([0, np.pi, rng.uniform(-np.pi, 0)])
+        ik_solve = env.robot._calculateIK(pos, rot)
+        env.robot.moveTo(pos, rot, dynamic=False)
+        np.testing.assert_allclose(env.robot._getEndEffectorPosition(), pos, atol=1e-5)
+        # The next solution for the same pose stays on the same branch
+        np.testing.assert_allclose(env.robot._calculateIK(pos, rot), ik_solve, atol=1e-5)